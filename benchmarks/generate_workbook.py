@@ -0,0 +1,268 @@
+"""
+Synthetic workbook generator for benchmarks.
+
+Builds an inputdata.xlsx (plus a matching data_schema.xml) from an
+existing schema: one table per entity, partylist tables for activity
+entities and M2M junction tables, with deterministic random values.
+
+Usage:
+    python -m benchmarks.generate_workbook --entities 4 --records 10000 --out /tmp/bench_project
+"""
+
+import argparse
+import copy
+import random
+import sys
+import uuid
+import warnings
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.table import Table, TableColumn
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config import EXCEL_FILE_NAME, INPUT_DIR, DEFAULT_PROJECT, SCHEMA_FILE_NAME
+
+DEFAULT_SCHEMA = INPUT_DIR / DEFAULT_PROJECT / SCHEMA_FILE_NAME
+
+# Excel limits sheet titles to 31 characters
+MAX_SHEET_TITLE = 31
+
+# Field types rendered as lookups to another entity
+LOOKUP_TYPES = ("entityreference", "owner", "customer")
+
+
+def _select_entities(schema_root: ET.Element, count: int) -> List[ET.Element]:
+    """
+    Pick entity definitions, cloning schema entities when more are requested.
+
+    Clones are named '<entity>_<n>' and carry no relationships.
+    """
+    available = [e for e in schema_root.findall('entity') if e.get('primaryidfield')]
+    if not available:
+        raise ValueError("Schema has no entities with a primaryidfield")
+
+    selected = list(available[:count])
+    n = 2
+    while len(selected) < count:
+        for entity in available:
+            if len(selected) >= count:
+                break
+            clone = copy.deepcopy(entity)
+            clone.set('name', f"{entity.get('name')}_{n}")
+            relationships = clone.find('relationships')
+            if relationships is not None:
+                clone.remove(relationships)
+            selected.append(clone)
+        n += 1
+
+    return selected
+
+
+class WorkbookGenerator:
+    """Generates deterministic synthetic entity data for a schema."""
+
+    def __init__(self, schema_path: Path, seed: int = 0):
+        """
+        Initialize generator.
+
+        Args:
+            schema_path: Schema the workbook is generated for
+            seed: Random seed
+        """
+        self.schema_tree = ET.parse(str(schema_path))
+        self.rng = random.Random(seed)
+
+    def _guid(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _value(self, field_type: Optional[str], name: str, row: int):
+        """Generate a cell value for a field type."""
+        rng = self.rng
+
+        if field_type == 'guid':
+            return self._guid()
+        if field_type == 'bool':
+            return rng.random() < 0.5
+        if field_type == 'number':
+            return rng.randint(0, 100000)
+        if field_type in ('decimal', 'money', 'float'):
+            return round(rng.uniform(0, 10000), 2)
+        if field_type in ('optionsetvalue', 'state', 'status'):
+            return rng.randint(0, 5)
+        if field_type == 'datetime':
+            return (f"{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(2000, 2030)} "
+                    f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:00")
+        return f"{name} {row}"
+
+    def generate(
+        self,
+        output_dir: Path,
+        entities: int = 4,
+        records: int = 1000,
+        partylist_per_record: int = 3,
+        m2m_rows: int = 1000
+    ) -> Dict[str, int]:
+        """
+        Write inputdata.xlsx and data_schema.xml into output_dir.
+
+        Args:
+            output_dir: Project directory to create
+            entities: Number of entity tables
+            records: Records per entity table
+            partylist_per_record: Activity parties per partylist field and record
+            m2m_rows: Rows per M2M junction table
+
+        Returns:
+            Dictionary mapping table names to row counts
+        """
+        output_dir.mkdir(parents=True, exist_ok=True)
+        schema_root = self.schema_tree.getroot()
+
+        selected = _select_entities(schema_root, entities)
+        names = {e.get('name') for e in selected}
+
+        # Primary keys are generated first so lookups and M2M rows can reference them
+        ids = {
+            e.get('name'): [self._guid() for _ in range(records)]
+            for e in selected
+        }
+
+        wb = Workbook(write_only=True)
+        counts = {}
+
+        for entity in selected:
+            name = entity.get('name')
+            pk = entity.get('primaryidfield')
+            fields = entity.findall('fields/field')
+
+            columns = []
+            for field in fields:
+                field_type = field.get('type')
+                if field_type == 'partylist':
+                    continue
+                columns.append((field.get('name'), field_type, field.get('lookupType')))
+                if field_type in LOOKUP_TYPES and '|' in (field.get('lookupType') or ''):
+                    columns.append((field.get('name') + '_entityreference', 'entityreference_type',
+                                    field.get('lookupType')))
+
+            if pk not in [c[0] for c in columns]:
+                columns.insert(0, (pk, 'guid', None))
+
+            rows = []
+            for i in range(records):
+                row = []
+                for col, field_type, lookup_type in columns:
+                    if col == pk:
+                        row.append(ids[name][i])
+                    elif field_type == 'entityreference_type':
+                        row.append(self.rng.choice(lookup_type.split('|')))
+                    elif field_type in LOOKUP_TYPES:
+                        target = (lookup_type or 'systemuser').split('|')[0]
+                        pool = ids.get(target)
+                        row.append(self.rng.choice(pool) if pool else self._guid())
+                    else:
+                        row.append(self._value(field_type, col, i))
+                rows.append(row)
+
+            self._add_table(wb, name, [c[0] for c in columns], rows)
+            counts[name] = len(rows)
+
+            partylist_fields = [f.get('name') for f in fields if f.get('type') == 'partylist']
+            if partylist_fields and partylist_per_record:
+                party_pool = ids.get('contact') or ids[name]
+                party_rows = []
+                for rec_id in ids[name]:
+                    for field_name in partylist_fields:
+                        for _ in range(partylist_per_record):
+                            party_rows.append([
+                                'contact', field_name, self._guid(), rec_id,
+                                self.rng.choice(party_pool)
+                            ])
+                table = f"partylist_{name}"
+                self._add_table(wb, table, [
+                    'partyid_entityreference', 'entityField', 'activitypointerrecordid',
+                    'activityid', 'partyid'
+                ], party_rows)
+                counts[table] = len(party_rows)
+
+        for entity in selected:
+            for rel in entity.findall('relationships/relationship'):
+                if rel.get('manyToMany') != 'true' or not m2m_rows:
+                    continue
+                target = rel.get('m2mTargetEntity')
+                if target not in names:
+                    continue
+
+                source_key = entity.get('primaryidfield')
+                target_key = rel.get('m2mTargetEntityPrimaryKey')
+                m2m = [
+                    [self.rng.choice(ids[entity.get('name')]), self.rng.choice(ids[target])]
+                    for _ in range(m2m_rows)
+                ]
+                table = f"m2m_{rel.get('relatedEntityName')}"
+                self._add_table(wb, table, [source_key, target_key], m2m)
+                counts[table] = len(m2m)
+
+        wb.save(str(output_dir / EXCEL_FILE_NAME))
+
+        # Schema with exactly the generated entities (clones included)
+        out_root = ET.Element(schema_root.tag, schema_root.attrib)
+        out_root.extend(selected)
+        ET.ElementTree(out_root).write(
+            str(output_dir / SCHEMA_FILE_NAME), encoding='utf-8', xml_declaration=True
+        )
+
+        return counts
+
+    @staticmethod
+    def _add_table(wb: Workbook, name: str, header: List[str], rows: List[list]) -> None:
+        """Add a sheet holding one named table."""
+        ws = wb.create_sheet(title=name[:MAX_SHEET_TITLE])
+        ws.append(header)
+        for row in rows:
+            ws.append(row)
+
+        ref = f"A1:{get_column_letter(len(header))}{len(rows) + 1}"
+
+        table = Table(displayName=name, ref=ref)
+        table.tableColumns = [
+            TableColumn(id=i + 1, name=str(col)) for i, col in enumerate(header)
+        ]
+        # Write-only sheets always warn here; the columns are set above
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            ws.add_table(table)
+
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic benchmark workbook")
+    parser.add_argument("--schema", type=Path, default=DEFAULT_SCHEMA, help="Source schema XML")
+    parser.add_argument("--out", type=Path, required=True, help="Project directory to create")
+    parser.add_argument("--entities", type=int, default=4, help="Number of entity tables")
+    parser.add_argument("--records", type=int, default=1000, help="Records per entity")
+    parser.add_argument("--partylist", type=int, default=3, help="Parties per partylist field and record")
+    parser.add_argument("--m2m", type=int, default=1000, help="Rows per M2M table")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    counts = WorkbookGenerator(args.schema, seed=args.seed).generate(
+        args.out,
+        entities=args.entities,
+        records=args.records,
+        partylist_per_record=args.partylist,
+        m2m_rows=args.m2m
+    )
+
+    for table, rows in counts.items():
+        print(f"  {table}: {rows} rows")
+    print(f"✓ Workbook written to {args.out / EXCEL_FILE_NAME}")
+
+
+if __name__ == "__main__":
+    main()
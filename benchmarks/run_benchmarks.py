@@ -0,0 +1,229 @@
+"""
+Stage benchmarks for the Excel to XML conversion.
+
+Generates a synthetic workbook, then runs each conversion stage once and
+records wall time and peak traced memory per stage. Results are written
+as JSON so runs of different versions can be compared.
+
+Usage:
+    python -m benchmarks.run_benchmarks --entities 4 --records 10000 --json results.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.generate_workbook import DEFAULT_SCHEMA, WorkbookGenerator
+from src.config import COLUMNS_TO_KEEP, EXCEL_ENGINE, ZIP_COMPRESSION
+from src.converter import ExcelToXmlConverter
+from src.excel_loader import ExcelLoader
+from src.schema_loader import SchemaLoader
+from src.utils import safe_str
+from src.zip_writer import CompressionPolicy
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# Version of the JSON result layout
+RESULTS_VERSION = 1
+
+
+class _BenchmarkConverter(ExcelToXmlConverter):
+    """Converter whose resources are loaded by the benchmark stages."""
+
+    def _load_resources(self) -> None:
+        pass
+
+
+def _measure(func: Callable[[], Any], trace_memory: bool) -> Dict[str, Any]:
+    """
+    Run func once and record wall time and peak traced memory.
+
+    Returns:
+        Dictionary with 'seconds', 'peak_mb' (None without tracing) and 'result'
+    """
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    try:
+        result = func()
+    finally:
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+
+    return {
+        'seconds': round(seconds, 4),
+        'peak_mb': round(peak / 2**20, 2) if peak is not None else None,
+        'result': result
+    }
+
+
+def run_stages(
+    project_dir: Path,
+    output_dir: Path,
+    engine: str = EXCEL_ENGINE,
+    compression: str = ZIP_COMPRESSION,
+    trace_memory: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Run the conversion stages one by one.
+
+    Args:
+        project_dir: Directory with inputdata.xlsx and data_schema.xml
+        output_dir: Directory for data.xml and data.zip
+        engine: Workbook reader
+        compression: ZIP compression mode
+        trace_memory: Record peak memory with tracemalloc (slows stages down)
+
+    Returns:
+        List of stage results in execution order
+    """
+    converter = _BenchmarkConverter(
+        project=project_dir.name,
+        engine=engine,
+        input_dir=project_dir.parent,
+        output_dir=output_dir
+    )
+    loader = ExcelLoader(converter.excel_path, engine=engine)
+
+    def load_schema():
+        converter.schema_loader = SchemaLoader(converter.schema_path)
+
+    def load_tables():
+        converter.raw_tables = loader.load_all_tables()
+
+    def filter_tables():
+        # Entity tables keep their loaded values, as in ExcelToXmlConverter._filter_tables
+        converter.filtered_tables = loader.filter_tables(
+            converter.raw_tables, COLUMNS_TO_KEEP, safe_str,
+            encoded_tables=converter.schema_loader.entities_meta
+        )
+
+    def build_partylist_index():
+        converter.generator = converter._create_generator()
+
+    def generate_xml():
+        converter.xml_root = converter.generator.generate_xml(converter.filtered_tables)
+
+    def save_xml():
+        converter.xml_path = converter._save_xml()
+        return converter.xml_path
+
+    def create_zip():
+        return converter.create_zip(converter.xml_path, compression=CompressionPolicy(mode=compression))
+
+    stages = [
+        ('SchemaLoader', load_schema),
+        ('ExcelLoader.load_all_tables', load_tables),
+        ('filter_tables', filter_tables),
+        ('build_partylist_index', build_partylist_index),
+        ('generate_xml', generate_xml),
+        ('_save_xml', save_xml),
+        ('create_zip', create_zip),
+    ]
+
+    results = []
+    for name, func in stages:
+        measured = _measure(func, trace_memory)
+        entry = {'stage': name, 'seconds': measured['seconds'], 'peak_mb': measured['peak_mb']}
+        if isinstance(measured['result'], Path) and measured['result'].exists():
+            entry['output_bytes'] = measured['result'].stat().st_size
+        results.append(entry)
+
+    return results
+
+
+def _max_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB, if available."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    divisor = 2**20 if sys.platform == 'darwin' else 2**10
+    return round(rss / divisor, 2)
+
+
+def main() -> None:
+    """Command-line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark conversion stages on a synthetic workbook")
+    parser.add_argument("--schema", type=Path, default=DEFAULT_SCHEMA, help="Source schema XML")
+    parser.add_argument("--entities", type=int, default=4, help="Number of entity tables")
+    parser.add_argument("--records", type=int, default=1000, help="Records per entity")
+    parser.add_argument("--partylist", type=int, default=3, help="Parties per partylist field and record")
+    parser.add_argument("--m2m", type=int, default=1000, help="Rows per M2M table")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--engine", default=EXCEL_ENGINE, help="Workbook reader")
+    parser.add_argument("--compression", default=ZIP_COMPRESSION, help="ZIP compression mode")
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc peak memory tracking")
+    parser.add_argument("--json", type=Path, help="Write results to this file instead of stdout")
+    args = parser.parse_args()
+
+    params = {
+        'entities': args.entities,
+        'records': args.records,
+        'partylist': args.partylist,
+        'm2m': args.m2m,
+        'seed': args.seed,
+        'engine': args.engine,
+        'compression': args.compression,
+        'trace_memory': not args.no_memory
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project_dir = Path(tmp) / "inputs" / "benchmark"
+        output_dir = Path(tmp) / "outputs"
+
+        # Stage output goes to stderr so stdout stays valid JSON
+        with redirect_stdout(sys.stderr):
+            tables = WorkbookGenerator(args.schema, seed=args.seed).generate(
+                project_dir,
+                entities=args.entities,
+                records=args.records,
+                partylist_per_record=args.partylist,
+                m2m_rows=args.m2m
+            )
+            stages = run_stages(
+                project_dir,
+                output_dir,
+                engine=args.engine,
+                compression=args.compression,
+                trace_memory=not args.no_memory
+            )
+
+    results = {
+        'version': RESULTS_VERSION,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': params,
+        'tables': tables,
+        'stages': stages,
+        'total_seconds': round(sum(s['seconds'] for s in stages), 4),
+        'max_rss_mb': _max_rss_mb()
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.json:
+        args.json.write_text(text + "\n", encoding="utf-8")
+        print(f"✓ Results written to {args.json}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
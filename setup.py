@@ -41,6 +41,9 @@ setup(
         "numpy>=1.20.0",
     ],
     extras_require={
+        "arrow": [
+            "pyarrow>=10.0.0",
+        ],
         "dev": [
             "pytest>=6.2.0",
             "pytest-cov>=2.12.0",
@@ -50,7 +53,7 @@ setup(
     },
     entry_points={
         "console_scripts": [
-            "excel-to-cmt=src.converter:main",
+            "excel-to-cmt=src.cli:main",
         ],
     },
 )
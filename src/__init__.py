@@ -3,6 +3,12 @@
 __version__ = "1.0.0"
 __author__ = "Timotej Palus"
 
-from .converter import ExcelToXmlConverter, main
-
 __all__ = ["ExcelToXmlConverter", "main"]
+
+
+def __getattr__(name):
+    # Import the converter (and pandas with it) only when it is used
+    if name in __all__:
+        from . import converter
+        return getattr(converter, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
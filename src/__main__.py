@@ -0,0 +1,5 @@
+"""Allow running the converter with `python -m src`."""
+
+from .cli import main
+
+main()
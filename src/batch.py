@@ -0,0 +1,284 @@
+"""
+Batch conversion of many projects in one invocation.
+"""
+
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from .config import (
+    INPUT_DIR, OUTPUT_DIR, EXCEL_FILE_NAME, SCHEMA_FILE_NAME, EXCEL_ENGINE,
+    BATCH_WORKERS, BATCH_LOG_FILE, INCREMENTAL_BUILD, M2M_GROUP_TARGETS,
+    DATETIME_NORMALIZATION, RENDER_WORKERS, PACKAGE_MAX_RECORDS, VALIDATE_INPUTS,
+    REPRODUCIBLE_OUTPUT
+)
+from .converter import build_project, default_schema_cache
+from .manifest import file_sha256
+from .schema_loader import CompiledSchema, SchemaLoader
+from .zip_writer import CompressionPolicy, check_date_time, validate_policy
+
+
+class BatchOptions(NamedTuple):
+    """Conversion settings shared by all projects of a batch."""
+
+    input_dir: Path = INPUT_DIR
+    output_dir: Path = OUTPUT_DIR
+    engine: str = EXCEL_ENGINE
+    stream: bool = False
+    direct_zip: bool = False
+    create_zip_file: bool = True
+    compression: Optional[CompressionPolicy] = None
+    incremental: bool = INCREMENTAL_BUILD
+    group_m2m_targets: bool = M2M_GROUP_TARGETS
+    # Column filter per entity (None = COLUMNS_TO_KEEP from config)
+    columns_to_keep: Optional[Dict[str, List[str]]] = None
+    datetime_mode: str = DATETIME_NORMALIZATION
+    render_workers: int = RENDER_WORKERS
+    max_records_per_package: Optional[int] = PACKAGE_MAX_RECORDS
+    validate: bool = VALIDATE_INPUTS
+    reproducible: bool = REPRODUCIBLE_OUTPUT
+    # UTC time of the root element and ZIP entries (None = time of the run)
+    timestamp: Optional[datetime] = None
+
+
+class ProjectResult(NamedTuple):
+    """Outcome of converting one project."""
+
+    project: str
+    ok: bool
+    seconds: float
+    output: Optional[Path]
+    error: Optional[str]
+    reused: bool = False
+
+
+def discover_projects(input_dir: Path = INPUT_DIR) -> List[str]:
+    """
+    Find project directories containing a workbook and a schema.
+
+    Args:
+        input_dir: Directory containing project directories
+
+    Returns:
+        Sorted project directory names
+    """
+    input_dir = Path(input_dir)
+    if not input_dir.is_dir():
+        raise ValueError(f"Input directory not found: {input_dir}")
+
+    return sorted(
+        path.name for path in input_dir.iterdir()
+        if path.is_dir()
+        and (path / EXCEL_FILE_NAME).exists()
+        and (path / SCHEMA_FILE_NAME).exists()
+    )
+
+
+def compile_schemas(projects: Sequence[str], input_dir: Path) -> Dict[str, CompiledSchema]:
+    """
+    Compile the schema of every project, each distinct schema content once.
+
+    Runs in the batch process, so worker processes receive the compiled
+    schemas instead of parsing them again. Schemas that cannot be read or
+    parsed are left out; their projects report the error when converted.
+
+    Args:
+        projects: Project directory names
+        input_dir: Directory containing project directories
+
+    Returns:
+        Compiled schema per project, shared by projects with the same schema content
+    """
+    by_digest: Dict[str, CompiledSchema] = {}
+    compiled = {}
+
+    for project in projects:
+        schema_path = Path(input_dir) / project / SCHEMA_FILE_NAME
+        try:
+            digest = file_sha256(schema_path)
+            if digest not in by_digest:
+                by_digest[digest] = SchemaLoader(schema_path, cache=default_schema_cache()).compiled
+        except (OSError, ET.ParseError):
+            continue
+        compiled[project] = by_digest[digest]
+
+    return compiled
+
+
+def convert_project(
+    project: str,
+    options: BatchOptions,
+    schema: Optional[CompiledSchema] = None
+) -> ProjectResult:
+    """
+    Convert one project into its own output subdirectory.
+
+    Status output is written to BATCH_LOG_FILE in that subdirectory and
+    errors are returned in the result instead of being raised.
+
+    Args:
+        project: Project directory name
+        options: Batch settings
+        schema: Compiled schema of the project (None = load it here)
+
+    Returns:
+        ProjectResult of the conversion
+    """
+    output_dir = Path(options.output_dir) / project
+    output_dir.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+
+    with open(output_dir / BATCH_LOG_FILE, "w", encoding="utf-8") as log, redirect_stdout(log):
+        try:
+            schema_loader = SchemaLoader(
+                Path(options.input_dir) / project / SCHEMA_FILE_NAME,
+                cache=default_schema_cache(),
+                compiled=schema
+            )
+            output, reused = build_project(
+                project,
+                input_dir=options.input_dir,
+                output_dir=output_dir,
+                create_zip_file=options.create_zip_file,
+                stream=options.stream,
+                direct_zip=options.direct_zip,
+                compression=options.compression,
+                engine=options.engine,
+                schema_loader=schema_loader,
+                incremental=options.incremental,
+                group_m2m_targets=options.group_m2m_targets,
+                columns_to_keep=options.columns_to_keep,
+                datetime_mode=options.datetime_mode,
+                workers=options.render_workers,
+                max_records_per_package=options.max_records_per_package,
+                validate=options.validate,
+                reproducible=options.reproducible,
+                timestamp=options.timestamp
+            )
+
+            print("\n✓ Conversion completed successfully!")
+            error = None
+
+        except Exception as e:
+            print(f"\n✗ Error: {e}")
+            output = None
+            reused = False
+            error = f"{type(e).__name__}: {e}"
+
+    return ProjectResult(
+        project=project,
+        ok=error is None,
+        seconds=time.perf_counter() - start,
+        output=output,
+        error=error,
+        reused=reused
+    )
+
+
+def run_batch(
+    projects: Optional[Sequence[str]] = None,
+    options: BatchOptions = BatchOptions(),
+    workers: Optional[int] = BATCH_WORKERS
+) -> List[ProjectResult]:
+    """
+    Convert several projects, concurrently when workers > 1.
+
+    A failing project does not stop the others.
+
+    Args:
+        projects: Project names (None = all projects under options.input_dir)
+        options: Settings shared by all projects
+        workers: Concurrent conversions (None = CPU count, 1 = sequential
+                 in this process)
+
+    Returns:
+        ProjectResults in project order
+    """
+    if options.compression is not None:
+        validate_policy(options.compression)
+    if options.timestamp is not None:
+        check_date_time(options.timestamp.timetuple()[:6])
+
+    if projects is None:
+        projects = discover_projects(options.input_dir)
+
+    schemas = compile_schemas(projects, options.input_dir)
+
+    if workers == 1 or len(projects) <= 1:
+        return [convert_project(project, options, schemas.get(project)) for project in projects]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(convert_project, project, options, schemas.get(project))
+            for project in projects
+        ]
+        results = []
+        for project, future in zip(projects, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # Worker process died (e.g. out of memory)
+                results.append(ProjectResult(project, False, 0.0, None, f"{type(e).__name__}: {e}"))
+
+    return results
+
+
+def format_summary(results: Sequence[ProjectResult]) -> str:
+    """
+    Format batch results as a table.
+
+    Args:
+        results: Results returned by run_batch()
+
+    Returns:
+        Summary table with one line per project and a totals line
+    """
+    width = max([len("Project")] + [len(r.project) for r in results])
+    lines = [f"{'Project':<{width}}  {'Status':<9}  {'Time':>8}  Output / Error"]
+    lines.append("-" * len(lines[0]))
+
+    for r in results:
+        status = "FAILED" if not r.ok else "unchanged" if r.reused else "ok"
+        detail = str(r.output) if r.ok else r.error
+        lines.append(f"{r.project:<{width}}  {status:<9}  {r.seconds:>7.2f}s  {detail}")
+
+    failed = sum(not r.ok for r in results)
+    reused = sum(r.reused for r in results)
+    lines.append(f"\n{len(results) - failed} succeeded ({reused} unchanged), {failed} failed")
+    return "\n".join(lines)
+
+
+def main_batch(
+    projects: Optional[Sequence[str]] = None,
+    options: BatchOptions = BatchOptions(),
+    workers: Optional[int] = BATCH_WORKERS
+) -> List[ProjectResult]:
+    """
+    Batch entry point: convert projects and print a summary table.
+
+    Exits with status 1 if any project failed.
+
+    Args:
+        projects: Project names (None = all projects under options.input_dir)
+        options: Settings shared by all projects
+        workers: Concurrent conversions (None = CPU count)
+
+    Returns:
+        ProjectResults in project order
+    """
+    try:
+        results = run_batch(projects, options, workers)
+    except ValueError as e:
+        print(f"\n✗ Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(format_summary(results))
+
+    if not all(r.ok for r in results):
+        sys.exit(1)
+    return results
@@ -0,0 +1,292 @@
+"""
+Command-line interface.
+
+Every setting of a run can be given as an option, so several conversions
+can run side by side from one installation without editing config.py.
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .config import (
+    INPUT_DIR, OUTPUT_DIR, DEFAULT_PROJECT, ENGINES, EXCEL_ENGINE, DATETIME_MODES, DATETIME_NORMALIZATION,
+    ZIP_COMPRESSION, ZIP_COMPRESSION_LEVEL, ZIP_WORKERS, RENDER_WORKERS, BATCH_WORKERS,
+    INCREMENTAL_BUILD, M2M_GROUP_TARGETS, METRICS_FILE, METRICS_TRACE_MEMORY, PACKAGE_MAX_RECORDS,
+    DELTA_STORE, VALIDATE_INPUTS, REPRODUCIBLE_OUTPUT
+)
+from .zip_writer import COMPRESSION_MODES, CompressionPolicy, check_date_time
+
+# Options of a single conversion that batch mode does not support
+SINGLE_PROJECT_OPTIONS = (
+    "excel", "schema", "delta", "validate_only", "keep_xml", "metrics_file", "trace_memory",
+    "print_metrics"
+)
+
+
+def load_column_filter(path: Path) -> Dict[str, List[str]]:
+    """
+    Read a column filter file.
+
+    The file is a JSON object with the same layout as COLUMNS_TO_KEEP:
+    entity name -> list of columns ([] = all, '-' prefix = exclude).
+
+    Args:
+        path: Path to the JSON file
+
+    Returns:
+        Column filter per entity
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Column filter file not found: {path}")
+
+    try:
+        columns = json.loads(path.read_text(encoding="utf-8"))
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON in column filter file {path}: {e}")
+
+    if not isinstance(columns, dict) or not all(
+        isinstance(cols, list) and all(isinstance(c, str) for c in cols)
+        for cols in columns.values()
+    ):
+        raise ValueError(
+            f"Column filter file {path} must map entity names to lists of column names"
+        )
+
+    return columns
+
+
+def parse_timestamp(text: str) -> datetime:
+    """
+    Parse an ISO 8601 timestamp option.
+
+    Args:
+        text: e.g. '2024-05-01T12:00:00Z'; times without offset are UTC
+
+    Returns:
+        Naive UTC datetime within the years ZIP entries can store
+    """
+    try:
+        value = datetime.fromisoformat(text.strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid ISO 8601 timestamp: '{text}'")
+
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+
+    try:
+        check_date_time(value.timetuple()[:6])
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Create the argument parser of the excel-to-cmt command."""
+    parser = argparse.ArgumentParser(
+        prog="excel-to-cmt",
+        description="Convert Excel workbooks to CMT-compatible XML and ZIP packages."
+    )
+
+    inputs = parser.add_argument_group("inputs and outputs")
+    inputs.add_argument(
+        "projects", nargs="*", metavar="PROJECT",
+        help=f"Project directory name under --input-dir (default: {DEFAULT_PROJECT}; "
+             "with --batch: all projects)"
+    )
+    inputs.add_argument("--input-dir", type=Path, default=INPUT_DIR,
+                        help="Directory containing project directories (default: %(default)s)")
+    inputs.add_argument("-o", "--output-dir", type=Path, default=OUTPUT_DIR,
+                        help="Output directory (default: %(default)s)")
+    inputs.add_argument("--excel", type=Path,
+                        help="Workbook to convert instead of the project's inputdata.xlsx")
+    inputs.add_argument("--schema", type=Path,
+                        help="Schema to use instead of the project's data_schema.xml")
+    inputs.add_argument("--columns", type=Path, metavar="FILE",
+                        help="JSON column filter per entity, replaces COLUMNS_TO_KEEP")
+
+    conversion = parser.add_argument_group("conversion")
+    conversion.add_argument("--engine", choices=ENGINES, default=EXCEL_ENGINE,
+                            help="Workbook reader (default: %(default)s)")
+    conversion.add_argument("--datetime-mode", choices=DATETIME_MODES, default=DATETIME_NORMALIZATION,
+                            help="Normalize datetimes in all string columns or only schema "
+                                 "datetime fields (default: %(default)s)")
+    conversion.add_argument("-j", "--workers", type=int, default=RENDER_WORKERS,
+                            help="Processes rendering entity records (default: %(default)s)")
+    conversion.add_argument("--group-m2m-targets", action="store_true", default=M2M_GROUP_TARGETS,
+                            help="One <m2mrelationship> per source record listing all targets")
+    conversion.add_argument("--stream", action="store_true",
+                            help="Write data.xml incrementally instead of building a tree")
+    conversion.add_argument("--incremental", action="store_true", default=INCREMENTAL_BUILD,
+                            help="Reuse the existing output when inputs, settings and the "
+                                 "converter version are unchanged (default: %(default)s)")
+    conversion.add_argument("--no-incremental", dest="incremental", action="store_false",
+                            help="Always rebuild, even if INCREMENTAL_BUILD is set")
+    conversion.add_argument("--delta", type=Path, default=DELTA_STORE, metavar="STORE",
+                            help="Write only records changed since the last run with this "
+                                 "record hash store (SQLite file, created if missing)")
+    conversion.add_argument("--validate", action="store_true", default=VALIDATE_INPUTS,
+                            help="Check primary keys and references first; stop on problems")
+    conversion.add_argument("--validate-only", action="store_true",
+                            help="Only run the checks of --validate, write no output")
+    conversion.add_argument("--clear-cache", action="store_true",
+                            help="Delete cached tables, schemas and fragments first")
+
+    packaging = parser.add_argument_group("packaging")
+    packaging.add_argument("--no-zip", dest="create_zip_file", action="store_false",
+                           help="Only write data.xml")
+    packaging.add_argument("--direct-zip", action="store_true",
+                           help="Generate XML straight into data.zip")
+    packaging.add_argument("--keep-xml", action="store_true",
+                           help="With --direct-zip, also keep the loose data.xml")
+    packaging.add_argument("--max-records", type=int, default=PACKAGE_MAX_RECORDS, metavar="N",
+                           help="Split output into data_001.zip, data_002.zip, ... "
+                                "of at most N entity records each")
+    packaging.add_argument("--reproducible", action="store_true", default=REPRODUCIBLE_OUTPUT,
+                           help="Byte-identical output for identical inputs: fixed timestamps "
+                                "and deterministic generated ids")
+    packaging.add_argument("--timestamp", type=parse_timestamp, metavar="ISO",
+                           help="UTC time written to data.xml and the ZIP entries "
+                                "(default: now, or the workbook's modified time with --reproducible)")
+    packaging.add_argument("--compression", choices=COMPRESSION_MODES, default=ZIP_COMPRESSION,
+                           help="ZIP compression (default: %(default)s)")
+    packaging.add_argument("--compression-level", type=int, default=ZIP_COMPRESSION_LEVEL,
+                           help="zlib level 0-9 (default: zlib default)")
+    packaging.add_argument("--zip-workers", type=int, default=ZIP_WORKERS,
+                           help="Threads for parallel compression (default: CPU count)")
+
+    batch = parser.add_argument_group("batch mode")
+    batch.add_argument("--batch", action="store_true",
+                       help="Convert several projects, each into OUTPUT_DIR/<project>")
+    batch.add_argument("--batch-workers", type=int, default=BATCH_WORKERS,
+                       help="Concurrent project conversions (default: CPU count)")
+
+    metrics = parser.add_argument_group("metrics")
+    metrics.add_argument("--metrics-file", type=Path, default=METRICS_FILE,
+                         help="Write per-stage metrics as JSON to this file")
+    metrics.add_argument("--trace-memory", action="store_true", default=METRICS_TRACE_MEMORY,
+                         help="Record peak memory per stage")
+    metrics.add_argument("--print-metrics", action="store_true",
+                         help="Print a timing line after every stage")
+
+    return parser
+
+
+def _check_args(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """Reject option combinations argparse cannot express."""
+    if args.batch:
+        for option in SINGLE_PROJECT_OPTIONS:
+            if getattr(args, option) != parser.get_default(option):
+                parser.error(f"--{option.replace('_', '-')} cannot be used with --batch")
+    elif len(args.projects) > 1:
+        parser.error("several projects require --batch")
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.batch_workers is not None and args.batch_workers < 1:
+        parser.error("--batch-workers must be at least 1")
+    if args.max_records is not None:
+        if args.max_records < 1:
+            parser.error("--max-records must be at least 1")
+        if not args.create_zip_file:
+            parser.error("--max-records cannot be used with --no-zip")
+    if args.direct_zip and not args.create_zip_file:
+        parser.error("--direct-zip cannot be used with --no-zip")
+    if args.keep_xml and not args.direct_zip:
+        parser.error("--keep-xml requires --direct-zip")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Command-line entry point.
+
+    Args:
+        argv: Arguments without the program name (default: sys.argv[1:])
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    _check_args(parser, args)
+
+    columns_to_keep = None
+    if args.columns is not None:
+        try:
+            columns_to_keep = load_column_filter(args.columns)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"\n✗ Error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    if args.batch:
+        from .batch import BatchOptions, main_batch
+        from .converter import clear_caches
+
+        if args.clear_cache:
+            clear_caches()
+
+        main_batch(
+            args.projects or None,
+            BatchOptions(
+                input_dir=args.input_dir,
+                output_dir=args.output_dir,
+                engine=args.engine,
+                stream=args.stream,
+                direct_zip=args.direct_zip,
+                create_zip_file=args.create_zip_file,
+                compression=CompressionPolicy(
+                    mode=args.compression,
+                    level=args.compression_level,
+                    workers=args.zip_workers
+                ),
+                incremental=args.incremental,
+                group_m2m_targets=args.group_m2m_targets,
+                columns_to_keep=columns_to_keep,
+                datetime_mode=args.datetime_mode,
+                render_workers=args.workers,
+                max_records_per_package=args.max_records,
+                validate=args.validate,
+                reproducible=args.reproducible,
+                timestamp=args.timestamp
+            ),
+            workers=args.batch_workers
+        )
+        return
+
+    from .converter import main as convert
+
+    convert(
+        args.projects[0] if args.projects else DEFAULT_PROJECT,
+        create_zip_file=args.create_zip_file,
+        stream=args.stream,
+        direct_zip=args.direct_zip,
+        keep_xml=args.keep_xml,
+        compression=args.compression,
+        compression_level=args.compression_level,
+        metrics_file=args.metrics_file,
+        trace_memory=args.trace_memory,
+        print_metrics=args.print_metrics,
+        workers=args.workers,
+        incremental=args.incremental,
+        clear_cache=args.clear_cache,
+        group_m2m_targets=args.group_m2m_targets,
+        input_dir=args.input_dir,
+        output_dir=args.output_dir,
+        excel_path=args.excel,
+        schema_path=args.schema,
+        columns_to_keep=columns_to_keep,
+        engine=args.engine,
+        datetime_mode=args.datetime_mode,
+        zip_workers=args.zip_workers,
+        max_records_per_package=args.max_records,
+        delta_store=args.delta,
+        validate=args.validate,
+        validate_only=args.validate_only,
+        reproducible=args.reproducible,
+        timestamp=args.timestamp
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,7 @@ Configuration for Excel to XML conversion.
 """
 
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 # Base paths
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -27,6 +27,69 @@ COLUMNS_TO_KEEP: Dict[str, List[str]] = {
     # 'contact': [],
 }
 
+# Workbook reader: 'openpyxl' or 'fast' (parses the xlsx sheet XML directly)
+ENGINES = ("openpyxl", "fast")
+EXCEL_ENGINE = "openpyxl"
+
+# Datetime normalization: schema datetime fields and 'all' free text columns, or only 'schema' datetime fields
+DATETIME_MODES = ("all", "schema")
+DATETIME_NORMALIZATION = "all"
+
+# ZIP compression: 'store', 'deflate' or 'parallel' (deflate on a thread pool)
+ZIP_COMPRESSION = "deflate"
+ZIP_COMPRESSION_LEVEL: Optional[int] = None   # 0-9, None = zlib default
+ZIP_WORKERS: Optional[int] = None             # parallel mode threads, None = CPU count
+
+# M2M output: one <m2mrelationship> per source record and relationship listing all
+# target ids (True) or one per junction table row (False)
+M2M_GROUP_TARGETS = False
+
+# Entity rendering: worker processes (1 = single process) and records per worker task
+RENDER_WORKERS = 1
+RENDER_SHARD_SIZE = 20000
+
+# Split output into packages of at most this many entity records (None = one data.zip)
+PACKAGE_MAX_RECORDS: Optional[int] = None
+PACKAGE_SHARD_FILE = "data_{:03d}.zip"
+
+# Record hash store of delta runs: only records changed since the last
+# run that used the store are written (None = full output)
+DELTA_STORE: Optional[Path] = None
+
+# Check primary keys and references before generating XML; a failed
+# check stops the build
+VALIDATE_INPUTS = False
+
+# Byte-identical output for identical inputs: the root timestamp and ZIP
+# entry times come from the workbook's modified time (or REPRODUCIBLE_TIME
+# when it records none) and generated activity party ids are uuid5-based
+REPRODUCIBLE_OUTPUT = False
+REPRODUCIBLE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# Batch mode: concurrent project conversions (None = CPU count) and per-project log file
+BATCH_WORKERS: Optional[int] = None
+BATCH_LOG_FILE = "convert.log"
+
+# Incremental rebuild: reuse outputs when inputs, settings and the package
+# version are unchanged (opt-in)
+INCREMENTAL_BUILD = False
+MANIFEST_FILE = "build_manifest.json"
+
+# Columnar cache of loaded workbook tables (requires pyarrow): directory (None = disabled) and size limit
+TABLE_CACHE_DIR: Optional[Path] = None        # e.g. BASE_DIR / ".cache" / "tables"
+TABLE_CACHE_MAX_BYTES = 2 * 2**30
+
+# Compiled schema cache: directory (None = disabled)
+SCHEMA_CACHE_DIR: Optional[Path] = None       # e.g. BASE_DIR / ".cache" / "schemas"
+
+# Per-entity XML fragment cache: directory (None = disabled) and size limit
+FRAGMENT_CACHE_DIR: Optional[Path] = None     # e.g. BASE_DIR / ".cache" / "fragments"
+FRAGMENT_CACHE_MAX_BYTES = 512 * 2**20
+
+# Per-stage metrics: JSON file path (None = not written) and tracemalloc peak memory
+METRICS_FILE: Optional[Path] = None
+METRICS_TRACE_MEMORY = False
+
 # File names
 EXCEL_FILE_NAME = "inputdata.xlsx"
 SCHEMA_FILE_NAME = "data_schema.xml"
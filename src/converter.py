@@ -2,47 +2,233 @@
 Main conversion script: Excel to XML + ZIP packaging.
 """
 
+import io
 import sys
 import xml.etree.ElementTree as ET
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
 from .config import (
     BASE_DIR, INPUT_DIR, OUTPUT_DIR, DEFAULT_PROJECT,
     COLUMNS_TO_KEEP, EXCEL_FILE_NAME, SCHEMA_FILE_NAME,
-    DATA_OUTPUT_FILE, ZIP_OUTPUT_FILE, CONTENT_TYPES_XML
+    DATA_OUTPUT_FILE, ZIP_OUTPUT_FILE, CONTENT_TYPES_XML, EXCEL_ENGINE,
+    DATETIME_NORMALIZATION, ZIP_COMPRESSION, ZIP_COMPRESSION_LEVEL, ZIP_WORKERS,
+    METRICS_FILE, METRICS_TRACE_MEMORY, RENDER_WORKERS, RENDER_SHARD_SIZE,
+    INCREMENTAL_BUILD, FRAGMENT_CACHE_DIR, FRAGMENT_CACHE_MAX_BYTES,
+    TABLE_CACHE_DIR, TABLE_CACHE_MAX_BYTES, SCHEMA_CACHE_DIR, M2M_GROUP_TARGETS,
+    PACKAGE_MAX_RECORDS, PACKAGE_SHARD_FILE, DELTA_STORE, VALIDATE_INPUTS,
+    REPRODUCIBLE_OUTPUT, REPRODUCIBLE_TIME
 )
-from .excel_loader import ExcelLoader
-from .schema_loader import SchemaLoader
-from .utils import safe_str
-from .xml_generator import XMLGenerator
+from .fragment_cache import FragmentCache
+from .manifest import compute_fingerprint, find_up_to_date_output, remove_manifest, write_manifest
+from .metrics import MetricsRecorder, print_stage
+from .schema_loader import SchemaCache, SchemaLoader
+from .xml_writer import TeeStream
+from .zip_writer import (
+    ZIP_YEARS, CompressionPolicy, check_date_time, open_entry, open_zip, validate_policy,
+    write_bytes, write_file
+)
+
+# Modules importing pandas are imported where they are first needed, so
+# startup and argument errors do not pay for loading pandas
+if TYPE_CHECKING:
+    from .delta import RecordHashStore
+    from .table_cache import TableCache
+    from .validation import ValidationIssue
+    from .xml_generator import XMLGenerator
+
+
+def default_fragment_cache() -> Optional[FragmentCache]:
+    """Fragment cache from config, or None when disabled."""
+    if FRAGMENT_CACHE_DIR is None:
+        return None
+    return FragmentCache(FRAGMENT_CACHE_DIR, FRAGMENT_CACHE_MAX_BYTES)
+
+
+def default_table_cache() -> Optional["TableCache"]:
+    """Workbook table cache from config, or None when disabled."""
+    if TABLE_CACHE_DIR is None:
+        return None
+
+    from .table_cache import TableCache
+    return TableCache(TABLE_CACHE_DIR, TABLE_CACHE_MAX_BYTES)
+
+
+def default_schema_cache() -> Optional[SchemaCache]:
+    """Compiled schema cache from config, or None when disabled."""
+    if SCHEMA_CACHE_DIR is None:
+        return None
+    return SchemaCache(SCHEMA_CACHE_DIR)
+
+
+def resolve_input_paths(
+    project: str,
+    input_dir: Path = INPUT_DIR,
+    excel_path: Optional[Path] = None,
+    schema_path: Optional[Path] = None
+) -> Tuple[Path, Path]:
+    """
+    Locate the workbook and schema of a conversion.
+    
+    Args:
+        project: Project directory name under input_dir
+        input_dir: Directory containing project directories
+        excel_path: Explicit workbook path (default: project's inputdata.xlsx)
+        schema_path: Explicit schema path (default: project's data_schema.xml)
+        
+    Returns:
+        Tuple of (workbook path, schema path)
+    """
+    project_dir = Path(input_dir) / project
+    return (
+        Path(excel_path) if excel_path is not None else project_dir / EXCEL_FILE_NAME,
+        Path(schema_path) if schema_path is not None else project_dir / SCHEMA_FILE_NAME
+    )
+
+
+def clear_caches() -> None:
+    """Delete all entries of the caches enabled in config."""
+    for cache in (default_fragment_cache(), default_table_cache(), default_schema_cache()):
+        if cache is not None:
+            removed = cache.clear()
+            print(f"✓ Removed {removed} cache entries from {cache.cache_dir}")
+
+
+def default_compression() -> CompressionPolicy:
+    """Compression policy from config."""
+    return CompressionPolicy(
+        mode=ZIP_COMPRESSION,
+        level=ZIP_COMPRESSION_LEVEL,
+        workers=ZIP_WORKERS
+    )
+
+
+def reproducible_timestamp(excel_path: Path) -> datetime:
+    """
+    Timestamp of a reproducible run: the workbook's recorded modified time.
+    
+    Args:
+        excel_path: Path to Excel file
+        
+    Returns:
+        Naive UTC datetime (REPRODUCIBLE_TIME if the workbook has none)
+    """
+    from .xlsx_reader import read_modified_time
+
+    modified = read_modified_time(excel_path)
+    if modified is None or not ZIP_YEARS[0] <= modified.year <= ZIP_YEARS[1]:
+        return datetime(*REPRODUCIBLE_TIME)
+    return modified
 
 
 class ExcelToXmlConverter:
     """Main converter class orchestrating the conversion process."""
 
-    def __init__(self, project: str = DEFAULT_PROJECT):
+    def __init__(
+        self,
+        project: str = DEFAULT_PROJECT,
+        stream: bool = False,
+        engine: str = EXCEL_ENGINE,
+        datetime_mode: str = DATETIME_NORMALIZATION,
+        input_dir: Path = INPUT_DIR,
+        output_dir: Path = OUTPUT_DIR,
+        metrics: Optional[MetricsRecorder] = None,
+        workers: int = RENDER_WORKERS,
+        schema_loader: Optional[SchemaLoader] = None,
+        fragment_cache: Optional[FragmentCache] = None,
+        table_cache: Optional["TableCache"] = None,
+        group_m2m_targets: bool = M2M_GROUP_TARGETS,
+        excel_path: Optional[Path] = None,
+        schema_path: Optional[Path] = None,
+        columns_to_keep: Optional[Dict[str, List[str]]] = None,
+        delta_store: Optional["RecordHashStore"] = None,
+        validate: bool = VALIDATE_INPUTS,
+        reproducible: bool = REPRODUCIBLE_OUTPUT,
+        timestamp: Optional[datetime] = None
+    ):
         """
         Initialize converter.
         
         Args:
             project: Project directory name under inputs/
+            stream: Write data.xml incrementally instead of building
+                    the whole XML tree in memory
+            engine: Workbook reader, 'openpyxl' or 'fast'
+            datetime_mode: Datetime normalization, 'all' string columns
+                           or only 'schema' datetime fields
+            input_dir: Directory containing project directories
+            output_dir: Directory for data.xml and data.zip
+            metrics: Recorder for per-stage timing and memory (a
+                     recorder without hooks is created if omitted)
+            workers: Processes rendering entity records in parallel
+                     (1 = render in this process)
+            schema_loader: Already parsed schema of this project (parsed
+                           from the project's data_schema.xml if None)
+            fragment_cache: Cache of rendered entity records (default
+                            from FRAGMENT_CACHE_DIR, disabled if unset)
+            table_cache: Columnar cache of loaded workbook tables (default
+                         from TABLE_CACHE_DIR, disabled if unset)
+            group_m2m_targets: Write all targets of a source record and
+                               relationship into one <m2mrelationship>
+            excel_path: Workbook to convert instead of the project's
+                        inputdata.xlsx
+            schema_path: Schema to use instead of the project's
+                         data_schema.xml
+            columns_to_keep: Column filter per entity (default
+                             COLUMNS_TO_KEEP from config)
+            delta_store: Record hashes of the previous run; only new or
+                         changed records are written (hashes of this run
+                         are staged in the store, not committed)
+            validate: Check primary keys and references before
+                      generating XML and raise ValueError on problems
+            reproducible: Write byte-identical output for identical
+                          inputs (deterministic ids, timestamp from the
+                          workbook unless given)
+            timestamp: UTC time of the root element and ZIP entries
+                       (None = time of the run)
         """
         self.project = project
-        self.project_dir = INPUT_DIR / project
+        self.project_dir = Path(input_dir) / project
+        self.explicit_paths = excel_path is not None and schema_path is not None
+        self.excel_path, self.schema_path = resolve_input_paths(
+            project, input_dir, excel_path, schema_path
+        )
+        self.columns_to_keep = COLUMNS_TO_KEEP if columns_to_keep is None else columns_to_keep
+        self.output_dir = Path(output_dir)
+        self.stream = stream
+        self.engine = engine
+        self.datetime_mode = datetime_mode
+        self.metrics = metrics if metrics is not None else MetricsRecorder()
+        self.workers = workers
+        self.schema_loader = schema_loader
+        self.fragment_cache = fragment_cache if fragment_cache is not None else default_fragment_cache()
+        self.table_cache = table_cache if table_cache is not None else default_table_cache()
+        self.group_m2m_targets = group_m2m_targets
+        self.delta_store = delta_store
+        self.validate_inputs = validate
+        self.reproducible = reproducible
 
         self._validate_paths()
+
+        if timestamp is None and reproducible:
+            timestamp = reproducible_timestamp(self.excel_path)
+        elif timestamp is not None:
+            # Entry times of the packages; checked before any output is written
+            check_date_time(timestamp.timetuple()[:6])
+        self.timestamp = timestamp
+
         self._load_resources()
 
     def _validate_paths(self) -> None:
         """Validate that required directories and files exist."""
-        if not self.project_dir.exists():
+        # The project directory is only needed for files not given explicitly
+        if not self.explicit_paths and not self.project_dir.exists():
             raise ValueError(f"Project directory not found: {self.project_dir}")
 
-        self.excel_path = self.project_dir / EXCEL_FILE_NAME
-        self.schema_path = self.project_dir / SCHEMA_FILE_NAME
-
         if not self.excel_path.exists():
             raise FileNotFoundError(f"Excel file not found: {self.excel_path}")
 
@@ -51,40 +237,57 @@ class ExcelToXmlConverter:
 
     def _load_resources(self) -> None:
         """Load schema and Excel data."""
-        print(f"Loading schema from {self.schema_path}...")
-        self.schema_loader = SchemaLoader(self.schema_path)
+        from .excel_loader import ExcelLoader
 
-        print(f"Loading Excel from {self.excel_path}...")
-        excel_loader = ExcelLoader(self.excel_path)
-        self.raw_tables = excel_loader.load_all_tables()
-        print(f"Found tables: {list(self.raw_tables.keys())}")
+        with self.metrics.stage("_load_resources") as stage:
+            if self.schema_loader is None:
+                print(f"Loading schema from {self.schema_path}...")
+                self.schema_loader = SchemaLoader(self.schema_path, cache=default_schema_cache())
+
+            print(f"Loading Excel from {self.excel_path}...")
+            excel_loader = ExcelLoader(self.excel_path, engine=self.engine, cache=self.table_cache)
+            self.raw_tables = excel_loader.load_all_tables()
+            print(f"Found tables: {list(self.raw_tables.keys())}")
+            stage.rows = sum(len(df) for df in self.raw_tables.values())
 
     def process(self) -> tuple[ET.Element, Path]:
         """
         Execute conversion process.
         
         Returns:
-            Tuple of (XML root element, output XML file path)
+            Tuple of (XML root element, output XML file path); the root
+            element is None in streaming mode
         """
         # Filter and prepare tables
-        self.filtered_tables = self._filter_tables()
+        self.filtered_tables = self._prepare_tables()
 
-        # Generate XML
-        self.xml_root = self._generate_xml()
+        if self.stream:
+            # Generate and save XML in one pass
+            self.xml_root = None
+            xml_output_path = self._stream_xml()
+        else:
+            # Generate XML
+            self.xml_root = self._generate_xml()
 
-        # Save XML
-        xml_output_path = self._save_xml()
+            # Save XML
+            xml_output_path = self._save_xml()
 
         return self.xml_root, xml_output_path
 
     def _filter_tables(self) -> Dict:
-        """Filter tables based on COLUMNS_TO_KEEP configuration."""
-        excel_loader = ExcelLoader(self.excel_path)
-        filtered = excel_loader.filter_tables(
-            self.raw_tables,
-            COLUMNS_TO_KEEP,
-            safe_str
-        )
+        """Filter tables based on the columns_to_keep configuration."""
+        from .excel_loader import ExcelLoader
+        from .utils import safe_str
+
+        with self.metrics.stage("_filter_tables") as stage:
+            excel_loader = ExcelLoader(self.excel_path, engine=self.engine)
+            filtered = excel_loader.filter_tables(
+                self.raw_tables,
+                self.columns_to_keep,
+                safe_str,
+                encoded_tables=self.schema_loader.entities_meta
+            )
+            stage.rows = sum(len(df) for df in filtered.values())
 
         print(f"\nFiltered tables:")
         for name, df in filtered.items():
@@ -94,43 +297,178 @@ class ExcelToXmlConverter:
 
         return filtered
 
-    def _generate_xml(self) -> ET.Element:
-        """Generate XML from filtered tables."""
-        print("\nGenerating XML...")
+    def _prepare_tables(self) -> Dict:
+        """Filter tables, then validate and reduce them to the delta if enabled."""
+        filtered = self._filter_tables()
+
+        if self.validate_inputs:
+            from .validation import format_issues
+
+            issues = self._validate_tables(filtered)
+            if issues:
+                raise ValueError(
+                    f"Validation found {len(issues)} problems:\n{format_issues(issues)}"
+                )
+
+        if self.delta_store is not None:
+            filtered = self._select_delta(filtered)
+
+        return filtered
+
+    def validate(self) -> List["ValidationIssue"]:
+        """
+        Check primary keys and references of the filtered tables.
+        
+        Finds missing and duplicate primary keys, lookups to records
+        missing from their target entity's table, partylist rows without
+        a parent record and M2M ids without a record. Entities without a
+        table in the workbook are not checked as lookup targets.
+        
+        Returns:
+            Problems found, empty if the tables are consistent
+        """
+        return self._validate_tables(self._filter_tables())
+
+    def _validate_tables(self, filtered: Dict) -> List["ValidationIssue"]:
+        """Run the integrity checks on filtered tables and print the result."""
+        from .validation import validate_tables
+        from .xml_generator import XMLGenerator
+
+        with self.metrics.stage("_validate_tables") as stage:
+            generator = XMLGenerator(
+                self.schema_loader.entities_meta,
+                self.schema_loader.entity_field_meta,
+                self.schema_loader.relationships_m2m,
+                datetime_mode=self.datetime_mode,
+                lookup_types=self.schema_loader.lookup_types
+            )
+            issues = validate_tables(generator, filtered, self.raw_tables)
+            stage.rows = sum(len(df) for df in filtered.values())
+
+        if not issues:
+            print("\n✓ Validation passed")
+        return issues
+
+    def _select_delta(self, filtered: Dict) -> Dict:
+        """Reduce filtered tables to records changed since the delta store's baseline."""
+        from .delta import select_delta
+        from .xml_generator import XMLGenerator
+
+        with self.metrics.stage("_select_delta") as stage:
+            # Metadata and settings only, no partylist index needed
+            generator = XMLGenerator(
+                self.schema_loader.entities_meta,
+                self.schema_loader.entity_field_meta,
+                self.schema_loader.relationships_m2m,
+                datetime_mode=self.datetime_mode,
+                lookup_types=self.schema_loader.lookup_types
+            )
+            delta, stats = select_delta(generator, filtered, self.raw_tables, self.delta_store)
+            stage.rows = sum(s.changed for s in stats)
+
+        print(f"\nDelta against {self.delta_store.path}:")
+        for s in stats:
+            print(f"  {s.entity}: {s.changed} of {s.total} records new or changed")
+
+        return delta
+
+    def _create_generator(self) -> "XMLGenerator":
+        """Create XML generator with the partylist index built."""
+        from .xml_generator import XMLGenerator
 
         generator = XMLGenerator(
             self.schema_loader.entities_meta,
             self.schema_loader.entity_field_meta,
-            self.schema_loader.relationships_m2m
+            self.schema_loader.relationships_m2m,
+            datetime_mode=self.datetime_mode,
+            metrics=self.metrics,
+            fragment_cache=self.fragment_cache,
+            group_m2m_targets=self.group_m2m_targets,
+            timestamp=self.timestamp,
+            reproducible_ids=self.reproducible,
+            lookup_types=self.schema_loader.lookup_types
         )
 
         # Build partylist index
         generator.build_partylist_index(self.raw_tables)
+        return generator
 
-        # Generate XML
-        root = generator.generate_xml(self.filtered_tables)
+    def _generate_xml(self) -> ET.Element:
+        """Generate XML from filtered tables."""
+        print("\nGenerating XML...")
+
+        with self.metrics.stage("_generate_xml") as stage:
+            generator = self._create_generator()
 
+            # Generate XML
+            root = generator.generate_xml(
+                self.filtered_tables,
+                workers=self.workers,
+                shard_size=RENDER_SHARD_SIZE
+            )
+            stage.rows = sum(len(ent) for ent in root.iterfind("entity/records"))
+
+        self._report_fragment_cache()
         print("✓ XML generated successfully")
         return root
 
+    def _report_fragment_cache(self) -> None:
+        """Print how many entities came from the fragment cache."""
+        cache = self.fragment_cache
+        if cache is not None:
+            print(f"  Fragment cache: {cache.hits} entities reused, {cache.misses} rendered")
+
     def _save_xml(self) -> Path:
         """Save XML to file."""
-        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-        output_path = OUTPUT_DIR / DATA_OUTPUT_FILE
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        output_path = self.output_dir / DATA_OUTPUT_FILE
 
-        tree = ET.ElementTree(self.xml_root)
-        tree.write(str(output_path), encoding='utf-8', xml_declaration=False)
+        with self.metrics.stage("_save_xml") as stage:
+            tree = ET.ElementTree(self.xml_root)
+            tree.write(str(output_path), encoding='utf-8', xml_declaration=False)
+            stage.bytes_written = output_path.stat().st_size
 
         print(f"✓ XML saved to {output_path}")
         return output_path
 
-    def create_zip(self, xml_path: Path, content_types_path: Optional[Path] = None) -> Path:
+    def _stream_xml(self) -> Path:
+        """Generate XML from filtered tables and write it to file as it is produced."""
+        print("\nGenerating XML (streaming)...")
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        output_path = self.output_dir / DATA_OUTPUT_FILE
+
+        with self.metrics.stage("_stream_xml") as stage:
+            generator = self._create_generator()
+
+            with open(output_path, "w", encoding="utf-8", errors="xmlcharrefreplace") as f:
+                generator.write_xml(
+                    self.filtered_tables, f,
+                    workers=self.workers,
+                    shard_size=RENDER_SHARD_SIZE
+                )
+
+            stage.rows = sum(len(df) for name, df in self.filtered_tables.items()
+                             if name in generator.entities_meta)
+            stage.bytes_written = output_path.stat().st_size
+
+        self._report_fragment_cache()
+        print(f"✓ XML streamed to {output_path}")
+        return output_path
+
+    def create_zip(
+        self,
+        xml_path: Path,
+        content_types_path: Optional[Path] = None,
+        compression: Optional[CompressionPolicy] = None
+    ) -> Path:
         """
         Create ZIP archive containing XML, schema, and content types.
         
         Args:
             xml_path: Path to data.xml
             content_types_path: Deprecated - not used, content types are built-in
+            compression: Compression policy (default from config)
             
         Returns:
             Path to created ZIP file
@@ -144,34 +482,502 @@ class ExcelToXmlConverter:
         if not self.schema_path.exists():
             raise FileNotFoundError(f"Schema file not found: {self.schema_path}")
 
-        OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-        zip_path = OUTPUT_DIR / ZIP_OUTPUT_FILE
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        zip_path = self.output_dir / ZIP_OUTPUT_FILE
+
+        compression = self._package_policy(compression)
 
-        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-            zf.write(xml_path, arcname=DATA_OUTPUT_FILE)
-            zf.write(self.schema_path, arcname=SCHEMA_FILE_NAME)
+        with self.metrics.stage("create_zip") as stage:
+            with open_zip(zip_path, compression) as zf:
+                write_file(zf, xml_path, DATA_OUTPUT_FILE, compression)
+                self._write_package_extras(zf, compression)
+            self._remove_stale_packages()
+            stage.bytes_written = zip_path.stat().st_size
+
+        print(f"✓ ZIP archive created: {zip_path}")
+        return zip_path
+
+    def create_package(
+        self,
+        keep_xml: bool = False,
+        compression: Optional[CompressionPolicy] = None
+    ) -> Path:
+        """
+        Generate XML straight into the ZIP archive in a single pass.
+        
+        The XML is streamed into the data.xml entry as it is produced, so
+        it is never written to disk uncompressed and read back.
+        
+        Args:
+            keep_xml: Also write the loose data.xml next to the archive
+            compression: Compression policy (default from config)
             
-            # Add built-in Content_Types.xml
-            zf.writestr("[Content_Types].xml", CONTENT_TYPES_XML)
+        Returns:
+            Path to created ZIP file
+        """
+        self.filtered_tables = self._prepare_tables()
+        self.xml_root = None
+
+        print("\nGenerating XML into ZIP archive...")
+
+        if not self.schema_path.exists():
+            raise FileNotFoundError(f"Schema file not found: {self.schema_path}")
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        zip_path = self.output_dir / ZIP_OUTPUT_FILE
+        xml_path = self.output_dir / DATA_OUTPUT_FILE
+
+        compression = self._package_policy(compression)
+
+        with self.metrics.stage("create_package") as stage:
+            generator = self._create_generator()
+
+            with open_zip(zip_path, compression) as zf:
+                with ExitStack() as stack:
+                    entry = stack.enter_context(open_entry(zf, DATA_OUTPUT_FILE, compression))
+                    stream = stack.enter_context(
+                        io.TextIOWrapper(entry, encoding="utf-8", errors="xmlcharrefreplace")
+                    )
+
+                    if keep_xml:
+                        loose = stack.enter_context(
+                            open(xml_path, "w", encoding="utf-8", errors="xmlcharrefreplace")
+                        )
+                        stream = TeeStream(stream, loose)
+
+                    generator.write_xml(
+                        self.filtered_tables, stream,
+                        workers=self.workers,
+                        shard_size=RENDER_SHARD_SIZE
+                    )
 
+                self._write_package_extras(zf, compression)
+            self._remove_stale_packages()
+
+            stage.rows = sum(len(df) for name, df in self.filtered_tables.items()
+                             if name in generator.entities_meta)
+            stage.bytes_written = zip_path.stat().st_size
+
+        self._report_fragment_cache()
+        if keep_xml:
+            print(f"✓ XML saved to {xml_path}")
         print(f"✓ ZIP archive created: {zip_path}")
         return zip_path
 
+    def create_packages(
+        self,
+        max_records: int,
+        compression: Optional[CompressionPolicy] = None
+    ) -> List[Path]:
+        """
+        Generate XML into several ZIP packages of at most max_records records.
+        
+        Entities and their records are split across data_001.zip,
+        data_002.zip, ... (PACKAGE_SHARD_FILE). Each package holds its own
+        data.xml with the M2M and partylist data of its records, plus the
+        schema and content types. Packages are streamed like
+        create_package(), in parallel when workers > 1.
+        
+        Args:
+            max_records: Entity records per package
+            compression: Compression policy (default from config)
+            
+        Returns:
+            Paths of the created packages in order
+        """
+        self.filtered_tables = self._prepare_tables()
+        self.xml_root = None
+
+        print("\nGenerating XML into packages...")
 
-def main(project: str = DEFAULT_PROJECT, create_zip_file: bool = True) -> None:
+        if not self.schema_path.exists():
+            raise FileNotFoundError(f"Schema file not found: {self.schema_path}")
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        compression = self._package_policy(compression)
+
+        with self.metrics.stage("create_packages") as stage:
+            generator = self._create_generator()
+            shards = generator.shard_tables(self.filtered_tables, max_records)
+            paths = [self.output_dir / PACKAGE_SHARD_FILE.format(i + 1) for i in range(len(shards))]
+            jobs = list(zip(shards, paths))
+
+            if self.workers > 1 and len(jobs) > 1:
+                with ProcessPoolExecutor(
+                    max_workers=min(self.workers, len(jobs)),
+                    initializer=_init_package_worker,
+                    initargs=(generator.worker_state(),)
+                ) as pool:
+                    futures = [
+                        pool.submit(_write_shard_package, tables, path, self.schema_path, compression)
+                        for tables, path in jobs
+                    ]
+                    for future in futures:
+                        future.result()
+            else:
+                for tables, path in jobs:
+                    _write_package(generator, tables, path, self.schema_path, compression)
+
+            # Packages left over from an earlier run with more shards or a single package
+            self._remove_stale_packages(first_shard=len(paths) + 1)
+            (self.output_dir / ZIP_OUTPUT_FILE).unlink(missing_ok=True)
+
+            stage.rows = sum(len(df) for name, df in self.filtered_tables.items()
+                             if name in generator.entities_meta)
+            stage.bytes_written = sum(path.stat().st_size for path in paths)
+
+        for path in paths:
+            print(f"✓ ZIP archive created: {path}")
+        return paths
+
+    def _remove_stale_packages(self, first_shard: int = 1) -> None:
+        """Delete split packages from first_shard on left over from an earlier run."""
+        shard = first_shard
+        while (self.output_dir / PACKAGE_SHARD_FILE.format(shard)).exists():
+            (self.output_dir / PACKAGE_SHARD_FILE.format(shard)).unlink()
+            shard += 1
+
+    def _package_policy(self, compression: Optional[CompressionPolicy]) -> CompressionPolicy:
+        """Compression policy, with entry times fixed to the run's timestamp if set."""
+        compression = compression or default_compression()
+        if self.timestamp is not None and compression.date_time is None:
+            compression = compression._replace(date_time=self.timestamp.timetuple()[:6])
+        return compression
+
+    def _write_package_extras(self, zf: zipfile.ZipFile, compression: CompressionPolicy) -> None:
+        """Add schema and content types to an open ZIP archive."""
+        _add_package_extras(zf, self.schema_path, compression)
+
+
+def _add_package_extras(zf: zipfile.ZipFile, schema_path: Path, compression: CompressionPolicy) -> None:
+    """Add schema and content types to an open ZIP archive."""
+    write_file(zf, schema_path, SCHEMA_FILE_NAME, compression)
+
+    # Add built-in Content_Types.xml
+    write_bytes(zf, "[Content_Types].xml", CONTENT_TYPES_XML.encode("utf-8"), compression)
+
+
+def _write_package(
+    generator: "XMLGenerator",
+    tables: Dict,
+    zip_path: Path,
+    schema_path: Path,
+    compression: CompressionPolicy
+) -> None:
+    """Stream the XML of tables into a new ZIP package."""
+    with open_zip(zip_path, compression) as zf:
+        with open_entry(zf, DATA_OUTPUT_FILE, compression) as entry:
+            with io.TextIOWrapper(entry, encoding="utf-8", errors="xmlcharrefreplace") as stream:
+                generator.write_xml(tables, stream)
+        _add_package_extras(zf, schema_path, compression)
+
+
+# Generator of a package worker process, set up by _init_package_worker
+_package_generator: Optional["XMLGenerator"] = None
+
+
+def _init_package_worker(state: Dict) -> None:
+    """Process pool initializer building the worker's generator."""
+    from .xml_generator import XMLGenerator
+
+    global _package_generator
+    _package_generator = XMLGenerator.from_worker_state(state)
+
+
+def _write_shard_package(
+    tables: Dict,
+    zip_path: Path,
+    schema_path: Path,
+    compression: CompressionPolicy
+) -> None:
+    """Write one package shard in a worker process."""
+    _write_package(_package_generator, tables, zip_path, schema_path, compression)
+
+
+def build_project(
+    project: str = DEFAULT_PROJECT,
+    input_dir: Path = INPUT_DIR,
+    output_dir: Path = OUTPUT_DIR,
+    create_zip_file: bool = True,
+    stream: bool = False,
+    direct_zip: bool = False,
+    keep_xml: bool = False,
+    compression: Optional[CompressionPolicy] = None,
+    engine: str = EXCEL_ENGINE,
+    datetime_mode: str = DATETIME_NORMALIZATION,
+    workers: int = RENDER_WORKERS,
+    metrics: Optional[MetricsRecorder] = None,
+    schema_loader: Optional[SchemaLoader] = None,
+    fragment_cache: Optional[FragmentCache] = None,
+    incremental: bool = INCREMENTAL_BUILD,
+    group_m2m_targets: bool = M2M_GROUP_TARGETS,
+    excel_path: Optional[Path] = None,
+    schema_path: Optional[Path] = None,
+    columns_to_keep: Optional[Dict[str, List[str]]] = None,
+    max_records_per_package: Optional[int] = PACKAGE_MAX_RECORDS,
+    delta_store: Optional[Path] = DELTA_STORE,
+    validate: bool = VALIDATE_INPUTS,
+    reproducible: bool = REPRODUCIBLE_OUTPUT,
+    timestamp: Optional[datetime] = None
+) -> Tuple[Path, bool]:
+    """
+    Convert a project, reusing the previous output if nothing changed.
+    
+    With incremental builds, the workbook and schema are hashed together
+    with the settings that affect the output. If they match the build
+    manifest next to the outputs and the recorded output is untouched,
+    the existing file is returned without loading the workbook.
+    
+    With a delta store, only records changed since the last delta run are
+    written. The store's baseline is updated once all outputs are written;
+    delta runs are never skipped as unchanged.
+    
+    Args:
+        project: Project directory name
+        input_dir: Directory containing project directories
+        output_dir: Directory for data.xml, data.zip and the manifest
+        create_zip_file: Whether to create the ZIP archive
+        stream: Write data.xml incrementally instead of building a tree
+        direct_zip: Generate XML straight into data.zip
+        keep_xml: With direct_zip, also keep the loose data.xml
+        compression: Compression policy (default from config)
+        engine: Workbook reader, 'openpyxl' or 'fast'
+        datetime_mode: Datetime normalization, 'all' or 'schema'
+        workers: Processes rendering entity records
+        metrics: Recorder for per-stage timing and memory
+        schema_loader: Already parsed schema of this project
+        fragment_cache: Cache of rendered entity records (default from config)
+        incremental: Skip the build when inputs are unchanged
+        group_m2m_targets: One <m2mrelationship> per source record and
+                           relationship
+        excel_path: Workbook to convert instead of the project's inputdata.xlsx
+        schema_path: Schema to use instead of the project's data_schema.xml
+        columns_to_keep: Column filter per entity (default from config)
+        max_records_per_package: Split the output into data_001.zip, ...
+                                 of at most this many records (None = one
+                                 data.zip)
+        delta_store: SQLite file of record hashes for delta output (None =
+                     all records)
+        validate: Check primary keys and references before generating XML
+        reproducible: Byte-identical output for identical inputs
+        timestamp: UTC time of the root element and ZIP entries (None =
+                   time of the run, or the workbook's modified time when
+                   reproducible)
+        
+    Returns:
+        Tuple of (data.zip path, data_001.zip when split, or data.xml
+        without ZIP; True if the existing output was reused)
+    """
+    output_dir = Path(output_dir)
+    compression = compression or default_compression()
+    columns_to_keep = COLUMNS_TO_KEEP if columns_to_keep is None else columns_to_keep
+    fingerprint = None
+
+    if max_records_per_package is not None and not create_zip_file:
+        raise ValueError("Splitting into packages requires ZIP output")
+
+    resolved_excel, resolved_schema = resolve_input_paths(project, input_dir, excel_path, schema_path)
+    if delta_store is not None:
+        # A delta output must not be reused later as a full one
+        remove_manifest(output_dir)
+    elif incremental and resolved_excel.exists() and resolved_schema.exists():
+        fingerprint = compute_fingerprint(resolved_excel, resolved_schema, {
+            "columns_to_keep": columns_to_keep,
+            "engine": engine,
+            "datetime_mode": datetime_mode,
+            "group_m2m_targets": group_m2m_targets,
+            "create_zip_file": create_zip_file,
+            "direct_zip": direct_zip,
+            "keep_xml": keep_xml,
+            "compression": [compression.mode, compression.level],
+            "max_records_per_package": max_records_per_package,
+            "validate": validate,
+            "reproducible": reproducible,
+            "timestamp": timestamp
+        })
+
+        existing = find_up_to_date_output(output_dir, fingerprint)
+        if existing is not None:
+            print(f"✓ Inputs unchanged, reusing {existing}")
+            return existing, True
+
+        remove_manifest(output_dir)
+
+    with ExitStack() as stack:
+        store = None
+        if delta_store is not None:
+            from .delta import RecordHashStore
+
+            store = RecordHashStore(delta_store)
+            stack.callback(store.close)
+
+        converter = ExcelToXmlConverter(
+            project,
+            stream=stream,
+            engine=engine,
+            datetime_mode=datetime_mode,
+            input_dir=input_dir,
+            output_dir=output_dir,
+            metrics=metrics,
+            workers=workers,
+            schema_loader=schema_loader,
+            fragment_cache=fragment_cache,
+            group_m2m_targets=group_m2m_targets,
+            excel_path=excel_path,
+            schema_path=schema_path,
+            columns_to_keep=columns_to_keep,
+            delta_store=store,
+            validate=validate,
+            reproducible=reproducible,
+            timestamp=timestamp
+        )
+
+        if max_records_per_package is not None:
+            outputs = converter.create_packages(max_records_per_package, compression=compression)
+        elif direct_zip and create_zip_file:
+            outputs = [converter.create_package(keep_xml=keep_xml, compression=compression)]
+        else:
+            _, output = converter.process()
+
+            if create_zip_file:
+                output = converter.create_zip(output, compression=compression)
+            outputs = [output]
+
+        # Only a delivered output moves the baseline forward
+        if store is not None:
+            store.commit()
+
+    if fingerprint is not None:
+        write_manifest(output_dir, fingerprint, outputs)
+
+    return outputs[0], False
+
+
+def main(
+    project: str = DEFAULT_PROJECT,
+    create_zip_file: bool = True,
+    stream: bool = False,
+    direct_zip: bool = False,
+    keep_xml: bool = False,
+    compression: str = ZIP_COMPRESSION,
+    compression_level: Optional[int] = ZIP_COMPRESSION_LEVEL,
+    metrics_file: Optional[Path] = METRICS_FILE,
+    trace_memory: bool = METRICS_TRACE_MEMORY,
+    print_metrics: bool = False,
+    workers: int = RENDER_WORKERS,
+    incremental: bool = INCREMENTAL_BUILD,
+    clear_cache: bool = False,
+    group_m2m_targets: bool = M2M_GROUP_TARGETS,
+    input_dir: Path = INPUT_DIR,
+    output_dir: Path = OUTPUT_DIR,
+    excel_path: Optional[Path] = None,
+    schema_path: Optional[Path] = None,
+    columns_to_keep: Optional[Dict[str, List[str]]] = None,
+    engine: str = EXCEL_ENGINE,
+    datetime_mode: str = DATETIME_NORMALIZATION,
+    zip_workers: Optional[int] = ZIP_WORKERS,
+    max_records_per_package: Optional[int] = PACKAGE_MAX_RECORDS,
+    delta_store: Optional[Path] = DELTA_STORE,
+    validate: bool = VALIDATE_INPUTS,
+    validate_only: bool = False,
+    reproducible: bool = REPRODUCIBLE_OUTPUT,
+    timestamp: Optional[datetime] = None
+) -> None:
     """
     Main execution function.
     
     Args:
         project: Project directory name
         create_zip_file: Whether to create ZIP archive
+        stream: Write data.xml incrementally instead of building a tree
+        direct_zip: Generate XML straight into data.zip (implies streaming)
+        keep_xml: With direct_zip, also keep the loose data.xml
+        compression: ZIP compression mode, 'store', 'deflate' or 'parallel'
+        compression_level: zlib level 0-9 (None = zlib default)
+        metrics_file: Write per-stage metrics as JSON to this path
+        trace_memory: Record peak memory per stage with tracemalloc
+        print_metrics: Print a timing line after every stage
+        workers: Processes rendering entity records in parallel
+        incremental: Reuse the existing output when inputs are unchanged
+        clear_cache: Delete cached entity fragments, workbook tables and
+                     compiled schemas before converting
+        group_m2m_targets: One <m2mrelationship> per source record and
+                           relationship
+        input_dir: Directory containing project directories
+        output_dir: Directory for data.xml and data.zip
+        excel_path: Workbook to convert instead of the project's inputdata.xlsx
+        schema_path: Schema to use instead of the project's data_schema.xml
+        columns_to_keep: Column filter per entity (default from config)
+        engine: Workbook reader, 'openpyxl' or 'fast'
+        datetime_mode: Datetime normalization, 'all' or 'schema'
+        zip_workers: Threads for 'parallel' compression (None = CPU count)
+        max_records_per_package: Split the output into data_001.zip, ...
+                                 of at most this many records
+        delta_store: Write only records changed since the last run with
+                     this record hash store
+        validate: Check primary keys and references before generating XML
+        validate_only: Only run the checks, without writing any output
+        reproducible: Byte-identical output for identical inputs
+        timestamp: UTC time of the root element and ZIP entries
     """
-    try:
-        converter = ExcelToXmlConverter(project)
-        xml_root, xml_path = converter.process()
+    metrics = MetricsRecorder(
+        hooks=[print_stage] if print_metrics else [],
+        trace_memory=trace_memory
+    )
 
-        if create_zip_file:
-            converter.create_zip(xml_path)
+    try:
+        policy = CompressionPolicy(
+            mode=compression,
+            level=compression_level,
+            workers=zip_workers
+        )
+        validate_policy(policy)
+
+        if clear_cache:
+            clear_caches()
+
+        if validate_only:
+            converter = ExcelToXmlConverter(
+                project,
+                engine=engine,
+                datetime_mode=datetime_mode,
+                input_dir=input_dir,
+                metrics=metrics,
+                excel_path=excel_path,
+                schema_path=schema_path,
+                columns_to_keep=columns_to_keep
+            )
+            issues = converter.validate()
+            if issues:
+                from .validation import format_issues
+
+                raise ValueError(f"Validation found {len(issues)} problems:\n{format_issues(issues)}")
+            return
+
+        build_project(
+            project,
+            input_dir=input_dir,
+            output_dir=output_dir,
+            create_zip_file=create_zip_file,
+            stream=stream,
+            direct_zip=direct_zip,
+            keep_xml=keep_xml,
+            compression=policy,
+            workers=workers,
+            metrics=metrics,
+            incremental=incremental,
+            group_m2m_targets=group_m2m_targets,
+            excel_path=excel_path,
+            schema_path=schema_path,
+            columns_to_keep=columns_to_keep,
+            engine=engine,
+            datetime_mode=datetime_mode,
+            max_records_per_package=max_records_per_package,
+            delta_store=delta_store,
+            validate=validate,
+            reproducible=reproducible,
+            timestamp=timestamp
+        )
 
         print("\n✓ Conversion completed successfully!")
 
@@ -181,6 +987,11 @@ def main(project: str = DEFAULT_PROJECT, create_zip_file: bool = True) -> None:
     except Exception as e:
         print(f"\n✗ Unexpected error: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        # Written on failure too, to show how far the run got
+        if metrics_file:
+            metrics.write_json(Path(metrics_file))
+            print(f"✓ Metrics written to {metrics_file}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,257 @@
+"""
+Delta packages: only records that changed since the previous run.
+
+Every record gets a content hash covering its row as rendered, its
+partylist rows and the M2M rows it is the source of. Hashes of the last delivered run
+are kept in a SQLite file (the baseline); records whose hash is new or
+different are emitted, all others are dropped before XML generation.
+"""
+
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .utils import safe_str_series
+from .xml_generator import XMLGenerator
+
+# Bump when record hashes change for the same inputs
+DELTA_FORMAT = 2
+
+# Rows per executemany() batch when staging hashes
+_STAGE_BATCH_SIZE = 100000
+
+
+class DeltaStats(NamedTuple):
+    """Records of one entity in a delta run."""
+
+    entity: str
+    total: int
+    changed: int
+
+
+def _salt(parts: Dict) -> np.uint64:
+    """64-bit hash of JSON-serializable settings mixed into record hashes."""
+    payload = json.dumps({"format": DELTA_FORMAT, **parts}, sort_keys=True, default=str)
+    return np.uint64(int.from_bytes(hashlib.sha256(payload.encode("utf-8")).digest()[:8], "little"))
+
+
+def _text_hashes(columns: List[np.ndarray]) -> np.ndarray:
+    """Hash rows of text columns, independent of the dtypes they were loaded with."""
+    frame = pd.DataFrame({i: values for i, values in enumerate(columns)})
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def _group_hashes(df: pd.DataFrame, key: pd.Series, ids: pd.Series) -> np.ndarray:
+    """Order-independent sum of row hashes per key value, aligned to ids."""
+    row_hashes = pd.Series(_text_hashes(
+        [safe_str_series(df[col]).to_numpy(dtype=object) for col in df.columns]
+    ))
+    sums = row_hashes.groupby(key.to_numpy()).sum()
+    return sums.reindex(ids.to_numpy(), fill_value=0).to_numpy(dtype=np.uint64)
+
+
+def record_hashes(
+    generator: XMLGenerator,
+    entity_name: str,
+    df: pd.DataFrame,
+    partylist_df: Optional[pd.DataFrame] = None,
+    m2m_items: List[Tuple[str, pd.DataFrame, Dict[str, str]]] = ()
+) -> Tuple[pd.Series, np.ndarray]:
+    """
+    Hash every record of an entity with the rows rendered alongside it.
+
+    The record row is hashed as the text the generator renders, so a
+    column changing dtype (e.g. int to float when a cell is blanked) does
+    not change the hash of records that render the same, while a cell
+    changing type (e.g. 1.0 to "1.0") does.
+
+    Args:
+        generator: Generator whose metadata and settings render the records
+        entity_name: Name of the entity
+        df: Filtered DataFrame with entity data
+        partylist_df: The entity's partylist table, if any
+        m2m_items: (relationship name, DataFrame, metadata) of M2M tables
+                   with this entity as source
+
+    Returns:
+        Tuple of (record ids as strings, uint64 hash per record)
+    """
+    pk = generator.entities_meta[entity_name]["primaryidfield"]
+    ids = safe_str_series(df[pk])
+    _, column_values = generator.encode_entity_columns(entity_name, df)
+
+    parts = {
+        "row": _text_hashes(column_values),
+        "partylist": np.zeros(len(df), dtype=np.uint64)
+    }
+
+    if partylist_df is not None and "activityid" in partylist_df.columns:
+        parts["partylist"] = _group_hashes(partylist_df, partylist_df["activityid"].map(str), ids)
+
+    # One column per relationship, so rows moving between relationships count
+    for i, (_, m2m_df, meta) in enumerate(m2m_items):
+        parts[f"m2m_{i}"] = _group_hashes(m2m_df, m2m_df[meta["sourceKey"]].map(str), ids)
+
+    salt = _salt({
+        "entity": entity_name,
+        "columns": [str(c) for c in df.columns],
+        "entity_meta": generator.entities_meta[entity_name],
+        "field_meta": generator.entity_field_meta.get(entity_name, {}),
+        "datetime_mode": generator.datetime_mode,
+        "relationships": [[rel_name, meta] for rel_name, _, meta in m2m_items]
+    })
+    hashes = pd.util.hash_pandas_object(pd.DataFrame(parts), index=False).to_numpy() ^ salt
+    return ids, hashes
+
+
+class RecordHashStore:
+    """
+    SQLite file of record hashes per entity and primary key.
+
+    changed() compares hashes of the current run against the stored
+    baseline and stages them; commit() makes the staged hashes the new
+    baseline. Until then the baseline is unchanged, so a failed run is
+    simply repeated in full.
+    """
+
+    def __init__(self, path: Path):
+        """
+        Open or create a store.
+
+        Args:
+            path: SQLite database file (created if missing)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS records (
+                entity TEXT NOT NULL,
+                record_id TEXT NOT NULL,
+                hash INTEGER NOT NULL,
+                PRIMARY KEY (entity, record_id)
+            ) WITHOUT ROWID;
+            CREATE TEMP TABLE staged (
+                entity TEXT NOT NULL,
+                record_id TEXT NOT NULL,
+                hash INTEGER NOT NULL
+            );
+        """)
+
+    def changed(self, entity_name: str, ids: pd.Series, hashes: np.ndarray) -> np.ndarray:
+        """
+        Find records that are new or differ from the baseline.
+
+        Args:
+            entity_name: Name of the entity
+            ids: Record ids as strings
+            hashes: uint64 hash per record
+
+        Returns:
+            Boolean mask of changed records, aligned to ids
+        """
+        # SQLite integers are signed 64-bit
+        signed = hashes.view(np.int64).tolist()
+        rows = list(zip(ids.tolist(), signed))
+
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (record_id TEXT NOT NULL, hash INTEGER NOT NULL)")
+        self.conn.execute("DELETE FROM incoming")
+        for start in range(0, len(rows), _STAGE_BATCH_SIZE):
+            self.conn.executemany(
+                "INSERT INTO incoming VALUES (?, ?)", rows[start:start + _STAGE_BATCH_SIZE]
+            )
+
+        changed_ids = {
+            record_id for (record_id,) in self.conn.execute(
+                """
+                SELECT i.record_id FROM incoming i
+                LEFT JOIN records r ON r.entity = ? AND r.record_id = i.record_id
+                WHERE r.hash IS NULL OR r.hash != i.hash
+                """,
+                (entity_name,)
+            )
+        }
+
+        self.conn.execute(
+            "INSERT INTO staged SELECT ?, record_id, hash FROM incoming", (entity_name,)
+        )
+        return ids.isin(changed_ids).to_numpy()
+
+    def commit(self) -> None:
+        """Make the hashes staged by changed() the new baseline."""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO records SELECT entity, record_id, hash FROM staged"
+        )
+        self.conn.execute("DELETE FROM staged")
+        self.conn.commit()
+
+    def rollback(self) -> None:
+        """Drop staged hashes, keeping the previous baseline."""
+        self.conn.execute("DELETE FROM staged")
+        self.conn.commit()
+
+    def count(self) -> int:
+        """Number of records in the baseline."""
+        return self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def close(self) -> None:
+        """Close the database."""
+        self.conn.close()
+
+
+def select_delta(
+    generator: XMLGenerator,
+    tables: Dict[str, pd.DataFrame],
+    raw_tables: Dict[str, pd.DataFrame],
+    store: RecordHashStore
+) -> Tuple[Dict[str, pd.DataFrame], List[DeltaStats]]:
+    """
+    Reduce filtered tables to records changed since the store's baseline.
+
+    M2M tables keep the rows whose source record is emitted. Partylist
+    rows need no filtering, they are rendered with their record. Tables
+    that are neither entities nor M2M relationships are left out.
+
+    Args:
+        generator: Generator that will render the tables
+        tables: Filtered tables
+        raw_tables: Loaded tables including partylist tables
+        store: Baseline of record hashes; hashes are staged, not committed
+
+    Returns:
+        Tuple of (tables with changed records only, statistics per entity)
+    """
+    entity_items, m2m_items = generator._plan_tables(tables)
+    m2m_by_source: Dict[str, list] = {}
+    for item in m2m_items:
+        m2m_by_source.setdefault(item[2]["sourceEntity"], []).append(item)
+
+    delta = {}
+    stats = []
+    emitted_ids: Dict[str, set] = {}
+
+    for name, df in entity_items:
+        ids, hashes = record_hashes(
+            generator, name, df,
+            partylist_df=raw_tables.get(f"partylist_{name}"),
+            m2m_items=m2m_by_source.get(name, [])
+        )
+        mask = store.changed(name, ids, hashes)
+        delta[name] = df[mask]
+        emitted_ids[name] = set(ids[mask])
+        stats.append(DeltaStats(name, len(df), int(mask.sum())))
+
+    for rel_name, df, meta in m2m_items:
+        source_ids = emitted_ids.get(meta["sourceEntity"])
+        if source_ids is None:
+            delta[rel_name] = df
+        else:
+            delta[rel_name] = df[df[meta["sourceKey"]].map(str).isin(source_ids)]
+
+    return delta, stats
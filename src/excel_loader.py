@@ -3,26 +3,46 @@ Excel file loading and processing.
 """
 
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Collection, Dict, List, Optional
 
 import pandas as pd
 from openpyxl import load_workbook
+from openpyxl.utils import range_boundaries
+
+from .config import ENGINES
+from .table_cache import TableCache, workbook_key
+from .utils import safe_str, safe_str_series
+from .xlsx_reader import FastXlsxReader, read_table_definitions
 
 
 class ExcelLoader:
     """Loads data from Excel files into DataFrames."""
 
-    def __init__(self, excel_path: Path):
+    def __init__(
+        self,
+        excel_path: Path,
+        engine: str = "openpyxl",
+        cache: Optional[TableCache] = None
+    ):
         """
         Initialize Excel loader.
         
         Args:
             excel_path: Path to Excel file
+            engine: Workbook reader - 'openpyxl' (read-only openpyxl) or
+                    'fast' (parses the sheet XML directly)
+            cache: Columnar cache of loaded tables keyed by workbook
+                   content; the workbook is not parsed on a cache hit
         """
         if not excel_path.exists():
             raise FileNotFoundError(f"Excel file not found: {excel_path}")
 
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown Excel engine '{engine}', expected one of {ENGINES}")
+
         self.excel_path = excel_path
+        self.engine = engine
+        self.cache = cache
 
     def load_all_tables(self) -> Dict[str, pd.DataFrame]:
         """
@@ -31,23 +51,67 @@ class ExcelLoader:
         Returns:
             Dictionary mapping table names to DataFrames
         """
-        wb = load_workbook(str(self.excel_path), data_only=True, read_only=False)
+        if self.cache is None:
+            return self._read_workbook()
+
+        key = workbook_key(self.excel_path, self.engine)
+        tables = self.cache.load(key)
+        if tables is not None:
+            print(f"Loaded tables from cache {self.cache.cache_dir / key}")
+            return tables
+
+        tables = self._read_workbook()
+        self.cache.store(key, tables)
+        return tables
+
+    def _read_workbook(self) -> Dict[str, pd.DataFrame]:
+        """Load all tables with the configured engine."""
+        if self.engine == "fast":
+            return FastXlsxReader(self.excel_path).load_all_tables()
+
+        return self._load_tables_openpyxl()
+
+    def _load_tables_openpyxl(self) -> Dict[str, pd.DataFrame]:
+        """
+        Load all tables with openpyxl.
+        
+        Table ranges are read from the table parts of the package and the
+        cells are streamed row by row from a read-only workbook, so no
+        cell objects are kept in memory.
+        
+        Returns:
+            Dictionary mapping table names to DataFrames
+        """
+        definitions = read_table_definitions(self.excel_path)
+        wb = load_workbook(str(self.excel_path), data_only=True, read_only=True)
         tables = {}
 
         try:
-            for worksheet in wb.worksheets:
-                for table_name, table in worksheet.tables.items():
-                    ref = table.ref if hasattr(table, 'ref') else table
-                    data = worksheet[ref]
-                    rows = [[cell.value for cell in row] for row in data]
+            for sheet_name, table_name, ref in definitions:
+                worksheet = wb[sheet_name]
+                min_col, min_row, max_col, max_row = range_boundaries(ref)
 
-                    if not rows:
-                        continue
+                rows = worksheet.iter_rows(
+                    min_row=min_row,
+                    max_row=max_row,
+                    min_col=min_col,
+                    max_col=max_col,
+                    values_only=True
+                )
 
-                    header = rows[0]
-                    body = rows[1:]
+                header = next(rows, None)
+                if header is None:
+                    continue
 
-                    tables[table_name] = pd.DataFrame(body, columns=header)
+                body = list(rows)
+
+                # Read-only sheets stop at the stored sheet dimension; the
+                # table range may extend past it with empty rows
+                missing = (max_row - min_row) - len(body)
+                if missing > 0:
+                    body.extend([(None,) * len(header)] * missing)
+
+                tables[table_name] = pd.DataFrame(body, columns=list(header))
 
         finally:
             wb.close()
@@ -58,7 +122,8 @@ class ExcelLoader:
         self,
         tables: Dict[str, pd.DataFrame],
         columns_to_keep: Dict[str, List[str]],
-        from_safe_str_func
+        from_safe_str_func,
+        encoded_tables: Collection[str] = ()
     ) -> Dict[str, pd.DataFrame]:
         """
         Filter tables based on columns_to_keep specification.
@@ -70,7 +135,11 @@ class ExcelLoader:
                            Empty list [] = include entity with all columns
                            Columns starting with '-' = exclude those
                            Otherwise = include specified columns only
-            from_safe_str_func: Function to convert values to strings
+            from_safe_str_func: Function to convert values to strings;
+                                utils.safe_str is applied column-wise
+                                via utils.safe_str_series
+            encoded_tables: Tables whose values are kept as loaded, because
+                            XMLGenerator encodes them by field type
             
         Returns:
             Filtered dictionary of DataFrames
@@ -112,9 +181,16 @@ class ExcelLoader:
 
             filtered_df = df[cols].copy()
 
+            if entity_name in encoded_tables:
+                filtered[entity_name] = filtered_df
+                continue
+
             # Convert all values to strings
             for column in filtered_df.columns:
-                filtered_df[column] = filtered_df[column].apply(from_safe_str_func)
+                if from_safe_str_func is safe_str:
+                    filtered_df[column] = safe_str_series(filtered_df[column])
+                else:
+                    filtered_df[column] = filtered_df[column].apply(from_safe_str_func)
 
             filtered[entity_name] = filtered_df
 
@@ -0,0 +1,216 @@
+"""
+On-disk cache of rendered entity XML fragments.
+"""
+
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Bump when a code change alters rendered records for unchanged inputs
+CACHE_VERSION = 3
+
+# Default size limit of a fragment cache directory
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+FRAGMENT_SUFFIX = ".xml"
+
+# Characters per read when a fragment is streamed from the cache
+FRAGMENT_READ_SIZE = 1 << 20
+
+
+def frame_digest(df: "pd.DataFrame") -> str:
+    """
+    Hash a DataFrame's column names, dtypes and row values in order.
+
+    Object columns are hashed by value with the type of each cell, as
+    values that hash alike (1.0 and "1.0") can render differently.
+
+    Args:
+        df: DataFrame to hash
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    import pandas as pd
+
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+
+    object_columns = [pos for pos, dtype in enumerate(df.dtypes) if dtype == object]
+    if object_columns:
+        cell_types = pd.DataFrame({
+            pos: [type(value).__name__ for value in df.iloc[:, pos].tolist()]
+            for pos in object_columns
+        })
+        digest.update(pd.util.hash_pandas_object(cell_types, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def fragment_key(parts: Dict[str, Any]) -> str:
+    """
+    Build a cache key from JSON-serializable key parts.
+
+    Args:
+        parts: Everything the cached fragment depends on
+
+    Returns:
+        Hex SHA-256 digest usable as a file name
+    """
+    payload = json.dumps({"version": CACHE_VERSION, **parts}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FragmentCache:
+    """
+    Directory of serialized XML fragments with a total size limit.
+
+    Each fragment is one file named after its key. Reading a fragment
+    refreshes its modification time, and when the directory grows past
+    max_bytes the least recently used fragments are deleted first.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize cache.
+
+        Args:
+            cache_dir: Cache directory (created if missing)
+            max_bytes: Size limit of all cached fragments together
+        """
+        if max_bytes <= 0:
+            raise ValueError(f"Cache size limit must be positive, got {max_bytes}")
+
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / (key + FRAGMENT_SUFFIX)
+
+    def contains(self, key: str) -> bool:
+        """Check whether a fragment is cached without counting a hit."""
+        return self._path(key).exists()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Read a cached fragment and mark it as recently used.
+
+        Returns:
+            Fragment text, or None if it is not cached
+        """
+        chunks = self.read_chunks(key)
+        return None if chunks is None else "".join(chunks)
+
+    def read_chunks(self, key: str, size: int = FRAGMENT_READ_SIZE) -> Optional[Iterator[str]]:
+        """
+        Stream a cached fragment and mark it as recently used.
+
+        The file is opened right away, so a fragment evicted afterwards
+        is still read completely.
+
+        Args:
+            key: Fragment key
+            size: Characters per chunk
+
+        Returns:
+            Iterator over the fragment text in chunks, or None if it is not cached
+        """
+        path = self._path(key)
+        try:
+            f = open(path, encoding="utf-8", newline="")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        os.utime(path)
+        self.hits += 1
+
+        def chunks() -> Iterator[str]:
+            with f:
+                yield from iter(lambda: f.read(size), "")
+
+        return chunks()
+
+    @contextmanager
+    def writer(self, key: str) -> Iterator[TextIO]:
+        """
+        Write a fragment incrementally.
+
+        The fragment is stored when the block completes, evicting least
+        recently used ones over the limit. It is discarded if the block
+        raises or the fragment is larger than the whole cache.
+
+        Args:
+            key: Fragment key
+
+        Yields:
+            Text stream receiving the fragment
+        """
+        path = self._path(key)
+        # Write then rename so concurrent readers never see partial fragments
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8", newline="") as f:
+                yield f
+            if tmp.stat().st_size > self.max_bytes:
+                return
+            os.replace(tmp, path)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+        self._evict()
+
+    def put(self, key: str, fragment: str) -> None:
+        """
+        Store a fragment, evicting least recently used ones over the limit.
+
+        Fragments larger than the whole cache are not stored.
+        """
+        with self.writer(key) as f:
+            f.write(fragment)
+
+    def _entries(self) -> List[Tuple[int, int, Path]]:
+        """Cached fragments as (mtime ns, size, path), least recently used first."""
+        entries = []
+        for path in self.cache_dir.glob("*" + FRAGMENT_SUFFIX):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return sorted(entries)
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def size(self) -> int:
+        """Total size of cached fragments in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self) -> int:
+        """
+        Delete all cached fragments.
+
+        Returns:
+            Number of fragments deleted
+        """
+        entries = self._entries()
+        for _, _, path in entries:
+            path.unlink(missing_ok=True)
+        return len(entries)
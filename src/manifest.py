@@ -0,0 +1,124 @@
+"""
+Build manifest for incremental rebuilds.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Union
+
+from . import __version__
+from .config import MANIFEST_FILE
+
+# Bump when the manifest layout changes; output changes between releases
+# are covered by the package version in the fingerprint
+MANIFEST_VERSION = 3
+
+# Bytes read at a time when hashing input files
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_sha256(path: Path) -> str:
+    """Return the hex SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compute_fingerprint(
+    excel_path: Path,
+    schema_path: Path,
+    settings: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Fingerprint the inputs and effective settings of a build.
+
+    Args:
+        excel_path: Path to inputdata.xlsx
+        schema_path: Path to data_schema.xml
+        settings: JSON-serializable settings that affect the output
+
+    Returns:
+        Dictionary that is equal for two builds producing the same output
+        with the same package version
+    """
+    return {
+        "version": MANIFEST_VERSION,
+        "package_version": __version__,
+        "excel_sha256": file_sha256(excel_path),
+        "schema_sha256": file_sha256(schema_path),
+        # Round trip through JSON so tuples and lists compare equal to a loaded manifest
+        "settings": json.loads(json.dumps(settings, sort_keys=True, default=str))
+    }
+
+
+def _output_stat(path: Path) -> Dict[str, int]:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def find_up_to_date_output(output_dir: Path, fingerprint: Dict[str, Any]) -> Optional[Path]:
+    """
+    Return the output recorded in the manifest if it is still valid.
+
+    The output is valid when the manifest fingerprint equals the given one
+    and no output file has been changed or removed since it was built.
+
+    Args:
+        output_dir: Directory holding the outputs and the manifest
+        fingerprint: Fingerprint of the build about to run
+
+    Returns:
+        Path of the existing (first) output, or None if a rebuild is needed
+    """
+    manifest_path = Path(output_dir) / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("fingerprint") != fingerprint:
+        return None
+
+    outputs = manifest.get("outputs") or []
+    paths = [Path(output_dir) / entry.get("name", "") for entry in outputs]
+    for path, entry in zip(paths, outputs):
+        if not path.is_file() or _output_stat(path) != entry.get("stat"):
+            return None
+
+    return paths[0] if paths else None
+
+
+def write_manifest(
+    output_dir: Path,
+    fingerprint: Dict[str, Any],
+    outputs: Union[Path, Sequence[Path]]
+) -> None:
+    """
+    Record a finished build.
+
+    Args:
+        output_dir: Directory holding the outputs
+        fingerprint: Fingerprint of the build
+        outputs: Output file or files produced by the build (inside output_dir)
+    """
+    if isinstance(outputs, Path):
+        outputs = [outputs]
+
+    manifest = {
+        "fingerprint": fingerprint,
+        "outputs": [{"name": path.name, "stat": _output_stat(path)} for path in outputs]
+    }
+    (Path(output_dir) / MANIFEST_FILE).write_text(
+        json.dumps(manifest, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+    )
+
+
+def remove_manifest(output_dir: Path) -> None:
+    """Delete the manifest so an interrupted rebuild is never taken as current."""
+    (Path(output_dir) / MANIFEST_FILE).unlink(missing_ok=True)
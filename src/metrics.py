@@ -0,0 +1,179 @@
+"""
+Per-stage timing and memory instrumentation.
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, TextIO
+
+
+class StageMetrics(NamedTuple):
+    """Measurements of one finished stage."""
+
+    stage: str
+    entity: Optional[str]
+    wall_seconds: float
+    cpu_seconds: float
+    rows: Optional[int]
+    bytes_written: Optional[int]
+    peak_memory: Optional[int]   # bytes above the stage start, None without tracing
+
+
+# Called with every finished stage
+MetricsHook = Callable[[StageMetrics], None]
+
+
+class StageCounters:
+    """Counters a running stage fills in."""
+
+    def __init__(self):
+        self.rows: Optional[int] = None
+        self.bytes_written: Optional[int] = None
+
+
+class MetricsRecorder:
+    """
+    Records wall time, CPU time, row and byte counts and peak memory per stage.
+
+    Stages may nest (per-entity stages inside XML generation); each one is
+    reported to the hooks when it finishes and kept in ``records``.
+    """
+
+    def __init__(self, hooks: Sequence[MetricsHook] = (), trace_memory: bool = False):
+        """
+        Initialize recorder.
+
+        Args:
+            hooks: Callables receiving each finished StageMetrics
+            trace_memory: Track peak memory with tracemalloc (slows
+                          allocation-heavy stages down noticeably)
+        """
+        self.hooks: List[MetricsHook] = list(hooks)
+        self.trace_memory = trace_memory
+        self.records: List[StageMetrics] = []
+        # Stack of [traced memory at start, highest traced peak seen so far]
+        self._memory_stack: List[List[int]] = []
+        self._started_tracing = False
+
+    def add_hook(self, hook: MetricsHook) -> None:
+        """Register a callable receiving each finished stage."""
+        self.hooks.append(hook)
+
+    def _enter_memory(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+        current, peak = tracemalloc.get_traced_memory()
+        if self._memory_stack:
+            parent = self._memory_stack[-1]
+            parent[1] = max(parent[1], peak)
+        # Python 3.8 cannot reset the peak; stage peaks are then upper bounds
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        self._memory_stack.append([current, current])
+
+    def _exit_memory(self) -> int:
+        start, peak = self._memory_stack.pop()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+
+        if self._memory_stack:
+            parent = self._memory_stack[-1]
+            parent[1] = max(parent[1], peak)
+        elif self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+        return max(peak - start, 0)
+
+    @contextmanager
+    def stage(self, name: str, entity: Optional[str] = None) -> Iterator[StageCounters]:
+        """
+        Measure the enclosed block as one stage.
+
+        Args:
+            name: Stage name
+            entity: Entity the stage works on, if any
+
+        Yields:
+            StageCounters for the block to set rows and bytes written
+        """
+        counters = StageCounters()
+        if self.trace_memory:
+            self._enter_memory()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield counters
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            peak = self._exit_memory() if self.trace_memory else None
+
+            metrics = StageMetrics(
+                stage=name,
+                entity=entity,
+                wall_seconds=wall,
+                cpu_seconds=cpu,
+                rows=counters.rows,
+                bytes_written=counters.bytes_written,
+                peak_memory=peak
+            )
+            self.records.append(metrics)
+            for hook in self.hooks:
+                hook(metrics)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Recorded stages as a JSON-serializable dictionary."""
+        return {
+            "trace_memory": self.trace_memory,
+            "stages": [m._asdict() for m in self.records]
+        }
+
+    def write_json(self, path: Path) -> None:
+        """
+        Write recorded stages to a JSON metrics file.
+
+        Args:
+            path: Output file path
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2) + "\n", encoding="utf-8")
+
+
+def print_stage(metrics: StageMetrics, file: TextIO = sys.stdout) -> None:
+    """Hook printing a one-line summary of each finished stage."""
+    label = f"{metrics.stage}[{metrics.entity}]" if metrics.entity else metrics.stage
+    parts = [f"{metrics.wall_seconds:.3f}s wall", f"{metrics.cpu_seconds:.3f}s cpu"]
+    if metrics.rows is not None:
+        parts.append(f"{metrics.rows} rows")
+    if metrics.bytes_written is not None:
+        parts.append(f"{metrics.bytes_written} bytes")
+    if metrics.peak_memory is not None:
+        parts.append(f"{metrics.peak_memory / 2**20:.1f} MB peak")
+    print(f"  ⏱ {label}: {', '.join(parts)}", file=file)
+
+
+class CountingStream:
+    """Text stream wrapper counting the UTF-8 bytes written through it."""
+
+    def __init__(self, stream: TextIO):
+        """
+        Initialize wrapper.
+
+        Args:
+            stream: Text stream receiving the writes
+        """
+        self.stream = stream
+        self.bytes_written = 0
+
+    def write(self, text: str) -> int:
+        """Write text and count its encoded size."""
+        self.bytes_written += len(text) if text.isascii() else len(text.encode("utf-8"))
+        return self.stream.write(text)
@@ -2,75 +2,292 @@
 Schema loading and metadata extraction.
 """
 
+import json
+import os
 import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+
+from .manifest import file_sha256
+
+# Bump when CompiledSchema or compile_schema() output changes
+SCHEMA_CACHE_FORMAT = 2
+
+SCHEMA_CACHE_SUFFIX = ".json"
+
+
+class CompiledSchema(NamedTuple):
+    """Schema metadata needed for conversion, without the XML tree."""
+
+    entities_meta: Dict[str, Dict[str, Any]]
+    entity_field_meta: Dict[str, Dict[str, Dict[str, Any]]]
+    relationships_m2m: Dict[str, Dict[str, str]]
+    # Entity -> field -> lookup entities from lookupType, split on '|'
+    lookup_types: Dict[str, Dict[str, Tuple[str, ...]]]
+
+
+def compile_schema(schema_path: Path) -> CompiledSchema:
+    """
+    Extract schema metadata in a single pass over the XML.
+    
+    Elements are discarded after each entity, so memory use does not
+    grow with the size of the schema file.
+    
+    Args:
+        schema_path: Path to schema.xml file
+        
+    Returns:
+        CompiledSchema of the schema
+    """
+    entities_meta = {}
+    entity_field_meta = {}
+    relationships_m2m = {}
+    lookup_types = {}
+
+    path: List[str] = []
+    root = None
+    entity_name = None
+    primary_key = None
+    fields_seen = False
+    in_fields = False
+
+    for event, elem in ET.iterparse(str(schema_path), events=("start", "end")):
+        if event == "end":
+            path.pop()
+            if len(path) == 1:
+                # Top-level element done, drop it from the tree
+                root.clear()
+            continue
+
+        path.append(elem.tag)
+        depth = len(path)
+
+        if depth == 1:
+            root = elem
+
+        elif depth == 2 and elem.tag == "entity":
+            entity_name = elem.get('name')
+            primary_key = elem.get('primaryidfield')
+            entities_meta[entity_name] = {
+                'displayname': elem.get('displayname'),
+                'primaryidfield': primary_key
+            }
+            entity_field_meta[entity_name] = {}
+            lookup_types[entity_name] = {}
+            fields_seen = False
+
+        elif depth == 3 and path[1] == "entity" and elem.tag == "fields":
+            # Only the first <fields> element of an entity is read
+            in_fields = not fields_seen
+            fields_seen = True
+
+        elif depth == 4 and path[1] == "entity":
+            if path[2] == "fields" and elem.tag == "field" and in_fields:
+                field_name = elem.get('name')
+                meta = {'type': elem.get('type')}
+
+                lookup_type = elem.get('lookupType')
+                if lookup_type:
+                    meta['lookupType'] = lookup_type
+                    lookup_types[entity_name][field_name] = tuple(lookup_type.split('|'))
+
+                meta['displayname'] = elem.get('displayname')
+                entity_field_meta[entity_name][field_name] = meta
+
+            elif (path[2] == "relationships" and elem.tag == "relationship"
+                  and elem.get('manyToMany') == 'true'):
+                relationships_m2m[elem.get('relatedEntityName')] = {
+                    'sourceEntity': entity_name,
+                    'sourceKey': primary_key,
+                    'targetEntity': elem.get('m2mTargetEntity'),
+                    'targetKey': elem.get('m2mTargetEntityPrimaryKey')
+                }
+
+    return CompiledSchema(entities_meta, entity_field_meta, relationships_m2m, lookup_types)
+
+
+def split_lookup_types(
+    entity_field_meta: Dict[str, Dict[str, Dict[str, Any]]]
+) -> Dict[str, Dict[str, Tuple[str, ...]]]:
+    """
+    Split the lookupType of every field on '|', as compile_schema() does.
+    
+    Args:
+        entity_field_meta: Field metadata by entity and field name
+        
+    Returns:
+        Entity -> field -> lookup entities, for fields with a lookupType
+    """
+    return {
+        entity_name: {
+            field_name: tuple(str(meta['lookupType']).split('|'))
+            for field_name, meta in fields.items() if meta.get('lookupType')
+        }
+        for entity_name, fields in entity_field_meta.items()
+    }
+
+
+def schema_to_dict(compiled: CompiledSchema) -> Dict[str, Any]:
+    """
+    Convert a compiled schema to JSON-serializable data.
+    
+    Args:
+        compiled: Compiled schema
+        
+    Returns:
+        Dictionary with the format version and the CompiledSchema fields
+    """
+    return {"format": SCHEMA_CACHE_FORMAT, **compiled._asdict()}
+
+
+def schema_from_dict(data: Dict[str, Any]) -> CompiledSchema:
+    """
+    Rebuild a compiled schema from schema_to_dict() output.
+    
+    Args:
+        data: Dictionary as read from JSON
+        
+    Returns:
+        CompiledSchema
+        
+    Raises:
+        ValueError: If the data has another format version or layout
+    """
+    if not isinstance(data, dict) or data.get("format") != SCHEMA_CACHE_FORMAT:
+        raise ValueError("Unsupported compiled schema format")
+
+    try:
+        return CompiledSchema(
+            entities_meta=dict(data["entities_meta"]),
+            entity_field_meta=dict(data["entity_field_meta"]),
+            relationships_m2m=dict(data["relationships_m2m"]),
+            lookup_types={
+                entity: {field: tuple(types) for field, types in fields.items()}
+                for entity, fields in data["lookup_types"].items()
+            }
+        )
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Invalid compiled schema: {e}")
+
+
+def schema_key(schema_path: Path) -> str:
+    """
+    Cache key of a schema: its content hash and the cache format.
+    
+    Args:
+        schema_path: Path to schema.xml file
+        
+    Returns:
+        Key usable as a file name
+    """
+    return f"{file_sha256(schema_path)}-v{SCHEMA_CACHE_FORMAT}"
+
+
+class SchemaCache:
+    """
+    Directory of compiled schemas, one JSON file per schema content.
+    
+    Entries are keyed by schema content, so an edited schema is compiled
+    again and stored under a new key.
+    """
+
+    def __init__(self, cache_dir: Path):
+        """
+        Initialize cache.
+        
+        Args:
+            cache_dir: Cache directory (created if missing)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / (key + SCHEMA_CACHE_SUFFIX)
+
+    def load(self, key: str) -> Optional[CompiledSchema]:
+        """
+        Read a compiled schema.
+        
+        Returns:
+            CompiledSchema, or None if it is not cached or unreadable
+        """
+        try:
+            return schema_from_dict(json.loads(self._path(key).read_text(encoding="utf-8")))
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key: str, compiled: CompiledSchema) -> None:
+        """Write a compiled schema."""
+        path = self._path(key)
+        # Write then rename so concurrent readers never see partial files
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(schema_to_dict(compiled)), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def clear(self) -> int:
+        """
+        Delete all compiled schemas.
+        
+        Returns:
+            Number of entries deleted
+        """
+        entries = list(self.cache_dir.glob("*" + SCHEMA_CACHE_SUFFIX))
+        for path in entries:
+            path.unlink(missing_ok=True)
+        return len(entries)
 
 
 class SchemaLoader:
     """Loads and parses XML schema for entity definitions."""
 
-    def __init__(self, schema_path: Path):
+    def __init__(
+        self,
+        schema_path: Path,
+        cache: Optional[SchemaCache] = None,
+        compiled: Optional[CompiledSchema] = None
+    ):
         """
         Initialize schema loader.
         
         Args:
             schema_path: Path to schema.xml file
+            cache: Cache of compiled schemas; the schema is compiled from
+                   the XML only when it is not cached
+            compiled: Already compiled content of schema_path; neither
+                      the cache nor the XML is read
         """
         if not schema_path.exists():
             raise FileNotFoundError(f"Schema file not found: {schema_path}")
 
-        self.schema_tree = ET.parse(str(schema_path))
-        self.schema_root = self.schema_tree.getroot()
-        self._load_metadata()
-
-    def _load_metadata(self) -> None:
-        """Load and organize schema metadata."""
-        self.entities_meta = {}
-        self.entity_field_meta = {}
-        self.relationships_m2m = {}
-
-        # Load entity metadata
-        for entity in self.schema_root.findall('entity'):
-            name = entity.get('name')
-            self.entities_meta[name] = {
-                'displayname': entity.get('displayname'),
-                'primaryidfield': entity.get('primaryidfield')
-            }
+        self.schema_path = Path(schema_path)
+        self._schema_tree = None
 
-        # Load field metadata
-        for entity in self.schema_root.findall('entity'):
-            entity_name = entity.get('name')
-            self.entity_field_meta[entity_name] = {}
+        if compiled is None and cache is not None:
+            key = schema_key(self.schema_path)
+            compiled = cache.load(key)
 
-            fields = entity.find('fields')
-            if fields is None:
-                continue
+        if compiled is None:
+            compiled = compile_schema(self.schema_path)
+            if cache is not None:
+                cache.store(key, compiled)
 
-            for field in fields.findall('field'):
-                field_name = field.get('name')
-                meta = {'type': field.get('type')}
+        self.compiled = compiled
+        self.entities_meta = compiled.entities_meta
+        self.entity_field_meta = compiled.entity_field_meta
+        self.relationships_m2m = compiled.relationships_m2m
+        self.lookup_types = compiled.lookup_types
 
-                if field.get('lookupType'):
-                    meta['lookupType'] = field.get('lookupType')
+    @property
+    def schema_tree(self) -> ET.ElementTree:
+        """Parsed schema XML, loaded on first access."""
+        if self._schema_tree is None:
+            self._schema_tree = ET.parse(str(self.schema_path))
+        return self._schema_tree
 
-                meta['displayname'] = field.get('displayname')
-                self.entity_field_meta[entity_name][field_name] = meta
-
-        # Load many-to-many relationships
-        for entity in self.schema_root.findall('entity'):
-            src = entity.get('name')
-            pk = entity.get('primaryidfield')
-
-            for rel in entity.findall('relationships/relationship'):
-                if rel.get('manyToMany') == 'true':
-                    rel_name = rel.get('relatedEntityName')
-                    self.relationships_m2m[rel_name] = {
-                        'sourceEntity': src,
-                        'sourceKey': pk,
-                        'targetEntity': rel.get('m2mTargetEntity'),
-                        'targetKey': rel.get('m2mTargetEntityPrimaryKey')
-                    }
+    @property
+    def schema_root(self) -> ET.Element:
+        """Root element of the schema XML, loaded on first access."""
+        return self.schema_tree.getroot()
 
     def get_entity_meta(self, entity_name: str) -> Dict[str, Any]:
         """Get metadata for an entity."""
@@ -83,3 +300,7 @@ class SchemaLoader:
     def get_m2m_relationships(self) -> Dict[str, Dict[str, str]]:
         """Get all many-to-many relationships."""
         return self.relationships_m2m
+
+    def get_lookup_types(self, entity_name: str, field_name: str) -> Tuple[str, ...]:
+        """Get the lookup entities of a field (empty if it has no lookupType)."""
+        return self.lookup_types.get(entity_name, {}).get(field_name, ())
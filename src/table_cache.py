@@ -0,0 +1,297 @@
+"""
+Columnar cache of loaded workbook tables (Arrow IPC files).
+
+Requires the optional pyarrow dependency.
+"""
+
+import datetime as dt
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # optional dependency
+    pa = None
+
+# Bump when the stored layout or the loaded tables change for the same workbook
+CACHE_FORMAT = 2
+
+# Default size limit of a table cache directory
+DEFAULT_MAX_BYTES = 2 * 2**30
+
+INDEX_FILE = "index.json"
+METADATA_KEY = b"table_cache"
+
+# Python types of object column values, stored as children of a dense
+# union array by type code (0 holds the None values)
+_OBJECT_TYPES = (type(None), str, int, float, bool, dt.datetime, dt.date, dt.time, dt.timedelta)
+_OBJECT_TYPE_CODES = {t: code for code, t in enumerate(_OBJECT_TYPES)}
+
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+def workbook_key(excel_path: Path, engine: str) -> str:
+    """
+    Cache key of a workbook: its content hash, the reader and the cache format.
+
+    Args:
+        excel_path: Path to Excel file
+        engine: Workbook reader the tables were loaded with
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    digest = hashlib.sha256(f"{CACHE_FORMAT}:{engine}:".encode("utf-8"))
+    with open(excel_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _encode_objects(values: List[Any]) -> "pa.UnionArray":
+    """
+    Store Python objects as a dense union with one typed child per value type.
+
+    Raises:
+        TypeError: for values of types not in _OBJECT_TYPES
+    """
+    try:
+        codes = np.fromiter((_OBJECT_TYPE_CODES[type(v)] for v in values), dtype=np.int8, count=len(values))
+    except KeyError as e:
+        raise TypeError(f"unsupported value type {e.args[0].__name__} in object column")
+
+    offsets = np.zeros(len(values), dtype=np.int32)
+    type_codes = []
+    children = []
+    for code in np.unique(codes).tolist():
+        rows = np.flatnonzero(codes == code)
+        offsets[rows] = np.arange(len(rows), dtype=np.int32)
+        type_codes.append(code)
+        if code == 0:
+            children.append(pa.nulls(len(rows)))
+        else:
+            children.append(pa.array([values[i] for i in rows.tolist()]))
+
+    return pa.UnionArray.from_dense(
+        pa.array(codes, type=pa.int8()),
+        pa.array(offsets, type=pa.int32()),
+        children,
+        field_names=[_OBJECT_TYPES[code].__name__ for code in type_codes],
+        type_codes=type_codes
+    )
+
+
+def _decode_objects(array: "pa.ChunkedArray") -> np.ndarray:
+    """Restore Python objects stored by _encode_objects()."""
+    values = np.empty(len(array), dtype=object)
+    start = 0
+
+    for chunk in array.chunks:
+        codes = chunk.type_codes.to_numpy()
+        offsets = chunk.offsets.to_numpy()
+        part = values[start:start + len(chunk)]
+
+        for i, code in enumerate(chunk.type.type_codes):
+            if code == 0:
+                continue
+            rows = codes == code
+            # Assigning into an object array converts to Python scalars,
+            # e.g. datetime64 to datetime.datetime
+            child = np.empty(len(chunk.field(i)), dtype=object)
+            child[:] = chunk.field(i).to_numpy(zero_copy_only=False)
+            part[rows] = child[offsets[rows]]
+
+        start += len(chunk)
+
+    return values
+
+
+def _encode_column(series: pd.Series) -> Dict[str, Any]:
+    """
+    Convert a column to an Arrow array that restores to the same values.
+
+    Returns:
+        Dictionary with the 'array' and its 'encoding': 'arrow' (typed
+        column) or 'objects' (Python objects as a dense union)
+    """
+    if series.dtype == object:
+        return {"encoding": "objects", "array": _encode_objects(series.tolist())}
+
+    if series.dtype.kind == "f":
+        # Keep NaN as a value instead of a null, so floats load without a copy
+        return {"encoding": "arrow", "array": pa.array(series.to_numpy())}
+
+    return {"encoding": "arrow", "array": pa.Array.from_pandas(series)}
+
+
+def _decode_column(array: "pa.ChunkedArray", encoding: str, dtype: str) -> Any:
+    """
+    Restore column values stored by _encode_column().
+
+    Typed columns without nulls keep referring to the Arrow buffers
+    (memory-mapped when read from the cache); strings stay Arrow-backed.
+    """
+    if encoding == "arrow":
+        return array.to_pandas().astype(dtype)
+    return _decode_objects(array)
+
+
+def _frame_to_arrow(df: pd.DataFrame) -> "pa.Table":
+    """Convert a DataFrame to an Arrow table with column metadata."""
+    arrays = []
+    columns = []
+
+    for i, name in enumerate(df.columns):
+        encoded = _encode_column(df.iloc[:, i])
+        arrays.append(encoded["array"])
+        columns.append({
+            "name": name,
+            "dtype": str(df.dtypes.iloc[i]),
+            "encoding": encoded["encoding"]
+        })
+
+    metadata = {METADATA_KEY: json.dumps({"columns": columns, "rows": len(df)}).encode("utf-8")}
+    return pa.Table.from_arrays(arrays, names=[f"c{i}" for i in range(len(arrays))], metadata=metadata)
+
+
+def _arrow_to_frame(table: "pa.Table") -> pd.DataFrame:
+    """Restore a DataFrame written by _frame_to_arrow()."""
+    meta = json.loads(table.schema.metadata[METADATA_KEY])
+    data = {
+        i: _decode_column(table.column(i), col["encoding"], col["dtype"])
+        for i, col in enumerate(meta["columns"])
+    }
+
+    df = pd.DataFrame(data, index=pd.RangeIndex(meta["rows"]))
+    df.columns = [col["name"] for col in meta["columns"]]
+    return df
+
+
+class TableCache:
+    """
+    Directory of loaded workbook tables, one Arrow IPC file per table.
+
+    Entries are keyed by workbook content, so any edit to the workbook
+    misses the cache. Files are memory-mapped when read. Reading an entry
+    marks it as recently used; least recently used entries are deleted
+    when the directory grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize cache.
+
+        Args:
+            cache_dir: Cache directory (created if missing)
+            max_bytes: Size limit of all entries together
+        """
+        if pa is None:
+            raise ImportError("The table cache requires pyarrow (pip install pyarrow)")
+
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+    def load(self, key: str) -> Optional[Dict[str, pd.DataFrame]]:
+        """
+        Read cached tables.
+
+        Args:
+            key: Key from workbook_key()
+
+        Returns:
+            Dictionary mapping table names to DataFrames, or None if not cached
+        """
+        entry = self.cache_dir / key
+        index_path = entry / INDEX_FILE
+
+        try:
+            index = json.loads(index_path.read_text(encoding="utf-8"))
+            tables = {}
+            for item in index["tables"]:
+                with pa.memory_map(str(entry / item["file"])) as source:
+                    tables[item["name"]] = _arrow_to_frame(pa.ipc.open_file(source).read_all())
+            os.utime(index_path)
+        except (FileNotFoundError, KeyError, ValueError, pa.ArrowInvalid):
+            return None
+
+        return tables
+
+    def store(self, key: str, tables: Dict[str, pd.DataFrame]) -> None:
+        """
+        Write tables as a new cache entry.
+
+        Args:
+            key: Key from workbook_key()
+            tables: Dictionary mapping table names to DataFrames
+        """
+        # Build the entry in a temporary directory and rename it into place
+        tmp = Path(tempfile.mkdtemp(prefix=f".{key}.", dir=self.cache_dir))
+        try:
+            index = []
+            for i, (name, df) in enumerate(tables.items()):
+                file_name = f"{i:04d}.arrow"
+                table = _frame_to_arrow(df)
+                with pa.OSFile(str(tmp / file_name), "wb") as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                index.append({"name": name, "file": file_name})
+
+            (tmp / INDEX_FILE).write_text(json.dumps({"tables": index}), encoding="utf-8")
+
+            entry = self.cache_dir / key
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+        except (TypeError, OverflowError, pa.ArrowException) as e:
+            # e.g. column names that are not JSON serializable or values
+            # of types the cache cannot store
+            print(f"Warning: tables not cached: {e}")
+            return
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        self._evict(keep=key)
+
+    def _entries(self) -> List[Tuple[int, int, Path]]:
+        """Complete entries as (last use ns, size, path), least recently used first."""
+        entries = []
+        for entry in self.cache_dir.iterdir():
+            index_path = entry / INDEX_FILE
+            if entry.name.startswith(".") or not index_path.exists():
+                continue
+            size = sum(f.stat().st_size for f in entry.iterdir())
+            entries.append((index_path.stat().st_mtime_ns, size, entry))
+        return sorted(entries)
+
+    def _evict(self, keep: str) -> None:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry.name == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self) -> int:
+        """
+        Delete all cache entries.
+
+        Returns:
+            Number of entries deleted
+        """
+        entries = self._entries()
+        for _, _, entry in entries:
+            shutil.rmtree(entry, ignore_errors=True)
+        return len(entries)
@@ -3,8 +3,10 @@ Utility functions for Excel to XML conversion.
 """
 
 import math
+import re
 import xml.etree.ElementTree as ET
 from datetime import datetime, date, time
+from functools import lru_cache
 from typing import Any, Optional
 
 import numpy as np
@@ -56,6 +58,126 @@ def safe_str(value: Any) -> str:
     return str(value)
 
 
+def _float_strings(arr: np.ndarray) -> np.ndarray:
+    """safe_str() for a float array: '' for NaN, whole numbers without '.0'."""
+    out = np.empty(len(arr), dtype=object)
+
+    with np.errstate(invalid="ignore"):
+        nan = np.isnan(arr)
+        whole = np.isfinite(arr) & (np.floor(arr) == arr)
+        fits_int64 = whole & (np.abs(arr) < 2.0 ** 63)
+
+    out[nan] = ""
+    out[fits_int64] = arr[fits_int64].astype(np.int64).astype(str)
+
+    # Whole numbers beyond int64 and fractional/infinite values
+    big = whole & ~fits_int64
+    out[big] = [str(int(v)) for v in arr[big].tolist()]
+    rest = ~nan & ~whole
+    out[rest] = [format(v, "g") for v in arr[rest].tolist()]
+
+    return out
+
+
+def _datetime_strings(arr: np.ndarray) -> Optional[np.ndarray]:
+    """
+    safe_str() for a timezone-naive datetime64 array.
+    
+    Returns None when any value has a sub-second part, since isoformat()
+    then varies its precision per value.
+    """
+    nat = np.isnat(arr)
+    seconds = arr.astype("datetime64[s]")
+    if (seconds != arr)[~nat].any():
+        return None
+
+    out = np.datetime_as_string(seconds, unit="s").astype(object)
+    out[nat] = ""
+    return out
+
+
+def safe_str_series(series: pd.Series) -> pd.Series:
+    """
+    Convert a whole column with safe_str() semantics.
+    
+    Integer, float, bool, datetime and string columns are converted in
+    bulk; object and other columns fall back to safe_str() per value.
+    The result equals series.apply(safe_str).
+    
+    Args:
+        series: Column to convert
+        
+    Returns:
+        Column of strings with the same index and name
+    """
+    if series.empty:
+        return series.apply(safe_str)
+
+    dtype = series.dtype
+    values = None
+
+    if isinstance(dtype, np.dtype):
+        arr = series.to_numpy()
+
+        if dtype.kind == "b":
+            values = np.where(arr, "True", "False").astype(object)
+        elif dtype.kind in "iu":
+            values = arr.astype(str).astype(object)
+        elif dtype.kind == "f":
+            values = _float_strings(arr)
+        elif dtype.kind == "M":
+            values = _datetime_strings(arr)
+
+    elif isinstance(dtype, pd.StringDtype):
+        filled = series.fillna("")
+        blank = (filled.str.strip() == "").to_numpy(dtype=bool)
+        values = filled.to_numpy(dtype=object)
+        values[blank] = ""
+
+    if values is None:
+        return series.apply(safe_str)
+
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+# Input formats tried by normalize_datetime_value, in order
+DATETIME_INPUT_FORMATS = [
+    ("%d.%m.%Y %H:%M:%S", False),
+    ("%d.%m.%Y %H:%M", False),
+    ("%d.%m.%Y", True),   # date only, will add 00:00:00
+]
+
+DATETIME_OUTPUT_FORMAT = "%Y-%m-%dT%H:%M:%S.0000000Z"
+
+# Every string accepted by one of the input formats starts like this
+_DATETIME_SCREEN = re.compile(r"[ \d]\d?\.\d\d?\.\d{4}")
+
+# Zero-padded forms that can be parsed in bulk, one per input format
+# (clock ranges are spelled out because pd.to_datetime rolls over e.g. :61)
+_BULK_DATE = r"[0-9]{2}\.[0-9]{2}\.[1-9][0-9]{3}"
+_BULK_HOUR_MINUTE = r"(?:[01][0-9]|2[0-3]):[0-5][0-9]"
+_DATETIME_BULK_FORMATS = [
+    (_BULK_DATE + " " + _BULK_HOUR_MINUTE + r":[0-5][0-9]", "%d.%m.%Y %H:%M:%S"),
+    (_BULK_DATE + " " + _BULK_HOUR_MINUTE, "%d.%m.%Y %H:%M"),
+    (_BULK_DATE, "%d.%m.%Y"),
+]
+
+
+@lru_cache(maxsize=65536)
+def _parse_datetime_string(value: str) -> str:
+    """Try all input formats on a pre-screened string (memoized)."""
+    for fmt, date_only in DATETIME_INPUT_FORMATS:
+        try:
+            dt = datetime.strptime(value, fmt)
+            if date_only:
+                dt = dt.replace(hour=0, minute=0, second=0)
+            return dt.strftime(DATETIME_OUTPUT_FORMAT)
+        except ValueError:
+            continue
+
+    return value
+
+
 def normalize_datetime_value(value: str) -> str:
     """
     Convert datetime string to ISO format with timezone.
@@ -75,22 +197,175 @@ def normalize_datetime_value(value: str) -> str:
     if not isinstance(value, str):
         return value
 
-    candidates = [
-        ("%d.%m.%Y %H:%M:%S", False),
-        ("%d.%m.%Y %H:%M", False),
-        ("%d.%m.%Y", True),   # date only, will add 00:00:00
-    ]
+    # Most cells are not dates; reject them without trying strptime
+    if not _DATETIME_SCREEN.match(value):
+        return value
 
-    for fmt, date_only in candidates:
-        try:
-            dt = datetime.strptime(value, fmt)
-            if date_only:
-                dt = dt.replace(hour=0, minute=0, second=0)
-            return dt.strftime("%Y-%m-%dT%H:%M:%S.0000000Z")
-        except ValueError:
+    return _parse_datetime_string(value)
+
+
+def normalize_datetime_series(series: pd.Series) -> pd.Series:
+    """
+    Apply normalize_datetime_value() to a whole column.
+    
+    Values are pre-screened with a regex, zero-padded dates are parsed in
+    bulk with pd.to_datetime and the remaining candidates go through the
+    memoized per-value parser. Non-string values are left untouched.
+    
+    Args:
+        series: Column to normalize
+        
+    Returns:
+        Column with datetime strings converted to ISO format
+    """
+    if series.empty or not (series.dtype == object or isinstance(series.dtype, pd.StringDtype)):
+        return series
+
+    screened = series.str.match(_DATETIME_SCREEN)
+    candidates = screened.fillna(False).to_numpy(dtype=bool)
+    if not candidates.any():
+        return series
+
+    out = series.to_numpy(dtype=object, copy=True)
+    pending = np.flatnonzero(candidates)
+
+    for pattern, fmt in _DATETIME_BULK_FORMATS:
+        if not len(pending):
+            break
+
+        values = pd.Series(out[pending], dtype=object)
+        strict = values.str.fullmatch(pattern).fillna(False).to_numpy(dtype=bool)
+        if not strict.any():
             continue
 
-    return value
+        parsed = pd.to_datetime(values[strict], format=fmt, errors="coerce")
+        ok = parsed.notna().to_numpy()
+
+        rows = pending[strict][ok]
+        out[rows] = parsed[ok].dt.strftime(DATETIME_OUTPUT_FORMAT).to_numpy(dtype=object)
+        pending = np.setdiff1d(pending, rows, assume_unique=True)
+
+    for pos in pending:
+        out[pos] = _parse_datetime_string(out[pos])
+
+    return pd.Series(out, index=series.index, name=series.name, dtype=series.dtype)
+
+
+# Whole numbers up to this magnitude are exact as float64
+_FLOAT_EXACT = 2.0 ** 53
+
+
+def _object_kind(series: pd.Series) -> Optional[str]:
+    """Kind of the values of an object column (pandas infer_dtype), None for typed columns."""
+    if series.dtype != object:
+        return None
+    return pd.api.types.infer_dtype(series, skipna=True)
+
+
+def encode_text_column(series: pd.Series) -> np.ndarray:
+    """
+    Encode a column as field values with safe_str() semantics.
+    
+    Typed columns and object columns holding only strings are converted
+    in bulk; other object columns per value.
+    
+    Args:
+        series: Column as loaded
+        
+    Returns:
+        Object array of strings, '' for missing values
+    """
+    if _object_kind(series) == "string":
+        series = series.astype("string")
+    return safe_str_series(series).to_numpy(dtype=object)
+
+
+def encode_number_column(series: pd.Series) -> np.ndarray:
+    """
+    Encode a numeric field like encode_text_column().
+    
+    Object columns of Python ints and floats (as read by openpyxl) are
+    converted in bulk like float columns.
+    
+    Args:
+        series: Column as loaded
+        
+    Returns:
+        Object array of strings, '' for missing values
+    """
+    kind = _object_kind(series)
+    if kind in ("integer", "floating", "mixed-integer-float"):
+        arr = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        # Larger integers would lose digits as floats
+        if kind == "floating" or not (np.abs(arr) >= _FLOAT_EXACT).any():
+            return _float_strings(arr)
+
+    return encode_text_column(series)
+
+
+def encode_bool_column(series: pd.Series) -> np.ndarray:
+    """
+    Encode a boolean field like encode_text_column().
+    
+    Args:
+        series: Column as loaded
+        
+    Returns:
+        Object array of 'True', 'False' and '' for missing values
+    """
+    if _object_kind(series) == "boolean":
+        missing = series.isna().to_numpy()
+        flags = series.fillna(False).to_numpy(dtype=bool)
+        return np.where(missing, "", np.where(flags, "True", "False")).astype(object)
+
+    return encode_text_column(series)
+
+
+def encode_datetime_column(series: pd.Series) -> np.ndarray:
+    """
+    Encode a datetime field like encode_text_column(), normalizing strings.
+    
+    Datetime and date objects are converted in bulk to ISO format; string
+    values accepted by normalize_datetime_value() are converted to the
+    CMT datetime format.
+    
+    Args:
+        series: Column as loaded
+        
+    Returns:
+        Object array of strings, '' for missing values
+    """
+    if _object_kind(series) in ("datetime", "date"):
+        try:
+            series = pd.to_datetime(series)
+        except (TypeError, ValueError):
+            # e.g. mixed time zones; converted per value below
+            pass
+
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind == "M":
+        return safe_str_series(series).to_numpy(dtype=object)
+
+    encoded = pd.Series(encode_text_column(series), dtype=object)
+    return normalize_datetime_series(encoded).to_numpy(dtype=object)
+
+
+# Field value encoder per schema field type. Other types are free text,
+# which holds datetimes only when DATETIME_NORMALIZATION is 'all'
+FIELD_ENCODERS = {
+    "datetime": encode_datetime_column,
+    "bool": encode_bool_column,
+    "number": encode_number_column,
+    "bigint": encode_number_column,
+    "decimal": encode_number_column,
+    "double": encode_number_column,
+    "money": encode_number_column,
+    "optionsetvalue": encode_number_column,
+    "state": encode_number_column,
+    "status": encode_number_column,
+    "guid": encode_text_column,
+    "entityreference": encode_text_column,
+    "owner": encode_text_column,
+}
 
 
 def add_field(
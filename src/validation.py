@@ -0,0 +1,168 @@
+"""
+Pre-flight referential integrity checks on loaded tables.
+
+All checks work on whole columns against hash indexes of every entity's
+primary keys, so they stay fast on millions of rows. References to
+entities without a table in the workbook are not checked; those records
+are expected to exist in the target system already.
+"""
+
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .utils import safe_str_series
+from .xml_generator import XMLGenerator
+
+# Offending values listed per issue
+MAX_EXAMPLES = 5
+
+
+class ValidationIssue(NamedTuple):
+    """One kind of problem found in one column."""
+
+    check: str
+    table: str
+    column: str
+    count: int
+    examples: Tuple[str, ...]
+
+
+def _ids(values: pd.Series) -> pd.Series:
+    """Values as rendered ids, in an object column so isin() uses a hash table."""
+    return safe_str_series(values).astype(object)
+
+
+def _issue(check: str, table: str, column: str, bad: pd.Series) -> List[ValidationIssue]:
+    """Wrap offending values into an issue list (empty if there are none)."""
+    if bad.empty:
+        return []
+    examples = tuple(dict.fromkeys(bad.map(str).tolist()))[:MAX_EXAMPLES]
+    return [ValidationIssue(check, table, column, len(bad), examples)]
+
+
+def _check_lookups(
+    generator: XMLGenerator,
+    entity_name: str,
+    df: pd.DataFrame,
+    indexes: Dict[str, pd.Index]
+) -> List[ValidationIssue]:
+    """Check entityreference and owner columns against their target entities."""
+    issues = []
+
+    for plan in generator.compile_column_plan(entity_name, list(df.columns)):
+        if not plan.is_lookup:
+            continue
+
+        values = _ids(df.iloc[:, plan.position])
+        present = (values != "").to_numpy()
+        if not present.any():
+            continue
+
+        # Target entity per row, as rendered: the last override column wins.
+        # Override columns hold few distinct values, so split those only
+        targets = np.full(len(df), plan.default_lookup, dtype=object)
+        if plan.override_position is not None:
+            codes, uniques = pd.factorize(_ids(df.iloc[:, plan.override_position]))
+            names = np.array([u.split("|")[0] for u in uniques], dtype=object)
+            targets = names[codes]
+
+        target_codes, target_names = pd.factorize(targets[present])
+        refs = values[present]
+        for code, target in enumerate(target_names):
+            if target not in indexes:
+                continue
+            target_refs = refs[target_codes == code]
+            issues += _issue(
+                f"lookup to missing {target}", entity_name, plan.name,
+                target_refs[~target_refs.isin(indexes[target])]
+            )
+
+    return issues
+
+
+def validate_tables(
+    generator: XMLGenerator,
+    tables: Dict[str, pd.DataFrame],
+    raw_tables: Dict[str, pd.DataFrame]
+) -> List[ValidationIssue]:
+    """
+    Check keys and references of the tables that will be rendered.
+
+    Checks missing and duplicate primary keys, entityreference/owner
+    values without a target record, partylist activityids without a
+    parent record and M2M source/target ids without a record.
+
+    Args:
+        generator: Generator whose metadata will render the tables
+        tables: Filtered tables
+        raw_tables: Loaded tables including partylist tables
+
+    Returns:
+        Issues found, empty if the tables are consistent
+    """
+    entity_items, m2m_items = generator._plan_tables(tables)
+    issues = []
+
+    indexes = {}
+    for name, df in entity_items:
+        pk = generator.entities_meta[name]["primaryidfield"]
+        if pk not in df.columns:
+            issues.append(ValidationIssue("missing primary key column", name, pk, len(df), ()))
+            continue
+
+        # Hash index of record ids as rendered in <record id=...>
+        ids = _ids(df[pk])
+        present = ids != ""
+        if not present.all():
+            issues.append(ValidationIssue("missing primary key", name, pk, int((~present).sum()), ()))
+
+        ids = ids[present]
+        issues += _issue("duplicate primary key", name, pk, ids[ids.duplicated()])
+        indexes[name] = pd.Index(ids.unique())
+
+    for name, df in entity_items:
+        issues += _check_lookups(generator, name, df, indexes)
+
+        partylist = raw_tables.get(f"partylist_{name}")
+        if name in indexes and partylist is not None and "activityid" in partylist.columns:
+            # Keyed like XMLGenerator.build_partylist_index() looks them up
+            activity_ids = partylist["activityid"].dropna().astype(str).astype(object)
+            issues += _issue(
+                "partylist row without parent record", f"partylist_{name}", "activityid",
+                activity_ids[~activity_ids.isin(indexes[name])]
+            )
+
+    for rel_name, df, meta in m2m_items:
+        for key, entity in ((meta["sourceKey"], meta["sourceEntity"]),
+                            (meta["targetKey"], meta["targetEntity"])):
+            if entity not in indexes or key not in df.columns:
+                continue
+            ids = _ids(df[key])
+            ids = ids[ids != ""]
+            issues += _issue(
+                f"M2M id without {entity} record", rel_name, key,
+                ids[~ids.isin(indexes[entity])]
+            )
+
+    return issues
+
+
+def format_issues(issues: List[ValidationIssue]) -> str:
+    """
+    Format issues as one line each.
+
+    Args:
+        issues: Issues returned by validate_tables()
+
+    Returns:
+        Report text
+    """
+    lines = []
+    for issue in issues:
+        line = f"  {issue.table}.{issue.column}: {issue.count} x {issue.check}"
+        if issue.examples:
+            line += f" (e.g. {', '.join(issue.examples)})"
+        lines.append(line)
+    return "\n".join(lines)
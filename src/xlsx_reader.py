@@ -0,0 +1,392 @@
+"""
+Direct reading of xlsx packages (table parts, shared strings, sheet XML).
+"""
+
+import posixpath
+import xml.etree.ElementTree as ET
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+from openpyxl.utils import column_index_from_string, range_boundaries
+from openpyxl.utils.datetime import MAC_EPOCH, WINDOWS_EPOCH, from_excel, from_ISO8601
+
+# OOXML namespaces and relationship types
+NS_MAIN = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+REL_OFFICE_DOCUMENT = NS_REL + "/officeDocument"
+REL_WORKSHEET = NS_REL + "/worksheet"
+REL_TABLE = NS_REL + "/table"
+REL_SHARED_STRINGS = NS_REL + "/sharedStrings"
+REL_STYLES = NS_REL + "/styles"
+REL_CORE_PROPERTIES = "http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties"
+TAG_MODIFIED = "{http://purl.org/dc/terms/}modified"
+
+TAG_SHEET = f"{{{NS_MAIN}}}sheet"
+TAG_WORKBOOK_PR = f"{{{NS_MAIN}}}workbookPr"
+TAG_SI = f"{{{NS_MAIN}}}si"
+TAG_T = f"{{{NS_MAIN}}}t"
+TAG_R = f"{{{NS_MAIN}}}r"
+TAG_ROW = f"{{{NS_MAIN}}}row"
+TAG_C = f"{{{NS_MAIN}}}c"
+TAG_V = f"{{{NS_MAIN}}}v"
+TAG_IS = f"{{{NS_MAIN}}}is"
+TAG_NUM_FMT = f"{{{NS_MAIN}}}numFmt"
+TAG_CELL_XFS = f"{{{NS_MAIN}}}cellXfs"
+TAG_XF = f"{{{NS_MAIN}}}xf"
+ATTR_REL_ID = f"{{{NS_REL}}}id"
+
+
+def _rels_path(part: str) -> str:
+    """Return the relationships part path for a package part."""
+    directory, name = posixpath.split(part)
+    return posixpath.join(directory, "_rels", name + ".rels")
+
+
+def _read_rels(zf: zipfile.ZipFile, part: str) -> List[Tuple[str, str, str]]:
+    """
+    Read relationships of a package part.
+
+    Args:
+        zf: Open xlsx archive
+        part: Part path inside the archive ('' for the package root)
+
+    Returns:
+        List of (id, type, resolved target path) in file order
+    """
+    rels_path = _rels_path(part)
+    if rels_path not in zf.namelist():
+        return []
+
+    base = posixpath.dirname(part)
+    rels = []
+    root = ET.fromstring(zf.read(rels_path))
+
+    for rel in root.findall(f"{{{NS_PKG_REL}}}Relationship"):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target")
+        if target.startswith("/"):
+            path = target.lstrip("/")
+        else:
+            path = posixpath.normpath(posixpath.join(base, target))
+        rels.append((rel.get("Id"), rel.get("Type"), path))
+
+    return rels
+
+
+def _workbook_part(zf: zipfile.ZipFile) -> str:
+    """Return the path of the workbook part."""
+    return next(
+        (path for _, rel_type, path in _read_rels(zf, "")
+         if rel_type == REL_OFFICE_DOCUMENT),
+        "xl/workbook.xml"
+    )
+
+
+def _read_tables(zf: zipfile.ZipFile) -> List[Tuple[str, str, str, str]]:
+    """
+    Read table definitions of all sheets.
+
+    Returns:
+        List of (sheet name, sheet part, table name, table ref) in workbook order
+    """
+    workbook_part = _workbook_part(zf)
+    sheet_parts = {
+        rel_id: path for rel_id, rel_type, path in _read_rels(zf, workbook_part)
+        if rel_type == REL_WORKSHEET
+    }
+
+    definitions = []
+    workbook = ET.fromstring(zf.read(workbook_part))
+
+    for sheet in workbook.iter(TAG_SHEET):
+        sheet_part = sheet_parts.get(sheet.get(ATTR_REL_ID))
+        if sheet_part is None:
+            continue
+
+        for _, rel_type, table_part in _read_rels(zf, sheet_part):
+            if rel_type != REL_TABLE:
+                continue
+            table = ET.fromstring(zf.read(table_part))
+            definitions.append((sheet.get("name"), sheet_part, table.get("name"), table.get("ref")))
+
+    return definitions
+
+
+def read_table_definitions(excel_path: Path) -> List[Tuple[str, str, str]]:
+    """
+    Read table definitions from the workbook package without loading cells.
+
+    Args:
+        excel_path: Path to Excel file
+
+    Returns:
+        List of (sheet name, table name, table ref) in workbook order
+    """
+    with zipfile.ZipFile(excel_path) as zf:
+        return [
+            (sheet_name, table_name, ref)
+            for sheet_name, _, table_name, ref in _read_tables(zf)
+        ]
+
+
+def read_modified_time(excel_path: Path) -> Optional[datetime]:
+    """
+    Read the last-modified time from the workbook's document properties.
+
+    Args:
+        excel_path: Path to Excel file
+
+    Returns:
+        Naive UTC datetime, or None if the workbook does not record one
+    """
+    with zipfile.ZipFile(excel_path) as zf:
+        core_part = next(
+            (path for _, rel_type, path in _read_rels(zf, "")
+             if rel_type == REL_CORE_PROPERTIES),
+            None
+        )
+        if core_part is None or core_part not in zf.namelist():
+            return None
+        modified = ET.fromstring(zf.read(core_part)).find(TAG_MODIFIED)
+
+    if modified is None or not modified.text:
+        return None
+
+    try:
+        value = datetime.fromisoformat(modified.text.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _text_content(node: ET.Element) -> str:
+    """Concatenate plain and rich text runs of a string item (phonetic runs excluded)."""
+    snippets = []
+    plain = node.find(TAG_T)
+    if plain is not None and plain.text is not None:
+        snippets.append(plain.text)
+    for run in node.findall(TAG_R):
+        text = run.findtext(TAG_T)
+        if text is not None:
+            snippets.append(text)
+    return "".join(snippets)
+
+
+def _read_shared_strings(zf: zipfile.ZipFile, part: Optional[str]) -> List[str]:
+    """Read the shared strings table once into a list."""
+    if part is None:
+        return []
+
+    strings = []
+    with zf.open(part) as source:
+        for _, node in ET.iterparse(source):
+            if node.tag == TAG_SI:
+                strings.append(_text_content(node).replace('x005F_', ''))
+                node.clear()
+
+    return strings
+
+
+def _read_date_styles(zf: zipfile.ZipFile, part: Optional[str]) -> Tuple[Set[int], Set[int]]:
+    """
+    Find cell style indexes with date and duration number formats.
+
+    Returns:
+        Tuple of (date style indexes, timedelta style indexes)
+    """
+    date_styles: Set[int] = set()
+    timedelta_styles: Set[int] = set()
+
+    if part is None:
+        return date_styles, timedelta_styles
+
+    root = ET.fromstring(zf.read(part))
+    custom = {
+        int(fmt.get("numFmtId")): fmt.get("formatCode")
+        for fmt in root.iter(TAG_NUM_FMT)
+    }
+
+    cell_xfs = root.find(TAG_CELL_XFS)
+    if cell_xfs is None:
+        return date_styles, timedelta_styles
+
+    for idx, xf in enumerate(cell_xfs.findall(TAG_XF)):
+        num_fmt_id = int(xf.get("numFmtId", 0))
+        fmt = custom[num_fmt_id] if num_fmt_id in custom else builtin_format_code(num_fmt_id)
+        if is_date_format(fmt):
+            date_styles.add(idx)
+        if is_timedelta_format(fmt):
+            timedelta_styles.add(idx)
+
+    return date_styles, timedelta_styles
+
+
+def _cast_number(value: str) -> Any:
+    """Convert a numeric cell value to int or float like openpyxl does."""
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def _split_cell_ref(ref: str) -> Tuple[int, int]:
+    """Split 'AB12' into (row, column) indexes."""
+    for i, ch in enumerate(ref):
+        if ch.isdigit():
+            return int(ref[i:]), column_index_from_string(ref[:i])
+    raise ValueError(f"Invalid cell reference: {ref}")
+
+
+class FastXlsxReader:
+    """
+    Reads Excel tables by parsing the sheet XML directly.
+
+    Only cells covered by table ranges are decoded and they are collected
+    into one list per column, without creating any per-cell objects.
+    Values match openpyxl with data_only=True.
+    """
+
+    def __init__(self, excel_path: Path):
+        """
+        Initialize reader.
+
+        Args:
+            excel_path: Path to Excel file
+        """
+        self.excel_path = excel_path
+
+    def load_all_tables(self) -> Dict[str, pd.DataFrame]:
+        """
+        Load all tables from the workbook.
+
+        Returns:
+            Dictionary mapping table names to DataFrames
+        """
+        with zipfile.ZipFile(self.excel_path) as zf:
+            workbook_part = _workbook_part(zf)
+            workbook_rels = {
+                rel_type: path for _, rel_type, path in _read_rels(zf, workbook_part)
+            }
+
+            self.shared_strings = _read_shared_strings(zf, workbook_rels.get(REL_SHARED_STRINGS))
+            self.date_styles, self.timedelta_styles = _read_date_styles(
+                zf, workbook_rels.get(REL_STYLES)
+            )
+
+            workbook_pr = ET.fromstring(zf.read(workbook_part)).find(TAG_WORKBOOK_PR)
+            date1904 = workbook_pr is not None and workbook_pr.get("date1904") in ("1", "true")
+            self.epoch = MAC_EPOCH if date1904 else WINDOWS_EPOCH
+
+            # Group table ranges by sheet so each sheet is parsed once
+            by_sheet: Dict[str, List[Tuple[str, Tuple[int, int, int, int]]]] = {}
+            order = []
+            for _, sheet_part, table_name, ref in _read_tables(zf):
+                by_sheet.setdefault(sheet_part, []).append((table_name, range_boundaries(ref)))
+                order.append(table_name)
+
+            columns: Dict[str, List[List[Any]]] = {}
+            for sheet_part, ranges in by_sheet.items():
+                columns.update(self._read_sheet(zf, sheet_part, ranges))
+
+        tables = {}
+        for table_name in order:
+            cols = columns[table_name]
+            header = [col[0] for col in cols]
+            df = pd.DataFrame({i: col[1:] for i, col in enumerate(cols)})
+            df.columns = header
+            tables[table_name] = df
+
+        return tables
+
+    def _read_sheet(
+        self,
+        zf: zipfile.ZipFile,
+        sheet_part: str,
+        ranges: List[Tuple[str, Tuple[int, int, int, int]]]
+    ) -> Dict[str, List[List[Any]]]:
+        """
+        Iterparse a sheet and collect cells inside the table ranges.
+
+        Returns:
+            Dictionary mapping table names to column lists (header first)
+        """
+        columns = {}
+        for table_name, (min_col, min_row, max_col, max_row) in ranges:
+            n_rows = max_row - min_row + 1
+            columns[table_name] = [[None] * n_rows for _ in range(max_col - min_col + 1)]
+
+        first_row = min(bounds[1] for _, bounds in ranges)
+        last_row = max(bounds[3] for _, bounds in ranges)
+
+        row_idx = 0
+        with zf.open(sheet_part) as source:
+            for _, element in ET.iterparse(source):
+                if element.tag != TAG_ROW:
+                    continue
+
+                r = element.get("r")
+                row_idx = int(r) if r else row_idx + 1
+
+                if row_idx > last_row:
+                    break
+
+                if row_idx >= first_row:
+                    col_idx = 0
+                    for cell in element.iter(TAG_C):
+                        ref = cell.get("r")
+                        if ref:
+                            _, col_idx = _split_cell_ref(ref)
+                        else:
+                            col_idx += 1
+
+                        for table_name, (min_col, min_row, max_col, max_row) in ranges:
+                            if min_row <= row_idx <= max_row and min_col <= col_idx <= max_col:
+                                value = self._cell_value(cell)
+                                columns[table_name][col_idx - min_col][row_idx - min_row] = value
+
+                element.clear()
+
+        return columns
+
+    def _cell_value(self, cell: ET.Element) -> Any:
+        """Decode the cached value of a cell."""
+        data_type = cell.get("t", "n")
+
+        if data_type == "inlineStr":
+            child = cell.find(TAG_IS)
+            return _text_content(child) if child is not None else None
+
+        value = cell.findtext(TAG_V) or None
+        if value is None:
+            return None
+
+        if data_type == "n":
+            value = _cast_number(value)
+            style_id = int(cell.get("s", 0))
+            if style_id in self.date_styles:
+                try:
+                    value = from_excel(
+                        value, self.epoch, timedelta=style_id in self.timedelta_styles
+                    )
+                except (OverflowError, ValueError):
+                    value = "#VALUE!"
+            return value
+
+        if data_type == "s":
+            return self.shared_strings[int(value)]
+
+        if data_type == "b":
+            return bool(int(value))
+
+        if data_type == "d":
+            return from_ISO8601(value)
+
+        return value
@@ -4,18 +4,81 @@ XML generation and data transformation.
 
 import uuid
 import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
-from typing import Dict, Any
+from typing import (
+    Callable, ContextManager, Dict, Any, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple,
+    Union
+)
 
+import numpy as np
 import pandas as pd
 
-from .utils import add_field, normalize_datetime_value
+from .config import DATETIME_MODES
+from .fragment_cache import FragmentCache, fragment_key, frame_digest
+from .metrics import CountingStream, MetricsRecorder, StageCounters
+from .schema_loader import split_lookup_types
+from .utils import (
+    FIELD_ENCODERS, add_field, encode_datetime_column, encode_text_column, safe_str_series
+)
+from .xml_writer import StreamingXMLWriter
+
+
+# Records per shard when entities are rendered in worker processes
+DEFAULT_SHARD_SIZE = 20000
+
+# Namespace of activity party ids generated by reproducible runs
+ACTIVITY_PARTY_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "excel-to-cmt/activityparty")
+
+# Pre-rendered records of an entity: serialized XML text (chunks may split
+# elements) or <record> elements
+RecordPart = Union[str, ET.Element]
+
+
+class ColumnPlan(NamedTuple):
+    """Rendering decisions for one entity column, compiled once per entity."""
+
+    position: int
+    name: str
+    is_lookup: bool
+    default_lookup: Optional[str]
+    override_position: Optional[int]
+    encoder: Callable[[pd.Series], np.ndarray]
+
+
+class PartyRow(NamedTuple):
+    """Values of one partylist row rendered as an activity party."""
+
+    activitypartyid: Optional[str]
+    partyid: Any
+    lookupentity: Optional[str]
+
+
+def _activitypartyid(value: Any) -> Optional[str]:
+    """Return a partylist row id as string, or None if it is missing."""
+    if value is None or isinstance(value, float) and pd.isna(value):
+        return None
+    return str(value)
 
 
 class XMLGenerator:
     """Generates XML output from processed data."""
 
-    def __init__(self, entities_meta: Dict, entity_field_meta: Dict, relationships_m2m: Dict):
+    def __init__(
+        self,
+        entities_meta: Dict,
+        entity_field_meta: Dict,
+        relationships_m2m: Dict,
+        datetime_mode: str = "all",
+        metrics: Optional[MetricsRecorder] = None,
+        fragment_cache: Optional[FragmentCache] = None,
+        group_m2m_targets: bool = False,
+        timestamp: Optional[datetime] = None,
+        reproducible_ids: bool = False,
+        lookup_types: Optional[Dict[str, Dict[str, Tuple[str, ...]]]] = None
+    ):
         """
         Initialize XML generator.
         
@@ -23,11 +86,44 @@ class XMLGenerator:
             entities_meta: Entity metadata from schema
             entity_field_meta: Field metadata from schema
             relationships_m2m: Many-to-many relationships from schema
+            datetime_mode: Which columns get datetime normalization -
+                           'all' (schema datetime fields and free text
+                           columns) or 'schema' (only fields of schema
+                           type 'datetime')
+            metrics: Recorder receiving a stage per generated entity
+            fragment_cache: Cache of rendered records per entity; entities
+                            whose inputs are unchanged are not re-rendered
+            group_m2m_targets: Write one <m2mrelationship> per source record
+                               and relationship listing all its targets,
+                               instead of one per M2M row
+            timestamp: UTC time written to the root element (None = time
+                       of generation)
+            reproducible_ids: Derive missing activity party ids from the
+                              activity id, field name and row position
+                              (uuid5) instead of random uuid4 ids
+            lookup_types: Lookup entities per entity and field, pre-split
+                          from lookupType (None = split entity_field_meta)
         """
+        if datetime_mode not in DATETIME_MODES:
+            raise ValueError(f"Unknown datetime mode '{datetime_mode}', expected one of {DATETIME_MODES}")
+
+        self.datetime_mode = datetime_mode
         self.entities_meta = entities_meta
         self.entity_field_meta = entity_field_meta
         self.relationships_m2m = relationships_m2m
+        self.lookup_types = (
+            lookup_types if lookup_types is not None else split_lookup_types(entity_field_meta)
+        )
+        self.metrics = metrics
+        self.fragment_cache = fragment_cache
+        self.group_m2m_targets = group_m2m_targets
+        self.timestamp = timestamp
+        self.reproducible_ids = reproducible_ids
         self.partylist_index = {}
+        # <entity> elements added by process_entity(), by entity name
+        self.entity_elements: Dict[str, ET.Element] = {}
+        # Content hash of each entity's partylist table, part of fragment cache keys
+        self.partylist_digests: Dict[str, str] = {}
 
     def build_partylist_index(self, tables: Dict[str, pd.DataFrame]) -> None:
         """
@@ -37,6 +133,7 @@ class XMLGenerator:
             tables: Dictionary of DataFrames including partylist tables
         """
         self.partylist_index = {}
+        self.partylist_digests = {}
 
         for table_name, df in tables.items():
             if not table_name.startswith("partylist_"):
@@ -62,18 +159,42 @@ class XMLGenerator:
                 continue
 
             ent_idx = self.partylist_index.setdefault(entity_name, {})
+            if self.fragment_cache is not None:
+                self.partylist_digests[entity_name] = frame_digest(df)
 
-            for _, row in df.iterrows():
-                act_id = row["activityid"]
-                field_name = row["entityField"]
+            valid = df[df["activityid"].notna() & df["entityField"].notna()]
+            if valid.empty:
+                continue
 
-                if pd.isna(act_id) or pd.isna(field_name):
-                    continue
+            # Only the values rendered per party are kept, one tuple per row
+            pointer_ids = valid["activitypointerrecordid"].tolist()
+            party_ids = (
+                valid["activitypartyid"].tolist() if "activitypartyid" in valid.columns
+                else [None] * len(valid)
+            )
+            refs = valid["partyid_entityreference"]
+            lookups = refs.map(str).str.split("|", n=1).str[0].tolist()
+
+            parties = [
+                PartyRow(
+                    activitypartyid=_activitypartyid(pointer_id or party_id),
+                    partyid=partyid,
+                    lookupentity=lookup if has_ref else None
+                )
+                for pointer_id, party_id, partyid, lookup, has_ref in zip(
+                    pointer_ids, party_ids, valid["partyid"].tolist(), lookups, refs.notna().tolist()
+                )
+            ]
 
-                act_id_str = str(act_id)
-                field_str = str(field_name)
+            grouped = valid.groupby(
+                [valid["activityid"].map(str), valid["entityField"].map(str)], sort=False
+            ).indices
 
-                ent_idx.setdefault(act_id_str, {}).setdefault(field_str, []).append(row)
+            # Fields of a record keep the order of their first row
+            for (act_id_str, field_str), positions in sorted(
+                grouped.items(), key=lambda item: item[1][0]
+            ):
+                ent_idx.setdefault(act_id_str, {})[field_str] = tuple(parties[i] for i in positions)
 
     def render_partylists_for_record(
         self,
@@ -100,22 +221,12 @@ class XMLGenerator:
                 "lookupentityname": ""
             })
 
-            for row in rows:
-                ap_id = row.get("activitypointerrecordid") or row.get("activitypartyid")
-
-                if pd.isna(ap_id) if isinstance(ap_id, float) else ap_id is None:
-                    ap_id = str(uuid.uuid4())
-                else:
-                    ap_id = str(ap_id)
+            for position, (ap_id, partyid, party_lookup) in enumerate(rows):
+                if ap_id is None:
+                    ap_id = self._activitypartyid(rec_id_str, field_name, position)
 
                 apr_el = ET.SubElement(field_el, "activitypointerrecords", {"id": ap_id})
 
-                partyid = row.get("partyid")
-                party_lookup = None
-
-                if "partyid_entityreference" in row.index and pd.notna(row["partyid_entityreference"]):
-                    party_lookup = str(row["partyid_entityreference"]).split("|")[0]
-
                 add_field(
                     apr_el,
                     "partyid",
@@ -134,87 +245,232 @@ class XMLGenerator:
 
                 add_field(apr_el, "activitypartyid", ap_id)
 
-    def process_entity(
+    def _activitypartyid(self, rec_id_str: str, field_name: str, position: int) -> str:
+        """Id for a partylist row without one; position is the row's index within the field."""
+        if self.reproducible_ids:
+            return str(uuid.uuid5(ACTIVITY_PARTY_NAMESPACE, f"{rec_id_str}|{field_name}|{position}"))
+        return str(uuid.uuid4())
+
+    def compile_column_plan(self, entity_name: str, columns: List[str]) -> List[ColumnPlan]:
+        """
+        Compile per-column rendering decisions for an entity once.
+        
+        Args:
+            entity_name: Name of the entity
+            columns: DataFrame column names in order
+            
+        Returns:
+            Column plans for all value columns (helper *_entityreference
+            columns are excluded) in DataFrame order
+        """
+        field_meta_by_col = self.entity_field_meta.get(entity_name, {})
+        lookup_types_by_col = self.lookup_types.get(entity_name, {})
+
+        # *_entityreference helper columns by the base column they override
+        overrides: Dict[str, List[int]] = {}
+        for pos, col in enumerate(columns):
+            if col.lower().endswith("_entityreference"):
+                base = col[:-len("_entityreference")].rstrip("_")
+                overrides.setdefault(base, []).append(pos)
+
+        plan = []
+        for pos, col in enumerate(columns):
+            if col.lower().endswith("_entityreference"):
+                continue
+
+            field_meta = field_meta_by_col.get(col, {})
+            field_type = field_meta.get('type')
+            is_lookup = field_type in ('entityreference', 'owner')
+
+            default_lookup = None
+            override_position: Optional[int] = None
+
+            if is_lookup:
+                lookup_types = lookup_types_by_col.get(col)
+                if lookup_types:
+                    default_lookup = lookup_types[0]
+                elif field_type == 'owner':
+                    default_lookup = 'systemuser'
+
+                # The last override column wins; an empty cell there means no lookupentity
+                if col in overrides:
+                    override_position = overrides[col][-1]
+
+            encoder = FIELD_ENCODERS.get(field_type)
+            if encoder is None:
+                # Free text and columns missing from the schema
+                encoder = encode_datetime_column if self.datetime_mode == "all" else encode_text_column
+
+            plan.append(ColumnPlan(
+                position=pos,
+                name=col,
+                is_lookup=is_lookup,
+                default_lookup=default_lookup,
+                override_position=override_position,
+                encoder=encoder
+            ))
+
+        return plan
+
+    def encode_entity_columns(
         self,
-        root: ET.Element,
         entity_name: str,
         df: pd.DataFrame
-    ) -> None:
+    ) -> Tuple[List[ColumnPlan], List[np.ndarray]]:
         """
-        Process entity and add to XML root.
+        Encode every column of an entity into the text that is rendered.
+        
+        Value columns are encoded by field type, helper *_entityreference
+        columns as plain text.
         
         Args:
-            root: Root XML element
             entity_name: Name of the entity
             df: DataFrame with entity data
+            
+        Returns:
+            Tuple of (column plans, encoded values per DataFrame column)
         """
-        meta = self.entities_meta[entity_name]
+        plan = self.compile_column_plan(entity_name, list(df.columns))
+        encoders = {column_plan.position: column_plan.encoder for column_plan in plan}
+        column_values = [
+            encoders.get(pos, encode_text_column)(df.iloc[:, pos]) for pos in range(df.shape[1])
+        ]
+        return plan, column_values
+
+    def iter_entity_records(
+        self,
+        entity_name: str,
+        df: pd.DataFrame
+    ) -> Iterator[ET.Element]:
+        """
+        Render entity records one at a time.
+        
+        Args:
+            entity_name: Name of the entity
+            df: DataFrame with entity data
+            
+        Yields:
+            Detached <record> elements in DataFrame order
+        """
+        pk = self.entities_meta[entity_name]["primaryidfield"]
+        pk_pos = list(df.columns).index(pk)
+        plan, column_values = self.encode_entity_columns(entity_name, df)
+        has_partylist = entity_name in self.partylist_index
 
-        ent_el = ET.SubElement(root, "entity", {
-            "name": entity_name,
-            "displayname": meta["displayname"]
-        })
+        # Record ids are the key as text, without datetime normalization
+        rec_ids = encode_text_column(df.iloc[:, pk_pos])
 
-        recs = ET.SubElement(ent_el, "records")
-        pk = meta["primaryidfield"]
+        for rec_id_str, values in zip(rec_ids, zip(*column_values)):
+            rec = ET.Element("record", {"id": rec_id_str})
 
-        for _, row in df.iterrows():
-            rec_id = row[pk]
-            rec_id_str = str(rec_id)
+            for pos, col, is_lookup, default_lookup, override_position, _ in plan:
+                attrs = {"name": col, "value": values[pos]}
 
-            rec = ET.SubElement(recs, "record", {"id": rec_id_str})
+                # Handle entityreference and owner fields
+                if is_lookup:
+                    lookupentity = default_lookup
+                    if override_position is not None:
+                        lookupentity = values[override_position].split("|")[0]
 
-            # Build lookup overrides from *_entityreference columns
-            lookup_override = {}
-            for col in df.columns:
-                if col.lower().endswith("_entityreference") and pd.notna(row[col]):
-                    base = col[:-len("_entityreference")].rstrip("_")
-                    lookup_override[base] = str(row[col]).split("|")[0]
+                    if lookupentity:
+                        attrs["lookupentity"] = lookupentity
+                    attrs["lookupentityname"] = "default"
 
-            # Process all fields
-            for col, val in row.items():
-                col_lower = col.lower()
+                ET.SubElement(rec, "field", attrs)
 
-                # Skip helper columns and NaN values
-                if col_lower.endswith('_entityreference') or pd.isna(val):
-                    continue
+            # Add partylist fields after regular fields
+            if has_partylist:
+                self.render_partylists_for_record(rec, entity_name, rec_id_str)
 
-                field_meta = self.entity_field_meta.get(entity_name, {}).get(col, {})
-                field_type = field_meta.get('type')
+            yield rec
 
-                # Normalize datetime values
-                if isinstance(val, str):
-                    val = normalize_datetime_value(val)
+    def iter_m2m_relationships(
+        self,
+        rel_name: str,
+        df: pd.DataFrame,
+        meta: Dict[str, str]
+    ) -> Iterator[ET.Element]:
+        """
+        Render many-to-many relationship rows one at a time.
+        
+        Args:
+            rel_name: Relationship name
+            df: DataFrame with relationship data
+            meta: Relationship metadata
+            
+        Yields:
+            Detached <m2mrelationship> elements in DataFrame order; with
+            grouped targets, one per source in order of first appearance
+        """
+        pairs = [
+            (str(src), str(tgt))
+            for src, tgt in zip(df[meta["sourceKey"]].tolist(), df[meta["targetKey"]].tolist())
+            if not (pd.isna(src) or pd.isna(tgt))
+        ]
+
+        if self.group_m2m_targets:
+            targets_by_source: Dict[str, List[str]] = {}
+            for src, tgt in pairs:
+                targets_by_source.setdefault(src, []).append(tgt)
+            groups = targets_by_source.items()
+        else:
+            groups = ((src, [tgt]) for src, tgt in pairs)
+
+        for src, targets in groups:
+            attribs = {
+                "sourceid": src,
+                "targetentityname": meta["targetEntity"],
+                "targetentitynameidfield": meta["targetKey"],
+                "m2mrelationshipname": rel_name
+            }
 
-                lookupentity = None
-                lookupentityname = None
+            rel_el = ET.Element("m2mrelationship", attribs)
+            tgtids = ET.SubElement(rel_el, "targetids")
+            for tgt in targets:
+                ET.SubElement(tgtids, "targetid").text = tgt
 
-                # Handle entityreference and owner fields
-                if field_type in ('entityreference', 'owner'):
-                    if col in lookup_override:
-                        lookupentity = lookup_override[col]
-                    else:
-                        lookup_type = field_meta.get('lookupType')
-                        if lookup_type:
-                            lookupentity = str(lookup_type).split('|')[0]
-                        elif field_type == 'owner':
-                            lookupentity = 'systemuser'
+            yield rel_el
+
+    def process_entity(
+        self,
+        root: ET.Element,
+        entity_name: str,
+        df: pd.DataFrame,
+        fragments: Optional[Iterable[RecordPart]] = None
+    ) -> None:
+        """
+        Process entity and add to XML root.
+        
+        Args:
+            root: Root XML element
+            entity_name: Name of the entity
+            df: DataFrame with entity data
+            fragments: Records from worker processes or the fragment
+                       cache, in order; rendered here if None
+        """
+        meta = self.entities_meta[entity_name]
 
-                    lookupentityname = 'default'
+        with self._entity_stage(entity_name) as stage:
+            ent_el = ET.SubElement(root, "entity", {
+                "name": entity_name,
+                "displayname": meta["displayname"]
+            })
+            self.entity_elements[entity_name] = ent_el
 
-                add_field(
-                    rec,
-                    col,
-                    val,
-                    lookupentity=lookupentity,
-                    lookupentityname=lookupentityname
-                )
+            recs = ET.SubElement(ent_el, "records")
+            if fragments is None:
+                recs.extend(self.iter_entity_records(entity_name, df))
+            else:
+                recs.extend(_parse_records(fragments))
 
-            # Add partylist fields after regular fields
-            if entity_name in self.partylist_index:
-                self.render_partylists_for_record(rec, entity_name, rec_id_str)
+            ET.SubElement(ent_el, "m2mrelationships")
+            stage.rows = len(recs)
 
-        ET.SubElement(ent_el, "m2mrelationships")
+    def _entity_stage(self, entity_name: str) -> ContextManager[StageCounters]:
+        """Metrics stage for one entity, or a no-op without a recorder."""
+        if self.metrics is None:
+            return nullcontext(StageCounters())
+        return self.metrics.stage("process_entity", entity=entity_name)
 
     def process_m2m(
         self,
@@ -232,7 +488,10 @@ class XMLGenerator:
             df: DataFrame with relationship data
             meta: Relationship metadata
         """
-        ent = root.find(f".//entity[@name='{meta['sourceEntity']}']")
+        ent = self.entity_elements.get(meta["sourceEntity"])
+        if ent is None:
+            # Entity elements are direct children of the root
+            ent = root.find(f"entity[@name='{meta['sourceEntity']}']")
         if ent is None:
             print(f"Warning: Entity '{meta['sourceEntity']}' not found for M2M '{rel_name}'")
             return
@@ -241,43 +500,30 @@ class XMLGenerator:
         if m2ms is None:
             m2ms = ET.SubElement(ent, "m2mrelationships")
 
-        for _, row in df.iterrows():
-            src = row[meta["sourceKey"]]
-            tgt = row[meta["targetKey"]]
+        m2ms.extend(self.iter_m2m_relationships(rel_name, df, meta))
 
-            if pd.isna(src) or pd.isna(tgt):
-                continue
-
-            attribs = {
-                "sourceid": str(src),
-                "targetentityname": meta["targetEntity"],
-                "targetentitynameidfield": meta["targetKey"],
-                "m2mrelationshipname": rel_name
-            }
-
-            rel_el = ET.SubElement(m2ms, "m2mrelationship", attribs)
-            tgtids = ET.SubElement(rel_el, "targetids")
-            ET.SubElement(tgtids, "targetid").text = str(tgt)
+    def _root_attrib(self) -> Dict[str, str]:
+        """Attributes of the <entities> root element."""
+        return {
+            "xmlns:xsd": "http://www.w3.org/2001/XMLSchema",
+            "xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance",
+            "timestamp": (self.timestamp or datetime.utcnow()).isoformat() + "Z"
+        }
 
-    def generate_xml(
+    def _plan_tables(
         self,
         tables: Dict[str, pd.DataFrame]
-    ) -> ET.Element:
+    ) -> Tuple[List[Tuple[str, pd.DataFrame]], List[Tuple[str, pd.DataFrame, Dict[str, str]]]]:
         """
-        Generate XML from processed tables.
+        Split tables into entities and M2M relationships in output order.
         
         Args:
             tables: Dictionary of DataFrames
             
         Returns:
-            Root XML element
+            Tuple of (entity items, M2M items); M2M items carry the
+            resolved relationship name and metadata
         """
-        root = ET.Element("entities", {
-            "xmlns:xsd": "http://www.w3.org/2001/XMLSchema",
-            "xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance",
-            "timestamp": datetime.utcnow().isoformat() + "Z"
-        })
-
         # Filter out partylist tables
         tables_for_processing = {
             k: v for k, v in tables.items()
@@ -293,18 +539,433 @@ class XMLGenerator:
             )
         )
 
+        entity_items = []
+        m2m_items = []
+
         for name, df in ordered_items:
             if name in self.entities_meta:
-                self.process_entity(root, name, df)
+                entity_items.append((name, df))
             elif name in self.relationships_m2m:
-                self.process_m2m(root, name, df, self.relationships_m2m[name])
+                m2m_items.append((name, df, self.relationships_m2m[name]))
             elif name.startswith("m2m_"):
                 rel = name[len("m2m_"):]
                 if rel in self.relationships_m2m:
-                    self.process_m2m(root, rel, df, self.relationships_m2m[rel])
+                    m2m_items.append((rel, df, self.relationships_m2m[rel]))
                 else:
                     print(f"Warning: No M2M metadata for {name}")
             else:
                 print(f"Warning: Unrecognized table: {name}")
 
+        return entity_items, m2m_items
+
+    def generate_xml(
+        self,
+        tables: Dict[str, pd.DataFrame],
+        workers: int = 1,
+        shard_size: int = DEFAULT_SHARD_SIZE
+    ) -> ET.Element:
+        """
+        Generate XML from processed tables.
+        
+        Args:
+            tables: Dictionary of DataFrames
+            workers: Processes rendering records (1 = render in this process)
+            shard_size: Records per worker task
+            
+        Returns:
+            Root XML element
+        """
+        root = ET.Element("entities", self._root_attrib())
+        self.entity_elements = {}
+
+        entity_items, m2m_items = self._plan_tables(tables)
+
+        with self._record_shards(entity_items, workers, shard_size, as_text=False) as shards_for:
+            for name, df in entity_items:
+                self.process_entity(root, name, df, shards_for(name, df))
+
+        for rel_name, df, meta in m2m_items:
+            self.process_m2m(root, rel_name, df, meta)
+
         return root
+
+    def write_xml(
+        self,
+        tables: Dict[str, pd.DataFrame],
+        stream: TextIO,
+        workers: int = 1,
+        shard_size: int = DEFAULT_SHARD_SIZE
+    ) -> None:
+        """
+        Generate XML from processed tables directly into a text stream.
+        
+        Records are serialized as soon as they are rendered, so memory use
+        does not grow with the number of records. The output is identical
+        to serializing the tree returned by generate_xml().
+        
+        Args:
+            tables: Dictionary of DataFrames
+            stream: Text stream opened for writing
+            workers: Processes rendering records (1 = render in this process)
+            shard_size: Records per worker task
+        """
+        # Count output bytes per entity only when they are recorded
+        counting = CountingStream(stream) if self.metrics is not None else None
+        writer = StreamingXMLWriter(stream if counting is None else counting)
+        writer.start("entities", self._root_attrib())
+
+        entity_items, m2m_items = self._plan_tables(tables)
+        entity_names = {name for name, _ in entity_items}
+
+        # M2M rows are written into their source entity, so group them up front
+        m2m_by_source: Dict[str, list] = {}
+        for rel_name, df, meta in m2m_items:
+            if meta["sourceEntity"] not in entity_names:
+                print(f"Warning: Entity '{meta['sourceEntity']}' not found for M2M '{rel_name}'")
+                continue
+            m2m_by_source.setdefault(meta["sourceEntity"], []).append((rel_name, df, meta))
+
+        with self._record_shards(entity_items, workers, shard_size, as_text=True) as shards_for:
+            for name, df in entity_items:
+                self._write_entity(
+                    writer, name, df, m2m_by_source.get(name, []), shards_for(name, df), counting
+                )
+
+        writer.close()
+
+    def _write_entity(
+        self,
+        writer: StreamingXMLWriter,
+        name: str,
+        df: pd.DataFrame,
+        m2m_items: List[Tuple[str, pd.DataFrame, Dict[str, str]]],
+        fragments: Optional[Iterable[RecordPart]],
+        counting: Optional[CountingStream]
+    ) -> None:
+        """Write one <entity> element with its records and M2M relationships."""
+        meta = self.entities_meta[name]
+
+        with self._entity_stage(name) as stage:
+            start_bytes = counting.bytes_written if counting is not None else 0
+            writer.start("entity", {
+                "name": name,
+                "displayname": meta["displayname"]
+            })
+
+            writer.start("records")
+            if fragments is None:
+                rows = 0
+                for rec in self.iter_entity_records(name, df):
+                    writer.write_element(rec)
+                    rows += 1
+            else:
+                for part in fragments:
+                    if isinstance(part, str):
+                        writer.write_raw(part)
+                    else:
+                        writer.write_element(part)
+                rows = len(df)
+            writer.end()
+
+            writer.start("m2mrelationships")
+            for rel_name, m2m_df, m2m_meta in m2m_items:
+                for rel_el in self.iter_m2m_relationships(rel_name, m2m_df, m2m_meta):
+                    writer.write_element(rel_el)
+            writer.end()
+
+            writer.end()
+            stage.rows = rows
+            if counting is not None:
+                stage.bytes_written = counting.bytes_written - start_bytes
+
+    def entity_fragment_key(self, entity_name: str, df: pd.DataFrame) -> str:
+        """
+        Fragment cache key of an entity's rendered records.
+        
+        The key covers the entity table contents, the entity's schema
+        metadata, its partylist table and the rendering settings. M2M rows are
+        rendered separately and are not part of cached fragments.
+        
+        Args:
+            entity_name: Name of the entity
+            df: Filtered DataFrame with entity data
+            
+        Returns:
+            Cache key
+        """
+        return fragment_key({
+            "entity": entity_name,
+            "entity_meta": self.entities_meta[entity_name],
+            "field_meta": self.entity_field_meta.get(entity_name, {}),
+            "datetime_mode": self.datetime_mode,
+            "reproducible_ids": self.reproducible_ids,
+            "table": frame_digest(df),
+            "partylist": self.partylist_digests.get(entity_name)
+        })
+
+    @contextmanager
+    def _record_shards(
+        self,
+        entity_items: List[Tuple[str, pd.DataFrame]],
+        workers: int,
+        shard_size: int,
+        as_text: bool
+    ) -> Iterator[Callable[[str, pd.DataFrame], Optional[Iterable[RecordPart]]]]:
+        """
+        Provide pre-rendered records per entity from the cache and worker pool.
+        
+        Cached entities are read from the fragment cache in chunks; the
+        others are rendered on the process pool (workers > 1) or in this
+        process. Rendered records are written to the cache while they are
+        consumed, so no entity is held in memory as a whole. Entities must
+        be requested in entity_items order.
+        
+        Args:
+            entity_items: Entities in output order
+            workers: Processes rendering records (1 = render in this process)
+            shard_size: Records per worker task
+            as_text: Pass records rendered in this process on serialized
+                     (for streamed output) instead of as elements
+        
+        Yields:
+            Function returning an entity's records as RecordParts, or None
+            when the entity should be rendered directly
+        """
+        cache = self.fragment_cache
+        keys = {}
+        if cache is not None:
+            keys = {name: self.entity_fragment_key(name, df) for name, df in entity_items}
+        cached = {name for name, key in keys.items() if cache.contains(key)}
+        to_render = [(name, df) for name, df in entity_items if name not in cached]
+
+        with self._parallel_fragments(to_render, workers, shard_size) as fragments:
+            def rendered(name: str, df: pd.DataFrame) -> Iterator[RecordPart]:
+                if fragments is not None and name not in cached:
+                    return (next(fragments) for _ in range(_shard_count(df, shard_size)))
+                records = self.iter_entity_records(name, df)
+                if as_text:
+                    return (ET.tostring(rec, encoding="unicode") for rec in records)
+                return records
+
+            def shards(name: str, df: pd.DataFrame) -> Iterator[RecordPart]:
+                if name in cached:
+                    chunks = cache.read_chunks(keys[name])
+                    if chunks is not None:
+                        yield from chunks
+                        return
+                elif cache is not None:
+                    cache.misses += 1
+
+                if cache is None:
+                    yield from rendered(name, df)
+                    return
+
+                with cache.writer(keys[name]) as out:
+                    for part in rendered(name, df):
+                        out.write(part if isinstance(part, str) else ET.tostring(part, encoding="unicode"))
+                        yield part
+
+            def shards_for(name: str, df: pd.DataFrame) -> Optional[Iterable[RecordPart]]:
+                if cache is None and fragments is None:
+                    return None
+                return shards(name, df)
+
+            yield shards_for
+
+    @contextmanager
+    def _parallel_fragments(
+        self,
+        entity_items: List[Tuple[str, pd.DataFrame]],
+        workers: int,
+        shard_size: int
+    ) -> Iterator[Optional[Iterator[str]]]:
+        """
+        Render entity records on a process pool.
+
+        Each entity is split into shards of shard_size records. Shards are
+        rendered in worker processes and yielded as serialized <record>
+        elements in entity order, at most 2 * workers shards ahead of the
+        consumer.
+
+        Yields:
+            Iterator over serialized shards, or None when workers <= 1
+        """
+        if workers <= 1:
+            yield None
+            return
+
+        if shard_size <= 0:
+            raise ValueError(f"Shard size must be positive, got {shard_size}")
+
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_render_worker,
+            initargs=(self.worker_state(),)
+        )
+
+        def fragments() -> Iterator[str]:
+            pending = deque()
+            for name, df in entity_items:
+                for start in range(0, len(df), shard_size):
+                    pending.append(pool.submit(_render_records, name, df.iloc[start:start + shard_size]))
+                    if len(pending) > 2 * workers:
+                        yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+        try:
+            yield fragments()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def worker_state(self) -> Dict[str, Any]:
+        """Generator state needed to render output in another process."""
+        return {
+            "entities_meta": self.entities_meta,
+            "entity_field_meta": self.entity_field_meta,
+            "relationships_m2m": self.relationships_m2m,
+            "lookup_types": self.lookup_types,
+            "datetime_mode": self.datetime_mode,
+            "group_m2m_targets": self.group_m2m_targets,
+            "timestamp": self.timestamp,
+            "reproducible_ids": self.reproducible_ids,
+            "partylist_index": self.partylist_index
+        }
+
+    @classmethod
+    def from_worker_state(cls, state: Dict[str, Any]) -> "XMLGenerator":
+        """Rebuild a generator from worker_state() without metrics or cache."""
+        generator = cls(
+            state["entities_meta"],
+            state["entity_field_meta"],
+            state["relationships_m2m"],
+            datetime_mode=state["datetime_mode"],
+            group_m2m_targets=state["group_m2m_targets"],
+            timestamp=state["timestamp"],
+            reproducible_ids=state["reproducible_ids"],
+            lookup_types=state["lookup_types"]
+        )
+        generator.partylist_index = state["partylist_index"]
+        return generator
+
+    def shard_tables(
+        self,
+        tables: Dict[str, pd.DataFrame],
+        max_records: int
+    ) -> List[Dict[str, pd.DataFrame]]:
+        """
+        Split tables into package shards of at most max_records entity records.
+        
+        Entities are filled into shards in output order and split between
+        records when a shard is full. M2M rows go to the shard holding
+        their source record; rows without one go to the shard holding the
+        entity's first records. Partylist rows need no splitting, they are
+        rendered with their record from the partylist index.
+        
+        Args:
+            tables: Dictionary of DataFrames
+            max_records: Entity records per shard
+            
+        Returns:
+            Tables of each shard, in shard order
+        """
+        if max_records <= 0:
+            raise ValueError(f"Records per package must be positive, got {max_records}")
+
+        entity_items, m2m_items = self._plan_tables(tables)
+
+        shards: List[Dict[str, pd.DataFrame]] = [{}]
+        room = max_records
+        # Entity name -> (shard index, records) per slice
+        placements: Dict[str, List[Tuple[int, pd.DataFrame]]] = {}
+
+        for name, df in entity_items:
+            start = 0
+            while True:
+                if room == 0 and start < len(df):
+                    shards.append({})
+                    room = max_records
+
+                stop = min(len(df), start + room)
+                part = df.iloc[start:stop]
+                shards[-1][name] = part
+                placements.setdefault(name, []).append((len(shards) - 1, part))
+                room -= stop - start
+                start = stop
+
+                if start >= len(df):
+                    break
+
+        for rel_name, df, meta in m2m_items:
+            placed = placements.get(meta["sourceEntity"])
+            if not placed:
+                # Reported as an unknown source entity when written
+                shards[0][rel_name] = df
+                continue
+
+            pk = self.entities_meta[meta["sourceEntity"]]["primaryidfield"]
+            sources = safe_str_series(df[meta["sourceKey"]])
+            unassigned = np.ones(len(df), dtype=bool)
+            masks: Dict[int, np.ndarray] = {}
+
+            for shard_index, part in placed:
+                mask = unassigned & sources.isin(set(safe_str_series(part[pk]))).to_numpy()
+                unassigned &= ~mask
+                masks[shard_index] = masks.get(shard_index, False) | mask
+
+            first_shard = placed[0][0]
+            masks[first_shard] = masks[first_shard] | unassigned
+
+            for shard_index, mask in masks.items():
+                shards[shard_index][rel_name] = df[mask]
+
+        return shards
+
+
+def _shard_count(df: pd.DataFrame, shard_size: int) -> int:
+    """Number of record shards an entity is split into."""
+    return -(-len(df) // shard_size)
+
+
+# Generator of a rendering worker process, set up by _init_render_worker
+_worker_generator: Optional[XMLGenerator] = None
+
+
+def _init_render_worker(state: Dict[str, Any]) -> None:
+    """Process pool initializer building the worker's generator."""
+    global _worker_generator
+    _worker_generator = XMLGenerator.from_worker_state(state)
+
+
+def _parse_records(parts: Iterable[RecordPart]) -> Iterator[ET.Element]:
+    """
+    Turn RecordParts into <record> elements.
+    
+    Serialized text is parsed in pieces that end where a record starts,
+    so its chunks may split elements anywhere. Attribute values are
+    escaped, so '<record ' only occurs at the start of a record.
+    """
+    pending = ""
+    for part in parts:
+        if not isinstance(part, str):
+            yield part
+            continue
+
+        pending += part
+        cut = pending.rfind("<record ")
+        if cut > 0:
+            yield from ET.fromstring(f"<records>{pending[:cut]}</records>")
+            pending = pending[cut:]
+
+    if pending:
+        yield from ET.fromstring(f"<records>{pending}</records>")
+
+
+def _serialize_records(records: Iterable[ET.Element]) -> str:
+    """Serialize <record> elements into one XML fragment."""
+    return "".join(ET.tostring(rec, encoding="unicode") for rec in records)
+
+
+def _render_records(entity_name: str, df: pd.DataFrame) -> str:
+    """Render a shard of entity records to serialized XML in a worker process."""
+    return _serialize_records(_worker_generator.iter_entity_records(entity_name, df))
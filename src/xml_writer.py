@@ -0,0 +1,109 @@
+"""
+Incremental XML serialization.
+"""
+
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, TextIO
+
+
+class StreamingXMLWriter:
+    """
+    Writes XML to a text stream element by element.
+
+    Output is byte-identical to ``ET.ElementTree.write`` for the same
+    document: attributes are escaped by ElementTree itself and elements
+    without children are written in the short ``<tag />`` form.
+    """
+
+    def __init__(self, stream: TextIO):
+        """
+        Initialize writer.
+
+        Args:
+            stream: Text stream the XML is written to
+        """
+        self.stream = stream
+        # Stack of [tag, pending start tag or None once it has been written]
+        self._open: List[list] = []
+
+    @staticmethod
+    def _start_tag(tag: str, attrib: Optional[Dict[str, str]]) -> str:
+        """Serialize a start tag using ElementTree's attribute escaping."""
+        empty = ET.tostring(ET.Element(tag, attrib or {}), encoding="unicode")
+        # '<tag a="b" />' -> '<tag a="b">'
+        return empty[:-3] + ">"
+
+    def _flush_parent(self) -> None:
+        """Write the start tag of the innermost open element if still pending."""
+        if self._open and self._open[-1][1] is not None:
+            self.stream.write(self._open[-1][1])
+            self._open[-1][1] = None
+
+    def start(self, tag: str, attrib: Optional[Dict[str, str]] = None) -> None:
+        """
+        Open an element.
+
+        The start tag is buffered until the first child is written so that
+        elements which end up empty can be closed as ``<tag />``.
+
+        Args:
+            tag: Element tag
+            attrib: Element attributes
+        """
+        self._flush_parent()
+        self._open.append([tag, self._start_tag(tag, attrib)])
+
+    def end(self) -> None:
+        """Close the innermost open element."""
+        tag, pending = self._open.pop()
+        if pending is not None:
+            self.stream.write(pending[:-1] + " />")
+        else:
+            self.stream.write(f"</{tag}>")
+
+    def write_element(self, elem: ET.Element) -> None:
+        """
+        Write a complete element (with its subtree) inside the open element.
+
+        Args:
+            elem: Element to serialize
+        """
+        self._flush_parent()
+        self.stream.write(ET.tostring(elem, encoding="unicode"))
+
+    def write_raw(self, text: str) -> None:
+        """
+        Write pre-serialized XML inside the open element.
+
+        Args:
+            text: Serialized elements; consecutive calls may split an
+                  element, which must be complete before the next
+                  start() or end(). An empty string writes nothing
+        """
+        if text:
+            self._flush_parent()
+            self.stream.write(text)
+
+    def close(self) -> None:
+        """Close all elements that are still open."""
+        while self._open:
+            self.end()
+
+
+class TeeStream:
+    """Text stream that forwards every write to several streams."""
+
+    def __init__(self, *streams: TextIO):
+        """
+        Initialize tee.
+
+        Args:
+            streams: Text streams that receive the written text
+        """
+        self.streams = streams
+
+    def write(self, text: str) -> int:
+        """Write text to all streams."""
+        for stream in self.streams:
+            stream.write(text)
+        return len(text)
@@ -0,0 +1,294 @@
+"""
+ZIP archive writing with configurable compression.
+"""
+
+import io
+import os
+import shutil
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, NamedTuple, Optional, Tuple
+
+# Compression modes: no compression, zlib deflate, deflate on a thread pool
+COMPRESSION_MODES = ("store", "deflate", "parallel")
+
+# Uncompressed bytes per parallel deflate chunk
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Deflate back-reference window carried over between chunks
+DICTIONARY_SIZE = 32 * 1024
+
+# Entry timestamp as (year, month, day, hour, minute, second)
+DateTime = Tuple[int, int, int, int, int, int]
+
+# Years representable in ZIP (MS-DOS) entry timestamps
+ZIP_YEARS = (1980, 2107)
+
+
+class CompressionPolicy(NamedTuple):
+    """How data.xml and the other package entries are compressed."""
+
+    mode: str = "deflate"
+    level: Optional[int] = None
+    workers: Optional[int] = None
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    # Timestamp of every entry (None = time of writing)
+    date_time: Optional[DateTime] = None
+
+
+def validate_policy(policy: CompressionPolicy) -> None:
+    """Raise ValueError for unsupported policy settings."""
+    if policy.mode not in COMPRESSION_MODES:
+        raise ValueError(f"Unknown compression mode '{policy.mode}', expected one of {COMPRESSION_MODES}")
+
+    if policy.level is not None and not 0 <= policy.level <= 9:
+        raise ValueError(f"Compression level must be between 0 and 9, got {policy.level}")
+
+    if policy.chunk_size <= 0:
+        raise ValueError(f"Chunk size must be positive, got {policy.chunk_size}")
+
+    if policy.date_time is not None:
+        check_date_time(policy.date_time)
+
+
+def check_date_time(date_time: DateTime) -> None:
+    """Raise ValueError for entry timestamps outside the years ZIP can store."""
+    if not ZIP_YEARS[0] <= date_time[0] <= ZIP_YEARS[1]:
+        raise ValueError(
+            f"ZIP entry timestamps must be in the years {ZIP_YEARS[0]}-{ZIP_YEARS[1]}, got {date_time}"
+        )
+
+
+def open_zip(path: Path, policy: CompressionPolicy) -> zipfile.ZipFile:
+    """
+    Open a ZIP archive for writing according to a compression policy.
+
+    Args:
+        path: Archive path
+        policy: Compression policy
+
+    Returns:
+        ZipFile opened in write mode
+    """
+    validate_policy(policy)
+
+    if policy.mode == "store":
+        return zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED)
+
+    return zipfile.ZipFile(
+        path, "w",
+        compression=zipfile.ZIP_DEFLATED,
+        compresslevel=policy.level
+    )
+
+
+def _entry_info(zf: zipfile.ZipFile, arcname: str, policy: CompressionPolicy) -> zipfile.ZipInfo:
+    """Entry header with the policy's timestamp, as ZipFile would create it."""
+    zinfo = zipfile.ZipInfo(arcname, date_time=policy.date_time or time.localtime(time.time())[:6])
+    zinfo.compress_type = zf.compression
+    # ZipFile.open() takes the level from the entry; the attribute is
+    # compress_level since Python 3.13 and _compresslevel before
+    if hasattr(zinfo, "compress_level"):
+        zinfo.compress_level = zf.compresslevel
+    else:
+        zinfo._compresslevel = zf.compresslevel
+    zinfo.external_attr = 0o600 << 16
+    return zinfo
+
+
+def open_entry(zf: zipfile.ZipFile, arcname: str, policy: CompressionPolicy) -> BinaryIO:
+    """
+    Open an archive entry for writing with ZIP64 enabled.
+
+    Args:
+        zf: Archive opened with open_zip()
+        arcname: Entry name
+        policy: Compression policy
+
+    Returns:
+        Writable binary stream; closing it finishes the entry
+    """
+    if policy.mode == "parallel":
+        return ParallelDeflateWriter(
+            zf, arcname,
+            level=policy.level,
+            workers=policy.workers,
+            chunk_size=policy.chunk_size,
+            date_time=policy.date_time
+        )
+
+    return zf.open(_entry_info(zf, arcname, policy), "w", force_zip64=True)
+
+
+def write_file(zf: zipfile.ZipFile, path: Path, arcname: str, policy: CompressionPolicy) -> None:
+    """
+    Add a file to an archive according to a compression policy.
+
+    Args:
+        zf: Archive opened with open_zip()
+        path: File to add
+        arcname: Entry name
+        policy: Compression policy
+    """
+    # zf.write() would stamp the entry with the file's mtime
+    if policy.mode != "parallel" and policy.date_time is None:
+        zf.write(path, arcname=arcname)
+        return
+
+    with open(path, "rb") as source, open_entry(zf, arcname, policy) as entry:
+        shutil.copyfileobj(source, entry, policy.chunk_size)
+
+
+def write_bytes(zf: zipfile.ZipFile, arcname: str, data: bytes, policy: CompressionPolicy) -> None:
+    """
+    Add in-memory data to an archive according to a compression policy.
+
+    Args:
+        zf: Archive opened with open_zip()
+        arcname: Entry name
+        data: Entry contents
+        policy: Compression policy
+    """
+    zf.writestr(_entry_info(zf, arcname, policy), data)
+
+
+def _deflate_chunk(chunk: bytes, level: int, dictionary: bytes) -> bytes:
+    """Raw-deflate one chunk, primed with the preceding data, ending on a byte boundary."""
+    if dictionary:
+        compressor = zlib.compressobj(
+            level, zlib.DEFLATED, -zlib.MAX_WBITS,
+            zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY, dictionary
+        )
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    return compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+# Empty final deflate block terminating the concatenated chunk stream
+_FINAL_BLOCK = zlib.compressobj(0, zlib.DEFLATED, -zlib.MAX_WBITS).flush()
+
+
+class ParallelDeflateWriter(io.BufferedIOBase):
+    """
+    Writes a deflated ZIP entry whose chunks are compressed on a thread pool.
+
+    Each chunk is compressed independently with the last 32 KiB of the
+    previous chunk as preset dictionary and ends with a sync flush, so the
+    concatenated output is one ordinary deflate stream that any unzip tool
+    can read. zlib releases the GIL, so chunks compress in parallel.
+    """
+
+    def __init__(
+        self,
+        zf: zipfile.ZipFile,
+        arcname: str,
+        level: Optional[int] = None,
+        workers: Optional[int] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        date_time: Optional[DateTime] = None
+    ):
+        """
+        Initialize writer and open the entry.
+
+        Args:
+            zf: Archive opened for writing (must be seekable)
+            arcname: Entry name
+            level: zlib compression level (None = zlib default)
+            workers: Compression threads (None = CPU count)
+            chunk_size: Uncompressed bytes per chunk
+            date_time: Entry timestamp (None = current local time)
+        """
+        super().__init__()
+
+        if not zf.fp.seekable():
+            raise ValueError("Parallel deflate requires a seekable ZIP file")
+
+        self._zf = zf
+        self._level = zlib.Z_DEFAULT_COMPRESSION if level is None else level
+        self._chunk_size = chunk_size
+
+        workers = workers or os.cpu_count() or 1
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._max_pending = 2 * workers
+        self._pending = deque()
+
+        self._buffer = bytearray()
+        self._dictionary = b""
+        self._crc = 0
+        self._file_size = 0
+        self._compress_size = 0
+
+        # Compressed chunks are written through a stored entry; the local
+        # header is rewritten as deflated once the sizes are known
+        self._zinfo = zipfile.ZipInfo(arcname, date_time=date_time or time.localtime(time.time())[:6])
+        self._zinfo.compress_type = zipfile.ZIP_STORED
+        self._entry = zf.open(self._zinfo, "w", force_zip64=True)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        """Buffer data and submit every full chunk for compression."""
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+
+        self._buffer += data
+        while len(self._buffer) >= self._chunk_size:
+            chunk = bytes(self._buffer[:self._chunk_size])
+            del self._buffer[:self._chunk_size]
+            self._submit(chunk)
+
+        return len(data)
+
+    def _submit(self, chunk: bytes) -> None:
+        """Queue a chunk and write finished chunks in order."""
+        self._crc = zlib.crc32(chunk, self._crc)
+        self._file_size += len(chunk)
+
+        self._pending.append(
+            self._pool.submit(_deflate_chunk, chunk, self._level, self._dictionary)
+        )
+        self._dictionary = chunk[-DICTIONARY_SIZE:]
+
+        while len(self._pending) > self._max_pending:
+            self._write_compressed(self._pending.popleft().result())
+
+    def _write_compressed(self, data: bytes) -> None:
+        self._entry.write(data)
+        self._compress_size += len(data)
+
+    def close(self) -> None:
+        """Compress remaining data, finish the entry and fix its header."""
+        if self.closed:
+            return
+
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+
+            while self._pending:
+                self._write_compressed(self._pending.popleft().result())
+
+            self._write_compressed(_FINAL_BLOCK)
+            self._entry.close()
+
+            zinfo = self._zinfo
+            zinfo.compress_type = zipfile.ZIP_DEFLATED
+            zinfo.CRC = self._crc
+            zinfo.file_size = self._file_size
+            zinfo.compress_size = self._compress_size
+
+            fp = self._zf.fp
+            end = fp.tell()
+            fp.seek(zinfo.header_offset)
+            fp.write(zinfo.FileHeader(zip64=True))
+            fp.seek(end)
+        finally:
+            self._pool.shutdown()
+            super().close()
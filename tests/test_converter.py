@@ -3,12 +3,19 @@ Tests for the Excel to XML converter.
 Includes unit tests and integration tests with sample data.
 """
 
+import io
+import re
+import subprocess
+import sys
+import tempfile
 import xml.etree.ElementTree as ET
 import unittest
 from pathlib import Path
 
 from src.utils import safe_str, normalize_datetime_value
-from tests.fixtures_config import EXCEL_FILE, SCHEMA_FILE, EXPECTED_OUTPUT
+from tests.fixtures_config import (
+    EXCEL_FILE, SCHEMA_FILE, EXPECTED_OUTPUT, EXCEL_FILE_REFERENCE
+)
 
 
 class TestConverterSetup(unittest.TestCase):
@@ -40,6 +47,53 @@ class TestConverterSetup(unittest.TestCase):
         self.assertTrue(EXPECTED_OUTPUT.exists(), f"Expected output not found: {EXPECTED_OUTPUT}")
 
 
+class TestStartup(unittest.TestCase):
+    """Test that importing the package stays cheap."""
+
+    # Cumulative import time of src.converter; importing pandas alone exceeds it
+    IMPORT_TIME_BUDGET_US = 300000
+
+    HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "pyarrow")
+
+    @staticmethod
+    def _run(code: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=Path(__file__).resolve().parent.parent,
+            capture_output=True,
+            text=True
+        )
+
+    def test_import_time_budget(self):
+        """Test that the converter imports within budget and without pandas."""
+        result = self._run("import src, src.converter, src.batch")
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        # Lines look like "import time: self [us] | cumulative | module"
+        cumulative = {}
+        for line in result.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[1].strip().isdigit():
+                cumulative[parts[2].strip()] = int(parts[1])
+
+        self.assertFalse(set(self.HEAVY_MODULES) & set(cumulative))
+        self.assertLess(cumulative["src.converter"], self.IMPORT_TIME_BUDGET_US)
+
+    def test_missing_project_skips_heavy_imports(self):
+        """Test that a missing project is reported before pandas is imported."""
+        result = self._run(
+            "import sys\n"
+            "from src.converter import main\n"
+            "try:\n"
+            "    main('missing_project')\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            f"print([m for m in {self.HEAVY_MODULES!r} if m in sys.modules])"
+        )
+        self.assertIn("Project directory not found", result.stderr)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+
 class TestUtilityFunctions(unittest.TestCase):
     """Test utility functions."""
 
@@ -89,6 +143,72 @@ class TestUtilityFunctions(unittest.TestCase):
         result = normalize_datetime_value(invalid)
         self.assertEqual(result, invalid)
 
+    def test_datetime_series_normalization(self):
+        """Test column-wise datetime normalization against the per-value function."""
+        import pandas as pd
+        from src.utils import normalize_datetime_series
+
+        values = [
+            "25.08.2020 11:30:00", "25.08.2020 11:30", "15.01.2020", "5.1.2020 7:05",
+            " 5.08.2020", "13.02.2020 15:20:61", "31.02.2020", "2020-08-25", "", None,
+            "25.08.2020 11:30:00",
+        ]
+
+        for series in (pd.Series(values, dtype=object), pd.Series(values, dtype="string")):
+            result = normalize_datetime_series(series)
+            expected = [v if v is None else normalize_datetime_value(v) for v in values]
+            self.assertEqual(result.dtype, series.dtype)
+            self.assertEqual(
+                [None if pd.isna(v) else v for v in result.tolist()],
+                expected
+            )
+
+    def test_safe_str_series_matches_safe_str(self):
+        """Test that column-wise conversion equals safe_str per value."""
+        import datetime
+        import random
+        import numpy as np
+        import pandas as pd
+        from src.utils import safe_str_series
+
+        rng = np.random.default_rng(42)
+        pick = random.Random(42).choices
+        n = 200
+
+        floats = rng.normal(0, 1e6, n)
+        floats[::3] = np.round(floats[::3])
+        floats[::7] = np.nan
+        floats[1:7] = [np.inf, -0.0, 1e25, -np.inf, 1e-7, 2.5]
+
+        dates = pd.Series(pd.to_datetime(rng.integers(0, 2 * 10**9, n), unit="s"))
+        dates[3] = pd.NaT
+        sub_second = dates.astype("datetime64[us]")
+        sub_second[0] = pd.Timestamp("2020-01-01 00:00:00.5")
+
+        strings = pick(["a", " ", "", None, "  x ", "25.08.2020"], k=n)
+        mixed = pick([1, 2.0, "x", None, True, datetime.date(2020, 1, 2), np.nan], k=n)
+
+        columns = [
+            pd.Series(rng.integers(-10**12, 10**12, n)),
+            pd.Series(floats),
+            pd.Series(floats.astype(np.float32)),
+            pd.Series(rng.integers(0, 2, n).astype(bool)),
+            dates,
+            sub_second,
+            dates.dt.tz_localize("UTC"),
+            pd.Series(strings),
+            pd.Series(strings, dtype="string"),
+            pd.Series(mixed, dtype=object),
+            pd.Series([1, None, 3], dtype="Int64"),
+            pd.Series([], dtype=float),
+        ]
+
+        for column in columns:
+            expected = column.apply(safe_str)
+            actual = safe_str_series(column)
+            self.assertEqual(actual.tolist(), expected.tolist(), f"dtype {column.dtype}")
+            self.assertEqual(actual.dtype, expected.dtype, f"dtype {column.dtype}")
+
 
 class TestConversionIntegration(unittest.TestCase):
     """Integration tests using sample test data."""
@@ -233,5 +353,1031 @@ class TestConversionIntegration(unittest.TestCase):
             )
 
 
+class TestExcelLoader(unittest.TestCase):
+    """Test workbook loading."""
+
+    def test_table_definitions(self):
+        """Test that table definitions are read from the package parts."""
+        from src.xlsx_reader import read_table_definitions
+
+        definitions = read_table_definitions(EXCEL_FILE)
+        by_name = {table: (sheet, ref) for sheet, table, ref in definitions}
+
+        self.assertEqual(by_name["contact"], ("contact", "A1:M5"))
+        self.assertIn("partylist_appointment", by_name)
+        self.assertIn("m2m_ntg_contact_ntg_sportcategory", by_name)
+
+    def test_table_range_past_sheet_data(self):
+        """Test that empty rows inside a table range are kept."""
+        from openpyxl import Workbook
+        from openpyxl.worksheet.table import Table
+        from src.excel_loader import ExcelLoader
+
+        wb = Workbook()
+        ws = wb.active
+        ws["C3"], ws["D3"], ws["C4"] = "name", "code", "first"
+        ws.add_table(Table(displayName="sample", ref="C3:D6"))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "sample.xlsx"
+            wb.save(path)
+            tables = ExcelLoader(path).load_all_tables()
+
+        df = tables["sample"]
+        self.assertEqual(list(df.columns), ["name", "code"])
+        self.assertEqual(len(df), 3)
+        self.assertEqual(df["name"].iloc[0], "first")
+
+    def test_fast_engine_matches_openpyxl(self):
+        """Test that both engines yield identical DataFrames."""
+        import pandas as pd
+        from src.excel_loader import ExcelLoader
+
+        expected = ExcelLoader(EXCEL_FILE_REFERENCE, engine="openpyxl").load_all_tables()
+        actual = ExcelLoader(EXCEL_FILE_REFERENCE, engine="fast").load_all_tables()
+
+        self.assertEqual(list(actual), list(expected))
+        for name, df in expected.items():
+            pd.testing.assert_frame_equal(actual[name], df, check_exact=True)
+
+    def test_table_cache_round_trip(self):
+        """Test that cached tables equal freshly loaded ones, value types included."""
+        from contextlib import redirect_stdout
+        from datetime import date, datetime, time
+        from decimal import Decimal
+        import pandas as pd
+        from src.excel_loader import ExcelLoader
+        from src import table_cache
+
+        if table_cache.pa is None:
+            self.skipTest("pyarrow is not installed")
+
+        expected = ExcelLoader(EXCEL_FILE).load_all_tables()
+        expected["mixed"] = pd.DataFrame({
+            "a": [1, "x", None, 2.5],
+            "b": [None, True, False, None],
+            "c": [None, None, None, None],
+            "d": [1.5, float("nan"), 2.0, 3.0],
+            "e": [datetime(2020, 1, 15, 8, 30), date(2020, 1, 15), time(8, 30), float("nan")],
+        })
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = table_cache.TableCache(Path(tmp))
+            cache.store("key", expected)
+            loaded = cache.load("key")
+
+            self.assertIsNone(cache.load("other"))
+            self.assertEqual(list(loaded), list(expected))
+            for name, df in expected.items():
+                pd.testing.assert_frame_equal(loaded[name], df, check_exact=True)
+                for col in df.columns:
+                    self.assertEqual(
+                        [type(v) for v in loaded[name][col]], [type(v) for v in df[col]], (name, col)
+                    )
+
+            # The loader parses the workbook once and then reads the cache
+            loader = ExcelLoader(EXCEL_FILE, cache=cache)
+            first = loader.load_all_tables()
+            loader._read_workbook = None
+            second = loader.load_all_tables()
+            for name, df in first.items():
+                pd.testing.assert_frame_equal(second[name], df, check_exact=True)
+
+            # Values the cache cannot store leave the tables uncached
+            with redirect_stdout(io.StringIO()):
+                cache.store("decimal", {"t": pd.DataFrame({"a": [Decimal("1.5")]})})
+            self.assertIsNone(cache.load("decimal"))
+
+            self.assertEqual(cache.clear(), 2)
+
+    def test_unknown_engine(self):
+        """Test that an unknown engine is rejected."""
+        from src.excel_loader import ExcelLoader
+
+        with self.assertRaises(ValueError):
+            ExcelLoader(EXCEL_FILE, engine="xlrd")
+
+
+class TestSchemaLoader(unittest.TestCase):
+    """Test schema compilation and the compiled schema cache."""
+
+    def test_compiled_metadata(self):
+        """Test that the single-pass loader extracts all schema metadata."""
+        from src.schema_loader import SchemaLoader
+
+        schema = SchemaLoader(SCHEMA_FILE)
+        root = ET.parse(str(SCHEMA_FILE)).getroot()
+
+        self.assertEqual(
+            list(schema.entities_meta), [e.get("name") for e in root.findall("entity")]
+        )
+        self.assertEqual(schema.entities_meta["contact"]["primaryidfield"], "contactid")
+        self.assertEqual(
+            schema.get_field_meta("contact", "parentcustomerid")["lookupType"], "account|contact"
+        )
+        self.assertEqual(schema.get_lookup_types("contact", "parentcustomerid"), ("account", "contact"))
+        self.assertEqual(
+            schema.relationships_m2m["ntg_contact_ntg_sportcategory"]["sourceKey"], "contactid"
+        )
+        self.assertEqual(schema.schema_root.tag, root.tag)
+
+    def test_schema_cache(self):
+        """Test that a cached schema is loaded without parsing the XML."""
+        from unittest import mock
+        from src.schema_loader import SchemaCache, SchemaLoader
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = SchemaCache(Path(tmp))
+            compiled = SchemaLoader(SCHEMA_FILE, cache=cache).compiled
+
+            with mock.patch("src.schema_loader.compile_schema", side_effect=AssertionError):
+                self.assertEqual(SchemaLoader(SCHEMA_FILE, cache=cache).compiled, compiled)
+
+            # Unreadable entries are compiled again
+            key = next(Path(tmp).iterdir()).stem
+            next(Path(tmp).iterdir()).write_text("{}", encoding="utf-8")
+            self.assertIsNone(cache.load(key))
+            self.assertEqual(SchemaLoader(SCHEMA_FILE, cache=cache).compiled, compiled)
+
+            self.assertEqual(cache.clear(), 1)
+
+
+class TestXMLGenerator(unittest.TestCase):
+    """Test record rendering in XMLGenerator."""
+
+    def setUp(self):
+        from src.xml_generator import XMLGenerator
+
+        self.generator = XMLGenerator(
+            {"contact": {"displayname": "Contact", "primaryidfield": "contactid"}},
+            {"contact": {
+                "parentcustomerid": {"type": "entityreference", "lookupType": "account|contact"},
+                "ownerid": {"type": "owner"},
+                "firstname": {"type": "string"},
+            }},
+            {}
+        )
+
+    def test_column_plan(self):
+        """Test that helper columns are compiled into lookup overrides."""
+        from src.xml_generator import XMLGenerator
+
+        columns = ["contactid", "parentcustomerid", "parentcustomerid_entityreference", "ownerid"]
+        plan = {p.name: p for p in self.generator.compile_column_plan("contact", columns)}
+
+        self.assertNotIn("parentcustomerid_entityreference", plan)
+        self.assertEqual(plan["parentcustomerid"].default_lookup, "account")
+        self.assertEqual(plan["parentcustomerid"].override_position, 2)
+        self.assertEqual(plan["ownerid"].default_lookup, "systemuser")
+        self.assertFalse(plan["contactid"].is_lookup)
+
+        # Pre-split lookup types of a compiled schema are used as given
+        generator = XMLGenerator(
+            self.generator.entities_meta, self.generator.entity_field_meta, {},
+            lookup_types={"contact": {"parentcustomerid": ("contact", "account")}}
+        )
+        plan = {p.name: p for p in generator.compile_column_plan("contact", columns)}
+        self.assertEqual(plan["parentcustomerid"].default_lookup, "contact")
+
+    def test_lookup_override_per_row(self):
+        """Test that *_entityreference values override the schema lookup type, blank ones omit it."""
+        import pandas as pd
+
+        df = pd.DataFrame({
+            "contactid": ["c1", "c2"],
+            "firstname": ["Ann", None],
+            "parentcustomerid": ["p1", "p2"],
+            "parentcustomerid_entityreference": ["contact|Contact", None],
+            "ownerid": ["u1", "u2"],
+        })
+        records = list(self.generator.iter_entity_records("contact", df))
+
+        first = {f.get("name"): f.attrib for f in records[0].findall("field")}
+        second = {f.get("name"): f.attrib for f in records[1].findall("field")}
+
+        self.assertEqual(first["parentcustomerid"]["lookupentity"], "contact")
+        self.assertNotIn("lookupentity", second["parentcustomerid"])
+        self.assertEqual(second["ownerid"]["lookupentity"], "systemuser")
+        self.assertEqual(second["firstname"]["value"], "")
+
+    def test_schema_datetime_mode(self):
+        """Test that 'schema' mode only normalizes datetime fields."""
+        import pandas as pd
+        from src.xml_generator import XMLGenerator
+
+        field_meta = {"contact": {"birthdate": {"type": "datetime"}, "code": {"type": "string"}}}
+        df = pd.DataFrame({
+            "contactid": ["c1"],
+            "birthdate": ["15.01.2020"],
+            "code": ["15.01.2020"],
+        })
+
+        for mode, expected_code in (("all", "2020-01-15T00:00:00.0000000Z"), ("schema", "15.01.2020")):
+            generator = XMLGenerator(self.generator.entities_meta, field_meta, {}, datetime_mode=mode)
+            record = next(generator.iter_entity_records("contact", df))
+            fields = {f.get("name"): f.get("value") for f in record.findall("field")}
+
+            self.assertEqual(fields["birthdate"], "2020-01-15T00:00:00.0000000Z")
+            self.assertEqual(fields["code"], expected_code)
+
+    def test_typed_field_encoders(self):
+        """Test that columns are encoded by schema type and loaded dtype."""
+        import numpy as np
+        import pandas as pd
+        from src.xml_generator import XMLGenerator
+
+        field_meta = {"contact": {
+            "amount": {"type": "decimal"},
+            "active": {"type": "bool"},
+            "externalid": {"type": "guid"},
+            "note": {"type": "string"},
+        }}
+        df = pd.DataFrame({
+            "contactid": ["c1", "c2"],
+            "amount": [3.0, np.nan],
+            "active": [True, False],
+            "externalid": ["01.02.2020", "x"],
+            "note": ["01.02.2020", None],
+        })
+        generator = XMLGenerator(self.generator.entities_meta, field_meta, {}, datetime_mode="all")
+        first, second = (
+            {f.get("name"): f.get("value") for f in record.findall("field")}
+            for record in generator.iter_entity_records("contact", df)
+        )
+
+        # Only free text is treated as datetime in 'all' mode
+        self.assertEqual(first, {
+            "contactid": "c1", "amount": "3", "active": "True",
+            "externalid": "01.02.2020", "note": "2020-02-01T00:00:00.0000000Z"
+        })
+        # Missing values are written as empty fields, like safe_str()
+        self.assertEqual(second, {
+            "contactid": "c2", "amount": "", "active": "False", "externalid": "x", "note": ""
+        })
+
+    def test_field_encoders_match_safe_str(self):
+        """Test that every encoder equals safe_str() on loaded object columns."""
+        from datetime import date, datetime
+        import pandas as pd
+        from src.utils import FIELD_ENCODERS, encode_datetime_column, encode_text_column
+
+        columns = [
+            [1, 2.0, 2.5, None, float("nan"), 2**60],
+            [1.0, 1e20, -0.5, None],
+            [True, False, None],
+            [datetime(2020, 1, 15, 8, 30), None, datetime(2021, 5, 1, 0, 0, 0, 500000)],
+            [date(2020, 1, 15), None],
+            ["a", " ", None, "01.02.2020"],
+            [None, 2.0, "a", True, datetime(2020, 1, 1)],
+        ]
+        encoders = set(FIELD_ENCODERS.values()) - {encode_datetime_column}
+        for values in columns:
+            column = pd.Series(values, dtype=object)
+            expected = list(column.apply(safe_str))
+            for encoder in encoders | {encode_text_column}:
+                with self.subTest(values=values, encoder=encoder.__name__):
+                    self.assertEqual(list(encoder(column)), expected)
+            if "01.02.2020" not in values:
+                self.assertEqual(list(encode_datetime_column(column)), expected)
+
+
+class TestStreamingOutput(unittest.TestCase):
+    """Test that streaming XML output matches the in-memory tree."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load fixture tables and build a generator."""
+        from src.excel_loader import ExcelLoader
+        from src.schema_loader import SchemaLoader
+        from src.xml_generator import XMLGenerator
+
+        schema = SchemaLoader(SCHEMA_FILE)
+        loader = ExcelLoader(EXCEL_FILE)
+        cls.raw_tables = loader.load_all_tables()
+        cls.tables = loader.filter_tables(cls.raw_tables, {}, safe_str)
+
+        cls.generator = XMLGenerator(
+            schema.entities_meta,
+            schema.entity_field_meta,
+            schema.relationships_m2m
+        )
+        cls.generator.build_partylist_index(cls.raw_tables)
+
+    @staticmethod
+    def _strip_timestamp(xml: str) -> str:
+        return re.sub(r'timestamp="[^"]*"', 'timestamp=""', xml, count=1)
+
+    def test_stream_matches_tree(self):
+        """Test that write_xml() produces the same bytes as ElementTree.write()."""
+        root = self.generator.generate_xml(self.tables)
+        tree_out = io.BytesIO()
+        ET.ElementTree(root).write(tree_out, encoding='utf-8', xml_declaration=False)
+
+        stream_out = io.StringIO()
+        self.generator.write_xml(self.tables, stream_out)
+
+        self.assertEqual(
+            self._strip_timestamp(stream_out.getvalue()).encode("utf-8"),
+            self._strip_timestamp(tree_out.getvalue().decode("utf-8")).encode("utf-8")
+        )
+
+    def test_partylist_index_groups_rows(self):
+        """Test that partylist rows are grouped per activity and field in row order."""
+        import pandas as pd
+        from src.xml_generator import PartyRow, XMLGenerator
+
+        generator = XMLGenerator(
+            self.generator.entities_meta,
+            self.generator.entity_field_meta,
+            self.generator.relationships_m2m
+        )
+        generator.build_partylist_index({"partylist_appointment": pd.DataFrame({
+            "partyid_entityreference": ["contact", "account|contact", None, "contact"],
+            "entityField": ["optionalattendees", "requiredattendees", "optionalattendees", None],
+            "activitypointerrecordid": ["ap1", None, "ap3", "ap4"],
+            "activityid": ["a1", "a1", "a1", "a1"],
+            "partyid": ["c1", "c2", "c3", "c4"]
+        })})
+
+        self.assertEqual(generator.partylist_index["appointment"], {"a1": {
+            "optionalattendees": (
+                PartyRow("ap1", "c1", "contact"),
+                PartyRow("ap3", "c3", None)
+            ),
+            "requiredattendees": (PartyRow(None, "c2", "account"),)
+        }})
+
+    def test_grouped_m2m_targets(self):
+        """Test that grouped M2M output lists all targets once per source."""
+        from src.xml_generator import XMLGenerator
+
+        generator = XMLGenerator(
+            self.generator.entities_meta,
+            self.generator.entity_field_meta,
+            self.generator.relationships_m2m,
+            group_m2m_targets=True
+        )
+        generator.build_partylist_index(self.raw_tables)
+
+        def targets(root):
+            return sorted(
+                (rel.get("m2mrelationshipname"), rel.get("sourceid"), tgt.text)
+                for rel in root.iter("m2mrelationship")
+                for tgt in rel.iter("targetid")
+            )
+
+        root = generator.generate_xml(self.tables)
+        sources = [
+            (rel.get("m2mrelationshipname"), rel.get("sourceid"))
+            for rel in root.iter("m2mrelationship")
+        ]
+        self.assertGreater(len(sources), 0)
+        self.assertEqual(len(sources), len(set(sources)))
+        self.assertEqual(targets(root), targets(self.generator.generate_xml(self.tables)))
+
+        stream_out = io.StringIO()
+        generator.write_xml(self.tables, stream_out)
+        self.assertEqual(
+            self._strip_timestamp(stream_out.getvalue()),
+            self._strip_timestamp(ET.tostring(root, encoding="unicode"))
+        )
+
+    def test_parallel_rendering_matches_serial(self):
+        """Test that records rendered on a process pool give the same output."""
+        serial = io.StringIO()
+        self.generator.write_xml(self.tables, serial)
+
+        parallel = io.StringIO()
+        self.generator.write_xml(self.tables, parallel, workers=2, shard_size=1)
+        self.assertEqual(
+            self._strip_timestamp(parallel.getvalue()),
+            self._strip_timestamp(serial.getvalue())
+        )
+
+        root = self.generator.generate_xml(self.tables, workers=2, shard_size=3)
+        self.assertEqual(
+            self._strip_timestamp(ET.tostring(root, encoding="unicode")),
+            self._strip_timestamp(serial.getvalue())
+        )
+
+    def test_fragment_cache_reuses_unchanged_entities(self):
+        """Test that only entities with changed inputs are re-rendered."""
+        import pandas as pd
+        from src.fragment_cache import FragmentCache
+        from src.xml_generator import XMLGenerator
+
+        expected = io.StringIO()
+        self.generator.write_xml(self.tables, expected)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = FragmentCache(Path(tmp))
+            generator = XMLGenerator(
+                self.generator.entities_meta,
+                self.generator.entity_field_meta,
+                self.generator.relationships_m2m,
+                fragment_cache=cache
+            )
+            generator.build_partylist_index(self.raw_tables)
+
+            first = io.StringIO()
+            generator.write_xml(self.tables, first)
+            self.assertEqual((cache.hits, cache.misses), (0, 3))
+
+            root = generator.generate_xml(self.tables)
+            self.assertEqual((cache.hits, cache.misses), (3, 3))
+
+            for out in (first.getvalue(), ET.tostring(root, encoding="unicode")):
+                self.assertEqual(
+                    self._strip_timestamp(out), self._strip_timestamp(expected.getvalue())
+                )
+
+            changed = dict(self.tables)
+            contact = changed["contact"].copy()
+            contact.loc[contact.index[0], "lastname"] = "Changed"
+            changed["contact"] = contact
+
+            out = io.StringIO()
+            generator.write_xml(changed, out)
+            self.assertEqual((cache.hits, cache.misses), (5, 4))
+            self.assertIn('value="Changed"', out.getvalue())
+
+            # Retyping a cell is a change even when its value hashes alike
+            for note in (1.0, "1.0"):
+                retyped = dict(self.tables)
+                contact = self.tables["contact"].copy()
+                contact["note"] = pd.Series([note] + ["x"] * (len(contact) - 1), dtype=object)
+                retyped["contact"] = contact
+
+                out = io.StringIO()
+                generator.write_xml(retyped, out)
+            self.assertEqual(cache.misses, 6)
+            self.assertIn('name="note" value="1.0"', out.getvalue())
+
+    def test_fragment_cache_evicts_least_recently_used(self):
+        """Test that the size limit evicts the least recently read fragments."""
+        import os
+        from src.fragment_cache import FragmentCache
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = FragmentCache(Path(tmp), max_bytes=250)
+            for i, key in enumerate(["a", "b"]):
+                cache.put(key, key * 100)
+                # Distinct access times regardless of filesystem timestamp resolution
+                os.utime(Path(tmp) / f"{key}.xml", ns=(i * 10**9, i * 10**9))
+
+            cache.get("a")
+            cache.put("c", "c" * 100)
+
+            self.assertTrue(cache.contains("a"))
+            self.assertFalse(cache.contains("b"))
+            self.assertTrue(cache.contains("c"))
+            self.assertLessEqual(cache.size(), 250)
+
+            self.assertEqual(cache.clear(), 2)
+            self.assertEqual(cache.size(), 0)
+
+    def test_fragment_cache_streams_fragments(self):
+        """Test that fragments are written and read in pieces, never partially stored."""
+        from src.fragment_cache import FragmentCache
+        from src.xml_generator import _parse_records
+
+        text = '<record id="1"><field name="a" value="x" /></record><record id="2" />'
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = FragmentCache(Path(tmp))
+            with self.assertRaises(RuntimeError), cache.writer("failed") as out:
+                out.write(text)
+                raise RuntimeError
+            self.assertFalse(cache.contains("failed"))
+            self.assertEqual(list(Path(tmp).iterdir()), [])
+
+            with cache.writer("ok") as out:
+                out.write(text)
+            chunks = list(cache.read_chunks("ok", size=7))
+            self.assertEqual("".join(chunks), text)
+
+        records = list(_parse_records(chunks))
+        self.assertEqual([rec.get("id") for rec in records], ["1", "2"])
+        self.assertEqual("".join(ET.tostring(rec, encoding="unicode") for rec in records), text)
+
+    def test_stream_empty_elements(self):
+        """Test that empty elements are written in short form like ElementTree."""
+        from src.xml_writer import StreamingXMLWriter
+
+        out = io.StringIO()
+        writer = StreamingXMLWriter(out)
+        writer.start("entities", {"a": 'x"<&'})
+        writer.start("records")
+        writer.end()
+        writer.close()
+
+        root = ET.Element("entities", {"a": 'x"<&'})
+        ET.SubElement(root, "records")
+        self.assertEqual(out.getvalue(), ET.tostring(root, encoding="unicode"))
+
+
+class TestPackaging(unittest.TestCase):
+    """Test ZIP packaging."""
+
+    def test_direct_zip_package(self):
+        """Test that XML streamed into the ZIP equals the loose data.xml."""
+        import zipfile
+        from src import ExcelToXmlConverter
+
+        converter = ExcelToXmlConverter(project="test_project")
+        zip_path = converter.create_package(keep_xml=True)
+
+        with zipfile.ZipFile(zip_path) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(
+                zf.namelist(),
+                ["data.xml", "data_schema.xml", "[Content_Types].xml"]
+            )
+            packaged = zf.read("data.xml")
+
+        self.assertEqual(packaged, (zip_path.parent / "data.xml").read_bytes())
+        self.assertEqual(ET.fromstring(packaged).tag, "entities")
+
+    def test_split_packages(self):
+        """Test that split packages hold every record once, with its M2M rows."""
+        import zipfile
+        from src import ExcelToXmlConverter
+
+        def contents(zip_paths):
+            records, m2m = {}, {}
+            for zip_path in zip_paths:
+                with zipfile.ZipFile(zip_path) as zf:
+                    self.assertEqual(
+                        zf.namelist(),
+                        ["data.xml", "data_schema.xml", "[Content_Types].xml"]
+                    )
+                    root = ET.fromstring(zf.read("data.xml"))
+                for entity in root.iter("entity"):
+                    for rec in entity.iter("record"):
+                        records[(entity.get("name"), rec.get("id"))] = zip_path
+                    for rel in entity.iter("m2mrelationship"):
+                        for tgt in rel.iter("targetid"):
+                            m2m[(rel.get("sourceid"), tgt.text)] = zip_path
+            return records, m2m
+
+        with tempfile.TemporaryDirectory() as tmp:
+            converter = ExcelToXmlConverter(project="test_project", output_dir=Path(tmp) / "single")
+            records, m2m = contents([converter.create_package()])
+
+            for workers in (1, 2):
+                converter = ExcelToXmlConverter(
+                    project="test_project", output_dir=Path(tmp) / str(workers), workers=workers
+                )
+                paths = converter.create_packages(max_records=2)
+                self.assertEqual([p.name for p in paths[:2]], ["data_001.zip", "data_002.zip"])
+
+                split_records, split_m2m = contents(paths)
+                self.assertEqual(set(split_records), set(records))
+                self.assertEqual(set(split_m2m), set(m2m))
+                for path in paths:
+                    self.assertLessEqual(list(split_records.values()).count(path), 2)
+                for (source, _), path in split_m2m.items():
+                    self.assertEqual(path, split_records[("contact", source)])
+
+            # Switching between single and split output removes the other layout
+            output_dir = Path(tmp) / "1"
+            converter = ExcelToXmlConverter(project="test_project", output_dir=output_dir)
+            converter.create_package()
+            self.assertEqual(sorted(p.name for p in output_dir.glob("*.zip")), ["data.zip"])
+            paths = converter.create_packages(max_records=2)
+            self.assertEqual(sorted(output_dir.glob("*.zip")), sorted(paths))
+
+    def test_reproducible_output(self):
+        """Test that reproducible builds of identical inputs are byte-identical."""
+        import zipfile
+        from datetime import datetime
+        import pandas as pd
+        from src.converter import build_project
+        from src.xml_generator import XMLGenerator
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [
+                build_project(
+                    "test_project", output_dir=Path(tmp) / str(i), incremental=False,
+                    reproducible=True, direct_zip=direct_zip
+                )[0]
+                for i, direct_zip in enumerate((False, True))
+            ]
+            self.assertEqual(paths[0].read_bytes(), paths[1].read_bytes())
+
+            with zipfile.ZipFile(paths[0]) as zf:
+                root = ET.fromstring(zf.read("data.xml"))
+                self.assertEqual({info.date_time for info in zf.infolist()}, {(2026, 2, 23, 13, 34, 12)})
+            self.assertEqual(root.get("timestamp"), "2026-02-23T13:34:12Z")
+
+            # Timestamps ZIP entries cannot store fail before any output
+            with self.assertRaises(ValueError):
+                build_project("test_project", output_dir=Path(tmp) / "early", incremental=False,
+                              timestamp=datetime(1975, 1, 1))
+            self.assertFalse((Path(tmp) / "early" / "data.xml").exists())
+
+        # Missing activity party ids derive from activity, field and position
+        def party_ids():
+            generator = XMLGenerator({"appointment": {"primaryidfield": "activityid"}}, {}, {},
+                                     reproducible_ids=True)
+            generator.build_partylist_index({"partylist_appointment": pd.DataFrame({
+                "partyid_entityreference": ["contact", "contact"],
+                "entityField": ["requiredattendees", "requiredattendees"],
+                "activitypointerrecordid": [None, None],
+                "activityid": ["a1", "a1"],
+                "partyid": ["c1", "c2"]
+            })})
+            rec = ET.Element("record")
+            generator.render_partylists_for_record(rec, "appointment", "a1")
+            return [el.get("id") for el in rec.iter("activitypointerrecords")]
+
+        first = party_ids()
+        self.assertEqual(first, party_ids())
+        self.assertNotEqual(first[0], first[1])
+
+    def test_compression_modes(self):
+        """Test that every compression mode produces a readable standard ZIP."""
+        import zipfile
+        from src.zip_writer import CompressionPolicy, open_entry, open_zip, write_file
+
+        payload = b"".join(
+            b'<record id="%d"><field name="n" value="%d" /></record>' % (i, i * 7919 % 1000)
+            for i in range(20000)
+        )
+        policies = [
+            CompressionPolicy(mode="store"),
+            CompressionPolicy(mode="deflate", level=1),
+            CompressionPolicy(mode="parallel", workers=3, chunk_size=10000),
+        ]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "data.xml"
+            source.write_bytes(payload)
+
+            for policy in policies:
+                zip_path = Path(tmp) / f"{policy.mode}.zip"
+                with open_zip(zip_path, policy) as zf:
+                    write_file(zf, source, "data.xml", policy)
+                    zf.writestr("[Content_Types].xml", "<Types />")
+
+                with zipfile.ZipFile(zip_path) as zf:
+                    self.assertIsNone(zf.testzip(), policy.mode)
+                    self.assertEqual(zf.read("data.xml"), payload, policy.mode)
+                    expected_type = zipfile.ZIP_STORED if policy.mode == "store" else zipfile.ZIP_DEFLATED
+                    self.assertEqual(zf.getinfo("data.xml").compress_type, expected_type)
+
+            # Streamed entries are compressed at the policy's level
+            sizes = []
+            for level in (1, 9):
+                policy = CompressionPolicy(mode="deflate", level=level)
+                zip_path = Path(tmp) / f"level{level}.zip"
+                with open_zip(zip_path, policy) as zf, open_entry(zf, "data.xml", policy) as entry:
+                    entry.write(payload)
+                with zipfile.ZipFile(zip_path) as zf:
+                    sizes.append(zf.getinfo("data.xml").compress_size)
+            self.assertLess(sizes[1], sizes[0])
+
+    def test_invalid_compression_policy(self):
+        """Test that unknown modes and levels are rejected."""
+        from src.zip_writer import CompressionPolicy, validate_policy
+
+        with self.assertRaises(ValueError):
+            validate_policy(CompressionPolicy(mode="bzip2"))
+        with self.assertRaises(ValueError):
+            validate_policy(CompressionPolicy(mode="deflate", level=12))
+
+
+class TestMetrics(unittest.TestCase):
+    """Test per-stage instrumentation."""
+
+    def test_stage_metrics_reported(self):
+        """Test that converter stages and entities reach hooks and the JSON file."""
+        import json
+        from src import ExcelToXmlConverter
+        from src.metrics import MetricsRecorder
+
+        seen = []
+        metrics = MetricsRecorder(hooks=[seen.append], trace_memory=True)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            converter = ExcelToXmlConverter(
+                project="test_project", stream=True, output_dir=Path(tmp), metrics=metrics
+            )
+            _, xml_path = converter.process()
+            xml_size = xml_path.stat().st_size
+
+            metrics_path = Path(tmp) / "metrics.json"
+            metrics.write_json(metrics_path)
+            saved = json.loads(metrics_path.read_text(encoding="utf-8"))
+
+        self.assertEqual(seen, metrics.records)
+        self.assertEqual(
+            [m.stage for m in seen if m.entity is None],
+            ["_load_resources", "_filter_tables", "_stream_xml"]
+        )
+
+        entities = {m.entity: m for m in seen if m.stage == "process_entity"}
+        self.assertEqual(set(entities), {"contact", "appointment", "ntg_sportcategory"})
+        self.assertEqual(entities["contact"].rows, 4)
+
+        stream_stage = seen[-1]
+        self.assertEqual(stream_stage.bytes_written, xml_size)
+        self.assertLess(sum(m.bytes_written for m in entities.values()), xml_size)
+        for m in seen:
+            self.assertGreaterEqual(m.wall_seconds, 0)
+            self.assertIsNotNone(m.peak_memory)
+
+        self.assertEqual(len(saved["stages"]), len(seen))
+        self.assertEqual(saved["stages"][-1]["stage"], "_stream_xml")
+
+    def test_memory_tracing_without_reset_peak(self):
+        """Test that memory tracing works where tracemalloc cannot reset the peak (Python 3.8)."""
+        import tracemalloc
+        from src.metrics import MetricsRecorder
+
+        reset_peak = getattr(tracemalloc, "reset_peak", None)
+        if reset_peak is not None:
+            del tracemalloc.reset_peak
+        try:
+            metrics = MetricsRecorder(trace_memory=True)
+            with metrics.stage("outer"):
+                with metrics.stage("inner"):
+                    data = [0] * 100000
+                del data
+        finally:
+            if reset_peak is not None:
+                tracemalloc.reset_peak = reset_peak
+
+        inner, outer = metrics.records
+        self.assertGreater(inner.peak_memory, 0)
+        self.assertGreaterEqual(outer.peak_memory, inner.peak_memory)
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    """Test that unchanged projects reuse their previous output."""
+
+    def test_rebuild_only_on_change(self):
+        """Test reuse, and rebuilds after input, setting and output changes."""
+        import shutil
+        from unittest import mock
+        from src.converter import build_project
+        from src.zip_writer import CompressionPolicy
+
+        with tempfile.TemporaryDirectory() as tmp:
+            input_dir = Path(tmp) / "inputs"
+            output_dir = Path(tmp) / "outputs"
+            shutil.copytree(EXCEL_FILE.parent, input_dir / "proj")
+
+            def build(**kwargs):
+                return build_project(
+                    "proj", input_dir=input_dir, output_dir=output_dir, incremental=True, **kwargs
+                )
+
+            zip_path, reused = build()
+            self.assertFalse(reused)
+            self.assertTrue((output_dir / "build_manifest.json").exists())
+
+            self.assertEqual(build(), (zip_path, True))
+
+            # Another converter version may render differently
+            with mock.patch("src.manifest.__version__", "0.0.0-other"):
+                self.assertFalse(build()[1])
+
+            # Settings that change the output force a rebuild
+            self.assertFalse(build(compression=CompressionPolicy(mode="store"))[1])
+            self.assertTrue(build(compression=CompressionPolicy(mode="store"))[1])
+
+            # Changed schema content
+            schema = input_dir / "proj" / SCHEMA_FILE.name
+            schema.write_bytes(schema.read_bytes() + b"\n")
+            self.assertFalse(build(compression=CompressionPolicy(mode="store"))[1])
+
+            # Output touched or removed after the build
+            zip_path.write_bytes(b"")
+            self.assertFalse(build(compression=CompressionPolicy(mode="store"))[1])
+            zip_path.unlink()
+            zip_path, reused = build(compression=CompressionPolicy(mode="store"))
+            self.assertFalse(reused)
+            self.assertTrue(zip_path.exists())
+
+
+class TestDeltaBuild(unittest.TestCase):
+    """Test delta output against a record hash store."""
+
+    def test_only_changed_records_written(self):
+        """Test that reruns write only changed records and their M2M rows."""
+        import shutil
+        import openpyxl
+        from src.converter import build_project
+
+        with tempfile.TemporaryDirectory() as tmp:
+            input_dir = Path(tmp) / "inputs"
+            store = Path(tmp) / "delta.sqlite"
+            shutil.copytree(EXCEL_FILE.parent, input_dir / "proj")
+
+            def build():
+                xml_path, _ = build_project(
+                    "proj", input_dir=input_dir, output_dir=Path(tmp) / "outputs",
+                    create_zip_file=False, delta_store=store
+                )
+                root = ET.parse(xml_path).getroot()
+                records = {
+                    entity.get("name"): len(entity.findall("records/record"))
+                    for entity in root.iter("entity")
+                }
+                m2m = root.findall("entity/m2mrelationships/m2mrelationship")
+                return records, m2m
+
+            records, m2m = build()
+            self.assertEqual(records, {"contact": 4, "appointment": 2, "ntg_sportcategory": 3})
+            self.assertTrue(m2m)
+
+            records, m2m = build()
+            self.assertEqual(sum(records.values()), 0)
+            self.assertEqual(m2m, [])
+
+            # Edit the contact that has M2M rows
+            workbook = openpyxl.load_workbook(input_dir / "proj" / EXCEL_FILE.name)
+            sheet = workbook["contact"]
+            header = [cell.value for cell in sheet[1]]
+            link_sheet = workbook["m2m_ntg_contact_ntg_sportcatego"]
+            linked = link_sheet.cell(row=2, column=1).value
+            row = next(r for r in range(2, sheet.max_row + 1)
+                       if sheet.cell(row=r, column=header.index("contactid") + 1).value == linked)
+            sheet.cell(row=row, column=header.index("firstname") + 1).value = "Changed"
+            workbook.save(input_dir / "proj" / EXCEL_FILE.name)
+
+            records, m2m = build()
+            self.assertEqual(records, {"contact": 1, "appointment": 0, "ntg_sportcategory": 0})
+            self.assertTrue(m2m)
+            self.assertEqual({rel.get("sourceid") for rel in m2m}, {str(linked)})
+
+    def test_record_hashes_follow_rendered_text(self):
+        """Test that hashes change with the rendered values, not the dtypes."""
+        import pandas as pd
+        from src.delta import record_hashes
+        from src.xml_generator import XMLGenerator
+
+        generator = XMLGenerator(
+            {"contact": {"primaryidfield": "contactid", "displayname": "Contact"}}, {},
+            {"contact": {"statecode": {"type": "state"}}}
+        )
+        before = pd.DataFrame({
+            "contactid": ["c1", "c2", "c3"],
+            "statecode": [1, 2, 3],
+            "note": pd.Series([1.0, "a", "b"], dtype=object)
+        })
+        # Blanking c3's statecode makes the column float; c1's note becomes text
+        after = pd.DataFrame({
+            "contactid": ["c1", "c2", "c3"],
+            "statecode": [1, 2, None],
+            "note": pd.Series(["1.0", "a", "b"], dtype=object)
+        })
+
+        _, hashes_before = record_hashes(generator, "contact", before)
+        _, hashes_after = record_hashes(generator, "contact", after)
+        self.assertEqual((hashes_before != hashes_after).tolist(), [True, False, True])
+
+
+class TestValidation(unittest.TestCase):
+    """Test pre-flight referential integrity checks."""
+
+    def test_broken_references_reported(self):
+        """Test that each kind of broken key or reference is found."""
+        import pandas as pd
+        from src import ExcelToXmlConverter
+
+        converter = ExcelToXmlConverter(project="test_project")
+        self.assertEqual(converter.validate(), [])
+
+        tables = converter.raw_tables
+        tables["contact"] = pd.concat([tables["contact"], tables["contact"].iloc[:1]], ignore_index=True)
+        tables["appointment"].loc[0, "regardingobjectid"] = "no-such-contact"
+        tables["partylist_appointment"].loc[0, "activityid"] = "no-such-appointment"
+        tables["m2m_ntg_contact_ntg_sportcategory"].loc[0, "ntg_sportcategoryid"] = "no-such-category"
+
+        # parentcustomerid points at account, which has no table and is not checked
+        found = {(i.check, i.table, i.column): i for i in converter.validate()}
+        self.assertEqual(set(found), {
+            ("duplicate primary key", "contact", "contactid"),
+            ("lookup to missing contact", "appointment", "regardingobjectid"),
+            ("partylist row without parent record", "partylist_appointment", "activityid"),
+            ("M2M id without ntg_sportcategory record", "ntg_contact_ntg_sportcategory", "ntg_sportcategoryid"),
+        })
+        self.assertEqual(found[("lookup to missing contact", "appointment", "regardingobjectid")].examples,
+                         ("no-such-contact",))
+
+        converter.validate_inputs = True
+        with self.assertRaises(ValueError) as ctx:
+            converter.process()
+        self.assertIn("duplicate primary key", str(ctx.exception))
+
+
+class TestCli(unittest.TestCase):
+    """Test the command-line interface."""
+
+    def test_explicit_inputs_and_column_filter(self):
+        """Test a run with explicit files, a column filter and its own output directory."""
+        import json
+        import zipfile
+        from contextlib import redirect_stdout
+        from src.cli import main
+
+        with tempfile.TemporaryDirectory() as tmp:
+            columns = Path(tmp) / "columns.json"
+            columns.write_text(json.dumps({"contact": ["contactid", "lastname"]}), encoding="utf-8")
+            output_dir = Path(tmp) / "out"
+
+            with redirect_stdout(io.StringIO()):
+                main([
+                    "--excel", str(EXCEL_FILE),
+                    "--schema", str(SCHEMA_FILE),
+                    "--input-dir", str(Path(tmp) / "no_projects"),
+                    "--columns", str(columns),
+                    "-o", str(output_dir),
+                    "--compression", "store",
+                    "--no-incremental"
+                ])
+
+            with zipfile.ZipFile(output_dir / "data.zip") as zf:
+                root = ET.fromstring(zf.read("data.xml"))
+
+            fields = {
+                f.get("name")
+                for f in root.find("entity[@name='contact']").iter("field")
+            }
+            self.assertEqual(fields, {"contactid", "lastname"})
+
+    def test_incremental_flags(self):
+        """Test that --incremental and --no-incremental set one option, the last one winning."""
+        from src.cli import build_parser
+
+        parser = build_parser()
+        self.assertTrue(parser.parse_args(["--incremental"]).incremental)
+        self.assertFalse(parser.parse_args(["--incremental", "--no-incremental"]).incremental)
+
+    def test_invalid_arguments(self):
+        """Test that invalid option combinations and filter files are rejected."""
+        from contextlib import redirect_stderr
+        from src.cli import load_column_filter, main
+
+        for argv in (["a", "b"], ["--batch", "--excel", "x.xlsx"], ["--workers", "0"],
+                     ["--timestamp", "1975-01-01T00:00:00Z"], ["--keep-xml"],
+                     ["--direct-zip", "--no-zip"]):
+            with self.assertRaises(SystemExit) as ctx, redirect_stderr(io.StringIO()):
+                main(argv)
+            self.assertEqual(ctx.exception.code, 2)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "columns.json"
+            path.write_text('{"contact": "lastname"}', encoding="utf-8")
+            with self.assertRaises(ValueError):
+                load_column_filter(path)
+
+
+class TestBatch(unittest.TestCase):
+    """Test batch conversion of several projects."""
+
+    def test_batch_continues_after_failure(self):
+        """Test per-project outputs, schema reuse and failure reporting."""
+        import shutil
+        from unittest import mock
+        from src import schema_loader
+        from src.batch import BatchOptions, discover_projects, format_summary, run_batch
+
+        with tempfile.TemporaryDirectory() as tmp:
+            input_dir = Path(tmp) / "inputs"
+            output_dir = Path(tmp) / "outputs"
+            for name in ("alpha", "beta"):
+                shutil.copytree(EXCEL_FILE.parent, input_dir / name)
+            (input_dir / "broken").mkdir()
+            shutil.copy(SCHEMA_FILE, input_dir / "broken")
+            (input_dir / "broken" / EXCEL_FILE.name).write_bytes(b"not a workbook")
+            (input_dir / "empty").mkdir()
+
+            self.assertEqual(discover_projects(input_dir), ["alpha", "beta", "broken"])
+
+            with mock.patch("src.batch.default_schema_cache", return_value=None), \
+                    mock.patch("src.converter.default_schema_cache", return_value=None), \
+                    mock.patch("src.schema_loader.compile_schema",
+                               wraps=schema_loader.compile_schema) as compile_schema:
+                results = run_batch(
+                    options=BatchOptions(input_dir=input_dir, output_dir=output_dir),
+                    workers=1
+                )
+
+            self.assertEqual([r.project for r in results], ["alpha", "beta", "broken"])
+            self.assertEqual([r.ok for r in results], [True, True, False])
+            self.assertEqual(results[0].output, output_dir / "alpha" / "data.zip")
+            self.assertTrue((output_dir / "beta" / "data.zip").exists())
+            self.assertIn("Error", (output_dir / "broken" / "convert.log").read_text(encoding="utf-8"))
+            # Identical schemas are compiled once, before the projects are converted
+            self.assertEqual(compile_schema.call_count, 1)
+
+            summary = format_summary(results)
+            self.assertIn("2 succeeded (0 unchanged), 1 failed", summary)
+            self.assertIn("FAILED", summary)
+
+
 if __name__ == "__main__":
     unittest.main()